@@ -0,0 +1,62 @@
+#!/usr/bin/env Rscript
+
+# Reads the sweep dataset written by sweep_dataset.py build, e.g.
+#
+# source("sweep_dataset.r")
+# beta_2 <- read_sweep("beacon_distance", algorithm="beta", parameter=2)
+#
+# only reads the beacon distance files of the beta=2 runs. The result has one row per logged tick, with the
+# partition columns (algorithm, parameter, seed) first.
+
+sweep_dir <- "../src/PiSwarmSimulator/logs/sweep/"
+
+read_sweep_stats <- function(dataset=sweep_dir) {
+	read.csv(file.path(dataset, "stats.csv"), colClasses=c(algorithm="character", parameter="character",
+		seed="character"))
+}
+
+read_sweep <- function(columns, algorithm=NULL, parameter=NULL, seed=NULL, dataset=sweep_dir) {
+
+	schema <- read.csv(file.path(dataset, "schema.csv"), stringsAsFactors=FALSE)
+
+	stats <- read_sweep_stats(dataset)
+
+	# Partitions with every requested column, matching every condition given
+	partitions <- unique(stats[, c("algorithm", "parameter", "seed")])
+
+	for (column in columns) {
+		has_column <- stats[stats$column == column, c("algorithm", "parameter", "seed")]
+		partitions <- merge(partitions, has_column)
+	}
+
+	if (!is.null(algorithm)) partitions <- partitions[partitions$algorithm %in% algorithm,]
+	if (!is.null(parameter)) partitions <- partitions[as.numeric(partitions$parameter) %in% parameter,]
+	if (!is.null(seed)) partitions <- partitions[partitions$seed %in% as.character(seed),]
+
+	data <- list()
+
+	for (i in seq_len(nrow(partitions))) {
+
+		partition <- partitions[i,]
+
+		directory <- file.path(dataset, paste0("algorithm=", partition$algorithm),
+			paste0("parameter=", partition$parameter), paste0("seed=", partition$seed))
+
+		values <- list()
+
+		for (column in columns) {
+			type <- schema$type[schema$name == column]
+			path <- file.path(directory, paste0(column, ".bin"))
+			if (type == "int32") {
+				values[[column]] <- readBin(path, what="integer", size=4, n=file.size(path) / 4, endian="little")
+			} else {
+				values[[column]] <- readBin(path, what="double", size=8, n=file.size(path) / 8, endian="little")
+			}
+		}
+
+		data[[i]] <- data.frame(algorithm=partition$algorithm, parameter=as.numeric(partition$parameter),
+			seed=partition$seed, values, stringsAsFactors=FALSE)
+	}
+
+	do.call(rbind, data)
+}
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Runs seeds of a configuration until a summary metric is known precisely enough, instead of a fixed number.
+
+Usage: python adaptive_sampling.py --arm=taxis_algorithm=omega,omega=35 --target=10
+       python adaptive_sampling.py --arm=taxis_algorithm=beta,beta=2 --arm=taxis_algorithm=omega,omega=35 \
+           --target=0.2 --log
+
+With one arm, seeds are added until the bootstrap confidence interval of the mean of the summary metric is
+narrower than target (in the metric's units). With two arms, seeds are added to both until the bootstrap
+confidence interval of the Vargha-Delaney A12 effect size between them is narrower than target. Either
+way no more than max_seeds are run per arm. With --log the runs also write advanced logs to logs/, for
+the R scripts in data_analysis.
+"""
+from multiprocessing import Pool
+from optparse import OptionParser
+
+import numpy
+
+from api import run_experiment, beacon_distance, centroid_distance
+from result_cache import ResultCache
+
+# Only what the summaries need; the lost robots count is quadratic in the number of robots
+METRICS = [("beacon_distance", beacon_distance), ("centroid_distance", centroid_distance)]
+
+# Summary metrics of a run, computed from the arrays returned by run_experiment
+SUMMARIES = {
+    "final_beacon_distance": lambda results: float(results["beacon_distance"][-1]),
+    "mean_beacon_distance": lambda results: float(results["beacon_distance"].mean()),
+    "mean_centroid_distance": lambda results: float(results["centroid_distance"].mean()),
+}
+
+RESAMPLES = 2000
+
+
+def a12(first, second):
+    """
+    Vargha-Delaney A12: the probability that a value from first is larger than one from second, counting
+    ties as half. 0.5 means no effect.
+    """
+    first = numpy.asarray(first, dtype=numpy.float64)[:, None]
+    second = numpy.asarray(second, dtype=numpy.float64)[None, :]
+    return float((first > second).mean() + 0.5 * (first == second).mean())
+
+
+def bootstrap_interval(statistic, samples, confidence, rng, resamples=RESAMPLES):
+    # Percentile bootstrap interval of statistic(*samples), resampling every sample independently
+    samples = [numpy.asarray(sample, dtype=numpy.float64) for sample in samples]
+    values = numpy.empty(resamples)
+    for resample in range(resamples):
+        values[resample] = statistic(*[sample[rng.randint(0, len(sample), len(sample))] for sample in samples])
+    tail = 100 * (1 - confidence) / 2.0
+    return (float(numpy.percentile(values, tail)), float(numpy.percentile(values, 100 - tail)))
+
+
+def mean(sample):
+    return float(numpy.mean(sample))
+
+
+def run_seed(job):
+    # Summary metric of one seed of one arm
+    (arm, seed, summary, ticks, log, use_cache) = job
+    settings = dict(arm)
+    if log:
+        settings["log_advanced"] = True
+    # Cached runs would not write their logs
+    cache = ResultCache() if use_cache and not log else None
+    results = run_experiment(ticks=ticks, metrics=METRICS, cache=cache, seed=seed, **settings)
+    return SUMMARIES[summary](results)
+
+
+class SequentialSampler(object):
+    """
+    Adds seeds to one or two arms (dicts of settings) in batches, run in parallel on pool, until the
+    confidence interval of the mean (one arm) or of A12 (two arms) is at most target wide, or every arm
+    has max_seeds seeds. Every arm is run on the same seeds.
+    """
+    def __init__(self, pool, arms, summary="final_beacon_distance", target=10.0, confidence=0.95, min_seeds=4,
+                 max_seeds=40, batch=4, first_seed=0, ticks=None, log=False, use_cache=True, verbose=True,
+                 random_seed=0):
+        if len(arms) not in (1, 2):
+            raise Exception("Adaptive sampling needs one or two arms")
+        if summary not in SUMMARIES:
+            raise Exception("Unknown summary metric: " + summary)
+        if max_seeds < max(1, min_seeds):
+            raise Exception("max_seeds must be at least 1 and at least min_seeds")
+        if batch < 1:
+            raise Exception("batch must be at least 1")
+        self.pool = pool
+        self.arms = arms
+        self.summary = summary
+        self.target = target
+        self.confidence = confidence
+        self.min_seeds = min_seeds
+        self.max_seeds = max_seeds
+        self.batch = batch
+        self.first_seed = first_seed
+        self.ticks = ticks
+        self.log = log
+        self.use_cache = use_cache
+        self.verbose = verbose
+        self.rng = numpy.random.RandomState(random_seed)  # For the bootstrap only
+        self.values = [[] for arm in arms]
+
+    def interval(self):
+        if len(self.arms) == 1:
+            return bootstrap_interval(mean, self.values, self.confidence, self.rng)
+        return bootstrap_interval(a12, self.values, self.confidence, self.rng)
+
+    def estimate(self):
+        if len(self.arms) == 1:
+            return mean(self.values[0])
+        return a12(*self.values)
+
+    def run(self):
+        """
+        Sample until the interval is narrow enough or the seed cap is reached. Returns a dict with the
+        estimate, its interval, the number of seeds per arm, the values of every arm and why sampling stopped.
+        """
+        while True:
+            count = len(self.values[0])
+            seeds = list(range(self.first_seed + count,
+                               self.first_seed + min(count + max(self.batch, self.min_seeds - count), self.max_seeds)))
+            jobs = [(arm, seed, self.summary, self.ticks, self.log, self.use_cache)
+                    for arm in self.arms for seed in seeds]
+            results = self.pool.map(run_seed, jobs, chunksize=1)
+            for (number, values) in enumerate(self.values):
+                values.extend(results[number * len(seeds):(number + 1) * len(seeds)])
+
+            count = len(self.values[0])
+            (low, high) = self.interval()
+            if self.verbose:
+                print("%d seeds: %.3f [%.3f, %.3f], width %.3f" % (count, self.estimate(), low, high, high - low))
+            if high - low <= self.target:
+                reason = "converged"
+            elif count >= self.max_seeds:
+                reason = "seed cap"
+            else:
+                continue
+
+            return {"estimate": self.estimate(), "interval": (low, high), "seeds": count, "values": self.values,
+                    "stop_reason": reason}
+
+
+def parse_arm(text):
+    # name=value,name=value with numbers converted
+    arm = {}
+    for item in text.split(","):
+        (name, value) = item.split("=", 1)
+        for convert in (int, float):
+            try:
+                value = convert(value)
+                break
+            except ValueError:
+                pass
+        arm[name] = value
+    return arm
+
+
+if __name__ == '__main__':
+    parser = OptionParser()
+    parser.add_option('', '--arm', dest='arms', default=[], action='append',
+                      help='settings of an arm, e.g. taxis_algorithm=omega,omega=35 (give once or twice)')
+    parser.add_option('', '--summary', dest='summary', default='final_beacon_distance',
+                      help='summary metric, one of ' + ", ".join(sorted(SUMMARIES)))
+    parser.add_option('', '--target', dest='target', default=None, type='float',
+                      help='confidence interval width to stop at (default 10 cm, or 0.2 for A12)')
+    parser.add_option('', '--confidence', dest='confidence', default=0.95, type='float', help='confidence level')
+    parser.add_option('', '--min_seeds', dest='min_seeds', default=4, type='int', help='seeds before testing')
+    parser.add_option('', '--max_seeds', dest='max_seeds', default=40, type='int', help='most seeds per arm')
+    parser.add_option('', '--batch', dest='batch', default=4, type='int', help='seeds added per arm at a time')
+    parser.add_option('', '--first_seed', dest='first_seed', default=0, type='int', help='first seed to run')
+    parser.add_option('', '--ticks', dest='ticks', default=None, type='int',
+                      help='ticks per run (default: a full experiment)')
+    parser.add_option('', '--log', dest='log', default=False, action='store_true',
+                      help='also write advanced logs of every run to logs/')
+    parser.add_option('', '--processes', dest='processes', default=None, type='int',
+                      help='number of worker processes (default: one per core)')
+    parser.add_option('', '--no_cache', dest='use_cache', default=True, action='store_false',
+                      help='do not use the result cache')
+    (options, args) = parser.parse_args()
+
+    if len(options.arms) not in (1, 2):
+        parser.error("give one or two arms")
+    arms = [parse_arm(arm) for arm in options.arms]
+    target = options.target
+    if target is None:
+        target = 10.0 if len(arms) == 1 else 0.2
+
+    pool = Pool(options.processes)
+    sampler = SequentialSampler(pool, arms, options.summary, target, options.confidence, options.min_seeds,
+                                options.max_seeds, options.batch, options.first_seed, options.ticks, options.log,
+                                options.use_cache)
+    result = sampler.run()
+    pool.close()
+    pool.join()
+
+    name = options.summary if len(arms) == 1 else "A12 of " + options.summary
+    print("%s: %.3f, %d%% interval [%.3f, %.3f] from %d seeds per arm (%s)" %
+          (name, result["estimate"], int(100 * options.confidence), result["interval"][0], result["interval"][1],
+           result["seeds"], result["stop_reason"]))
@@ -0,0 +1,107 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Running simulations from Python, in the calling process, with the results returned as arrays, e.g.
+#
+#   from api import run_experiment
+#   results = run_experiment(taxis_algorithm="omega", omega=35, seed=3, ticks=20000)
+#   results["beacon_distance"].min()
+#
+# Every simulation has its own settings object and random number generator, so any number of them can
+# be created in one process.
+import numpy
+
+from settings import make_settings
+from swarm_sim import HeadlessSwarmSimulation
+
+def beacon_distance(simulation):
+    # Distance of the swarm centroid from the beacon, in cm
+    centroid = simulation.calculate_swarm_centroid()
+    return simulation.calccmSize(simulation.calcDistance(centroid, simulation.beacon_position))
+
+def centroid_distance(simulation):
+    # Mean distance of the robots from the swarm centroid, in cm
+    return simulation.calccmSize(simulation.calculate_mean_distance_from_swarm_centroid())
+
+def lost_robots(simulation):
+    return simulation.num_lost_robots()
+
+# Metrics recorded every tick by default, as in the columns of the simulator's advanced logs
+METRICS = [("beacon_distance", beacon_distance),
+           ("centroid_distance", centroid_distance),
+           ("lost_robots", lost_robots)]
+
+def experiment_settings(settings=None, **overrides):
+    # A settings object, or the defaults with keyword overrides
+    if settings is None:
+        return make_settings(**overrides)
+    elif overrides:
+        raise Exception("Give either a settings object or keyword settings, not both")
+    return settings
+
+def create_simulation(settings=None, **overrides):
+    """
+    Build a headless simulation (world, arena, robots and controllers) from a
+    settings object, or from the defaults with keyword overrides, e.g.
+    create_simulation(robots=50, seed=1).
+    """
+    return HeadlessSwarmSimulation(experiment_settings(settings, **overrides))
+
+def run_experiment(settings=None, ticks=None, metrics=METRICS, cache=None, **overrides):
+    """
+    Run a headless simulation for a number of ticks (by default as many as an
+    experiment from the command line) and return a dict of NumPy arrays, with
+    the simulated time of every tick under "time" and the value of every
+    metric, a (name, function of the simulation) pair, under its name. The
+    values match the rows of the simulator's logs.
+
+    Runs with a fixed seed are served from, and added to, cache (a
+    ResultCache) if one is given. Metrics are identified by name in the cache.
+    """
+    settings = experiment_settings(settings, **overrides)
+    key = None
+    if cache is not None and settings.seed is not None:
+        description = {"ticks": ticks, "metrics": [name for (name, metric) in metrics]}
+        key = cache.key(settings, extra=description)
+        if cache.lookup(key) is not None:
+            arrays = cache.load_arrays(key)
+            if arrays is not None:  # Unless another process evicted it meanwhile
+                return arrays
+
+    simulation = create_simulation(settings)
+    if ticks is None:
+        ticks = simulation.experiment_ticks + 2
+
+    names = ["time"] + [name for (name, metric) in metrics]
+    results = dict((name, numpy.zeros(ticks)) for name in names)
+
+    # Stop early if the simulation quits by itself, i.e. at the end of a logged experiment
+    simulation.running = True
+    row = 0
+    try:
+        while simulation.running and row < ticks:
+            simulation.SimulationLoop()
+            results["time"][row] = (simulation.clock - 1) * simulation.ticklength
+            for (name, metric) in metrics:
+                results[name][row] = metric(simulation)
+            row += 1
+    finally:
+        simulation.Finish()
+
+    results = dict((name, values[:row]) for (name, values) in results.items())
+    if key is not None:
+        cache.store(key, settings, arrays=results, extra=description)
+    return results
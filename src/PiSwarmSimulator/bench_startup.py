@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measures how long a fresh headless simulator process takes to reach its first simulated tick.
+
+Usage: python bench_startup.py [--repeats=10] [--robots=20]
+
+Each repeat starts a new interpreter, which parses a headless command line, imports the simulation, builds
+the world and steps it once. The time from launching the process to the end of each phase is reported, along
+with whether any graphics library was loaded on the way.
+"""
+import os
+import sys
+import time
+from subprocess import Popen, PIPE
+from optparse import OptionParser
+
+# Run in the child process; prints the time at the end of each phase
+CHILD = """
+import sys, time
+phases = []
+from settings import fwSettings, parse_args
+parse_args(sys.argv[1:])
+phases.append(time.time())
+from swarm_sim import HeadlessSwarmSimulation
+phases.append(time.time())
+simulation = HeadlessSwarmSimulation()
+phases.append(time.time())
+simulation.Step(simulation.settings)
+phases.append(time.time())
+print(" ".join(repr(phase) for phase in phases))
+print(int("pygame" in sys.modules))
+"""
+
+PHASES = ["settings parsed", "simulation imported", "world built", "first tick"]
+
+
+def measure(python, robots):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    launched = time.time()
+    process = Popen([python, "-c", CHILD, "--headless", "--robots=" + str(robots)], cwd=directory,
+                    stdout=PIPE, universal_newlines=True)
+    (output, _) = process.communicate()
+    if process.returncode != 0:
+        raise Exception("Benchmark process failed with exit code %d" % (process.returncode))
+
+    lines = output.strip().split("\n")
+    phases = [float(phase) - launched for phase in lines[-2].split()]
+    return (phases, lines[-1] == "1")
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+if __name__ == '__main__':
+    parser = OptionParser()
+    parser.add_option('', '--repeats', dest='repeats', default=10, type='int', help='number of processes to time')
+    parser.add_option('', '--robots', dest='robots', default=20, type='int', help='number of robots')
+    parser.add_option('', '--python', dest='python', default=sys.executable, help='interpreter to benchmark')
+    (options, args) = parser.parse_args()
+
+    results = [measure(options.python, options.robots) for repeat in range(options.repeats)]
+
+    print("Time from process launch, over %d runs with %d robots:" % (options.repeats, options.robots))
+    for (index, phase) in enumerate(PHASES):
+        times = [phases[index] * 1000 for (phases, graphics) in results]
+        print("  %-20s median %7.1f ms, min %7.1f ms" % (phase, median(times), min(times)))
+    print("pygame loaded: %s" % ("yes" if any(graphics for (phases, graphics) in results) else "no"))
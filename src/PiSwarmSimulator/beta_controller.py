@@ -2,6 +2,8 @@ from robot import *
 
 class BetaController(Robot):
 
+    __slots__ = ["neighbours", "prevneighbours", "beta", "wireless_range"]
+
     def __init__(self, framework, robotid, position):
         super(BetaController, self).__init__(framework, robotid, position)
 
@@ -17,7 +19,7 @@ class BetaController(Robot):
         self.neighbours = []
         for anotherrobot in self.framework.robotlist:
             if self != anotherrobot:
-                distance = self.framework.calcDistance(self.body.position, anotherrobot.body.position)
+                distance = self.framework.calcDistance(self.position, anotherrobot.position)
                 if distance < self.wireless_range:
                     self.neighbours.append(anotherrobot)
 
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Check the incremental illumination tracker (illumination=incremental) against brute force.
+
+Usage: python check_illumination.py [--set=name=value]... [--ticks=1000] [--every=1]
+
+Runs a headless simulation with illumination=incremental and the settings given by --set (e.g.
+--set=robots=2000 --set=taxis_algorithm=omega), and every few ticks compares the tracker's illumination
+of every robot with two others worked out from scratch:
+
+  brute force: every robot's ray from the beacon tested against every other robot and every obstacle
+               edge, with no index and no slack, in the single precision of Box2D;
+  raycast:     one Box2D raycast per robot, as with illumination=raycast.
+
+Like the tracker, both keep a robot's illumination where its ray meets nothing, so all three should
+agree at every check. Every disagreement is reported, and the exit status is 1 if there were any.
+"""
+import sys
+import time
+from optparse import OptionParser
+
+import numpy
+
+from api import create_simulation
+from golden_trace import parse_setting
+from illumination import SINGLE, circle_entries, edge_fractions
+from obstacles import SHADOWED
+from swarm_sim import RayCastClosestCallback
+
+BLOCK_PAIRS = 1 << 22  # Most (robot, robot) pairs tested at once by the brute force
+
+
+def brute_force(simulation, tracker, previous):
+    # Illumination of every robot, testing every pair of robots and every obstacle edge
+    positions = simulation.swarm.positions.astype(SINGLE)
+    count = len(positions)
+    illuminated = previous.copy()
+    block = max(1, BLOCK_PAIRS // max(count, 1))
+    for start in range(0, count, block):
+        rows = numpy.arange(start, min(start + block, count))
+        ends = positions[rows]
+        (own, ray_sq) = circle_entries(tracker.beacon_single, ends, ends, tracker.radius_single)
+        entries = circle_entries(tracker.beacon_single, numpy.repeat(ends, count, axis=0),
+                                 numpy.tile(positions, (len(rows), 1)), tracker.radius_single)[0]
+        entries = entries.reshape(len(rows), count)
+        entries[numpy.arange(len(rows)), rows] = numpy.inf  # The robot itself
+        others = entries.min(axis=1)
+        blocked = others < own
+        hit = numpy.isfinite(own) | numpy.isfinite(others)
+        if tracker.edges_single is not None:
+            crossing = edge_fractions(tracker.beacon_single, ends, tracker.edges_single).min(axis=1)
+            blocked |= crossing < own / ray_sq
+            hit |= numpy.isfinite(crossing)
+        illuminated[rows[hit]] = ~blocked[hit]
+    if simulation.visibility is not None:
+        illuminated[simulation.visibility.classify_all(simulation.swarm.positions) == SHADOWED] = False
+    return illuminated
+
+
+def raycast(simulation, previous):
+    # Illumination of every robot by one Box2D raycast each, as with illumination=raycast
+    illuminated = previous.copy()
+    for (index, robot) in enumerate(simulation.robotlist):
+        if simulation.visibility is not None and simulation.visibility.classify(robot.position) == SHADOWED:
+            illuminated[index] = False
+            continue
+        callback = RayCastClosestCallback()
+        simulation.world.RayCast(callback, simulation.beacon_position, robot.body.position)
+        if callback.hit:
+            illuminated[index] = callback.fixture.body.position == robot.body.position
+    return illuminated
+
+
+def check(simulation, ticks, every, report=10):
+    # Number of checks at which the three disagree, printing the first few disagreements
+    tracker = simulation.illumination
+    count = len(simulation.robotlist)
+    (brute, casted) = (numpy.zeros(count, dtype=bool), numpy.zeros(count, dtype=bool))
+    (checks, failures, evaluations) = (0, 0, 0)
+    simulation.running = True
+    while simulation.running and simulation.clock < ticks:
+        before = tracker.evaluations
+        simulation.SimulationLoop()
+        evaluations += tracker.evaluations - before
+        # The others are only correct with the state they had at the last tick, so they follow every tick
+        brute = brute_force(simulation, tracker, brute)
+        casted = raycast(simulation, casted)
+        if simulation.clock % every:
+            continue
+        checks += 1
+        wrong = numpy.nonzero((tracker.illuminated != brute) | (tracker.illuminated != casted))[0]
+        if len(wrong):
+            failures += 1
+            for index in wrong[:report]:
+                print("tick %d robot %d: tracker %s, brute force %s, raycast %s" %
+                      (simulation.clock, index, tracker.illuminated[index], brute[index], casted[index]))
+    print("%d robots, %d checks, %d with disagreements; the tracker evaluated %.1f robots per tick" %
+          (count, checks, failures, evaluations / float(max(simulation.clock, 1))))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option('', '--ticks', dest='ticks', default=1000, type='int', help='ticks to run')
+    parser.add_option('', '--every', dest='every', default=1, type='int', help='ticks between checks')
+    parser.add_option('', '--set', dest='overrides', default=[], action='append',
+                      help='a setting for the run, as name=value; may be repeated')
+    (options, args) = parser.parse_args()
+    overrides = dict(parse_setting(setting) for setting in options.overrides)
+    overrides["illumination"] = "incremental"
+
+    simulation = create_simulation(**overrides)
+    started = time.time()
+    try:
+        failures = check(simulation, options.ticks, options.every)
+    finally:
+        simulation.Finish()
+    print("Took %.1f s" % (time.time() - started))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compressed, chunked simulator logs (log_format = "chunked"), which can be read a time window at a time.
+
+Usage: python chunked_log.py info LOG
+       python chunked_log.py to_csv LOG [CSV]
+       python chunked_log.py compress CSV... [--remove] [--decimals=N]
+
+info describes the chunks of a log, to_csv writes it out as the CSV log the simulator would have written
+(to CSV, or next to it with a .log extension), e.g. for the R scripts in data_analysis, and compress turns
+existing CSV logs into chunked logs next to them.
+
+A chunked log (<run>.clog) is a header naming its columns, followed by chunks of a fixed number of rows
+and a footer indexing the chunks:
+
+    MAGIC, header length (uint32), header (JSON: columns, formats, decimals)
+    per chunk: rows (uint32), size (uint32), size bytes of zlib compressed values
+    footer (JSON: for every chunk its offset, rows, first row and the minimum and maximum of every column),
+    footer length (uint64), MAGIC
+
+All integers are little-endian. The values of a chunk are stored column by column as float64. Each value's
+bits are XORed with the previous value's and the bytes of the column are shuffled, so that the bytes that
+barely change from tick to tick (signs, exponents, leading digits) end up next to each other and compress
+well. Readers use the footer to find the chunks overlapping a time window, or to skip chunks whose range of
+a column is of no interest, and decompress only those. A log whose footer was never written (the run
+crashed) is read by walking the chunks from the start.
+
+Exact values compress to about a quarter of the size of the CSV log, as the low bits of simulated distances
+are noise. A log with decimals of 0 or more (the log_decimals setting) instead stores each value rounded to
+that many decimal places, as the zigzag encoded difference from the previous value in units of the last
+place; 4 decimal places (a micrometre) make logs over ten times smaller than CSV.
+"""
+import os
+import sys
+import json
+import zlib
+import struct
+from optparse import OptionParser
+
+import numpy
+
+MAGIC = b"PSCLOG1\n"
+EXTENSION = ".clog"
+COMPRESSION_LEVEL = 6
+CHUNK_ROWS = 1024  # Rows per chunk when compressing CSV logs; the simulator writes log_batch_rows
+
+FORMATS = {"float": float, "int": int}
+
+
+def encode(values, decimals=-1):
+    """
+    Compressed bytes of a (rows, columns) array of float64 values: exact, or rounded to decimals decimal
+    places if decimals is 0 or more.
+    """
+    columns = numpy.ascontiguousarray(values.T, dtype="<f8")
+    if decimals < 0:
+        # The bits of each value XORed with the previous value's
+        bits = columns.view("<u8")
+        deltas = bits.copy()
+        deltas[:, 1:] ^= bits[:, :-1]
+    else:
+        # Differences of the values in units of the last decimal place, zigzag encoded so that small
+        # negative differences have leading zero bytes too
+        steps = numpy.round(columns * 10 ** decimals).astype("<i8")
+        differences = steps.copy()
+        differences[:, 1:] -= steps[:, :-1]
+        deltas = ((differences << 1) ^ (differences >> 63)).view("<u8")
+    shuffled = deltas.view(numpy.uint8).reshape(deltas.shape + (8,)).transpose(0, 2, 1)
+    return zlib.compress(numpy.ascontiguousarray(shuffled).tobytes(), COMPRESSION_LEVEL)
+
+
+def decode(data, rows, columns, decimals=-1):
+    # The (rows, columns) array of float64 values encoded in data
+    shuffled = numpy.frombuffer(zlib.decompress(data), dtype=numpy.uint8).reshape(columns, 8, rows)
+    deltas = numpy.ascontiguousarray(shuffled.transpose(0, 2, 1)).view("<u8").reshape(columns, rows)
+    if decimals < 0:
+        return numpy.bitwise_xor.accumulate(deltas, axis=1).view("<f8").T
+    differences = ((deltas >> numpy.uint64(1)).view("<i8") ^ -(deltas & numpy.uint64(1)).view("<i8"))
+    return (numpy.cumsum(differences, axis=1) / float(10 ** decimals)).T
+
+
+class ChunkedLogWriter(object):
+    """
+    Writes a chunked log, one chunk per call to write. Has the same interface as log_writer.CsvOutput.
+    """
+    def __init__(self, path, columns, formats, decimals=-1):
+        self.path = path
+        self.decimals = decimals
+        self.logfile = open(path, 'wb')
+        header = json.dumps({"columns": list(columns), "formats": [convert.__name__ for convert in formats],
+                             "decimals": decimals}).encode("utf-8")
+        self.logfile.write(MAGIC + struct.pack("<I", len(header)) + header)
+        self.chunks = []
+        self.rows = 0
+
+    def write(self, rows):
+        # Add a chunk of a (rows, columns) array of values
+        if not len(rows):
+            return
+        data = encode(rows, self.decimals)
+        if self.decimals >= 0:
+            rows = numpy.round(rows, self.decimals)
+        self.chunks.append({"offset": self.logfile.tell(), "rows": len(rows), "first_row": self.rows,
+                            "min": rows.min(axis=0).tolist(), "max": rows.max(axis=0).tolist()})
+        self.logfile.write(struct.pack("<II", len(rows), len(data)) + data)
+        self.rows += len(rows)
+
+    def sync(self):
+        self.logfile.flush()
+        os.fsync(self.logfile.fileno())
+
+    def close(self):
+        # Write the footer, which makes the log complete
+        footer = json.dumps({"chunks": self.chunks}).encode("utf-8")
+        self.logfile.write(footer + struct.pack("<Q", len(footer)) + MAGIC)
+        self.sync()
+        self.logfile.close()
+
+
+class ChunkedLog(object):
+    """
+    Reads a chunked log, e.g.
+
+        log = ChunkedLog("logs/adv_beta_2_1.clog")
+        window = log.read(["beacon_distance"], start=1000.0, end=2000.0)
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as logfile:
+            if logfile.read(len(MAGIC)) != MAGIC:
+                raise Exception("%s is not a chunked log" % (path))
+            (length,) = struct.unpack("<I", logfile.read(4))
+            header = json.loads(logfile.read(length).decode("utf-8"))
+            self.data_offset = logfile.tell()
+            self.columns = header["columns"]
+            self.formats = [FORMATS[name] for name in header["formats"]]
+            self.decimals = header["decimals"]
+            self.chunks = self.read_footer(logfile)
+            self.complete = self.chunks is not None
+            if self.chunks is None:
+                self.chunks = self.scan(logfile)
+
+    def __len__(self):
+        return sum(chunk["rows"] for chunk in self.chunks)
+
+    def read_footer(self, logfile):
+        # The chunk index from the footer, or None if there is no footer
+        logfile.seek(0, os.SEEK_END)
+        end = logfile.tell()
+        if end < self.data_offset + 8 + len(MAGIC):
+            return None
+        logfile.seek(end - 8 - len(MAGIC))
+        (length,) = struct.unpack("<Q", logfile.read(8))
+        if logfile.read(len(MAGIC)) != MAGIC or length > end:
+            return None
+        logfile.seek(end - 8 - len(MAGIC) - length)
+        return json.loads(logfile.read(length).decode("utf-8"))["chunks"]
+
+    def scan(self, logfile):
+        # Rebuild the chunk index by reading every whole chunk, for logs that were never closed
+        chunks = []
+        logfile.seek(self.data_offset)
+        first_row = 0
+        while True:
+            offset = logfile.tell()
+            record = logfile.read(8)
+            if len(record) < 8:
+                break
+            (rows, size) = struct.unpack("<II", record)
+            data = logfile.read(size)
+            if len(data) < size:
+                break
+            try:
+                values = decode(data, rows, len(self.columns), self.decimals)
+            except (zlib.error, ValueError):
+                break
+            chunks.append({"offset": offset, "rows": rows, "first_row": first_row,
+                           "min": values.min(axis=0).tolist(), "max": values.max(axis=0).tolist()})
+            first_row += rows
+        return chunks
+
+    def read_chunk(self, logfile, chunk):
+        logfile.seek(chunk["offset"])
+        (rows, size) = struct.unpack("<II", logfile.read(8))
+        return decode(logfile.read(size), rows, len(self.columns), self.decimals)
+
+    def conditions(self, start, end, where):
+        # (column index, low, high) ranges of the time (the first column) and of the where column
+        conditions = [(0, start, end)]
+        if where is not None:
+            conditions.append((self.columns.index(where[0]), where[1], where[2]))
+        return conditions
+
+    def select(self, start=None, end=None, where=None):
+        """
+        The chunks that may hold rows with a time from start to end, and, if where is a (column, low, high)
+        tuple, with that column from low to high. The ends of every range are inclusive, and may be None.
+        """
+        conditions = self.conditions(start, end, where)
+        return [chunk for chunk in self.chunks
+                if all((low is None or chunk["max"][column] >= low) and (high is None or chunk["min"][column] <= high)
+                       for (column, low, high) in conditions)]
+
+    def read(self, columns=None, start=None, end=None, where=None):
+        """
+        Read the rows with a time from start to end (and, if where is a (column, low, high) tuple, with that
+        column from low to high) as a dict of arrays, one per column in columns (by default all of them).
+        Only the chunks that can hold such rows are decompressed.
+        """
+        if columns is None:
+            columns = self.columns
+        indices = [self.columns.index(name) for name in columns]
+        conditions = self.conditions(start, end, where)
+
+        parts = []
+        with open(self.path, 'rb') as logfile:
+            for chunk in self.select(start, end, where):
+                values = self.read_chunk(logfile, chunk)
+                keep = numpy.ones(len(values), dtype=bool)
+                for (column, low, high) in conditions:
+                    if low is not None:
+                        keep &= values[:, column] >= low
+                    if high is not None:
+                        keep &= values[:, column] <= high
+                parts.append(values[keep][:, indices])
+        values = numpy.concatenate(parts) if parts else numpy.zeros((0, len(indices)))
+        return dict((name, values[:, index]) for (index, name) in enumerate(columns))
+
+    def rows(self):
+        # Every row, as a list of numbers converted with the column formats
+        with open(self.path, 'rb') as logfile:
+            for chunk in self.chunks:
+                for row in self.read_chunk(logfile, chunk).tolist():
+                    yield [convert(value) for (convert, value) in zip(self.formats, row)]
+
+    def to_csv(self, destination):
+        # Write the log out as the CSV log the simulator writes
+        with open(destination, 'w') as csvfile:
+            for row in self.rows():
+                csvfile.write(",".join([str(value) for value in row]) + "\n")
+
+
+def compress_csv(path, destination, decimals=-1):
+    # Write a CSV log as a chunked log, with the simulator's column names for it
+    from log_writer import LOG_COLUMNS, LOG_FORMATS
+    values = numpy.loadtxt(path, delimiter=",", ndmin=2)
+    count = values.shape[1]
+    columns = LOG_COLUMNS.get(count, ["column%d" % (column) for column in range(count)])
+    formats = LOG_FORMATS.get(count, [float] * count)
+    writer = ChunkedLogWriter(destination, columns, formats, decimals)
+    for start in range(0, len(values), CHUNK_ROWS):
+        writer.write(values[start:start + CHUNK_ROWS])
+    writer.close()
+
+
+if __name__ == '__main__':
+    parser = OptionParser(usage="usage: %prog [options] info LOG | to_csv LOG [CSV] | compress CSV...")
+    parser.add_option('', '--remove', dest='remove', default=False, action='store_true',
+                      help='remove CSV logs once they are compressed')
+    parser.add_option('', '--decimals', dest='decimals', default=-1, type='int',
+                      help='decimal places to keep when compressing (default: exact values)')
+    (options, args) = parser.parse_args()
+
+    if not args or args[0] not in ("info", "to_csv", "compress") or len(args) < 2:
+        parser.error("give info, to_csv or compress and a log")
+
+    if args[0] == "info":
+        log = ChunkedLog(args[1])
+        print("%s: %d rows in %d chunks, columns %s%s" % (args[1], len(log), len(log.chunks), ", ".join(log.columns),
+                                                          "" if log.complete else " (no footer, run did not finish)"))
+        for chunk in log.chunks:
+            print("  rows %d-%d: time %g-%g" % (chunk["first_row"], chunk["first_row"] + chunk["rows"] - 1,
+                                               chunk["min"][0], chunk["max"][0]))
+    elif args[0] == "to_csv":
+        destination = args[2] if len(args) > 2 else os.path.splitext(args[1])[0] + ".log"
+        ChunkedLog(args[1]).to_csv(destination)
+    else:
+        before = after = 0
+        for path in args[1:]:
+            destination = os.path.splitext(path)[0] + EXTENSION
+            compress_csv(path, destination, options.decimals)
+            before += os.path.getsize(path)
+            after += os.path.getsize(destination)
+            if options.remove:
+                os.remove(path)
+        print("%d logs compressed from %d to %d bytes (%.1fx)" % (len(args) - 1, before, after,
+                                                                  float(before) / max(after, 1)))
+    sys.exit(0)
@@ -0,0 +1,816 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Simulates very large swarms by splitting the arena into tiles, each simulated by its own process with its
+own Box2D world.
+
+Usage: python domain_decomposition.py [simulator options] [ticks]
+       e.g. python domain_decomposition.py --tiles=4x2 --robots=50000 --arena_size=30000 --seed=1 2000
+
+The tiles are laid over the swarm rather than the arena: the arena is split into columns with as many
+robots in each, and every column into rows with as many robots in each (see Tiling). When the busiest
+tile holds more than settings.tile_balance times the mean number of robots, the borders are moved to the
+swarm again, at most every REBALANCE_INTERVAL ticks; settings.tile_balance = 0 keeps a fixed grid over
+the arena instead.
+
+Every robot is owned by the tile it is in, and only that tile's world holds its body, sensors and
+controller. The state of every robot is published to a snapshot in shared memory once per tick:
+
+- Robots of other tiles within a halo around a tile are ghosts in its world, so that robots collide with
+  and sense robots across tile borders. A ghost is a body with a robot's mass and damping, moved to its
+  robot's published position and velocity every tick and driven with the force and torque its robot
+  was driven with, so a robot pushes and is pushed by it as by the robot itself. Only the robot's owner
+  keeps what happens to it; what happens to a ghost is discarded at the next tick.
+- A robot that moves further than a robot radius out of its tile, or whose tile moves away from it,
+  migrates: the tile it is now in builds its body and controller from the published state, and the old
+  tile replaces it with a ghost.
+- Wireless range checks (beta) and the swarm centroid (omega) are worked out from the published
+  positions of the whole swarm, and beacon occlusion with the analytic IlluminationTracker (see
+  illumination.py) over the same positions, which the tiles keep up to date for their own robots.
+
+Ticks run in lockstep. In the first phase every tile steps its world and publishes its robots; in the
+second every tile reads the snapshot and drives its robots. The second phase only reads what the first
+wrote, so the results do not depend on how the processes are scheduled. Unlike the single world of
+swarm_sim.py, the robots are not driven in order: a beta robot sees the neighbours of every other robot
+as of this tick and their illumination as of the previous one. Runs with different tilings, or without
+tiles, therefore differ in detail but simulate the same algorithms.
+
+The processes share memory by forking, so this only runs on Linux (and other Unix systems).
+
+At the end of a run the CPU time of every tile is printed, with the sum over phases of the slowest tile's,
+which is about what the run would take with a CPU for every tile. On a single CPU the example above with
+10 ticks builds in 41 seconds and runs in 94; every tile holds 6250 robots and takes 8 to 14 seconds of
+CPU, so with eight CPUs the 10 ticks would take about 16 seconds. With a fixed grid (--tile_balance=0)
+the swarm, which starts in one cluster, falls into two of the eight tiles: the run builds in 262 seconds
+and runs in 198, the two tiles take 95 and 100 seconds of CPU, and eight CPUs would not make it faster
+than 100 seconds. The cluster is the same size whatever the number of robots, so larger swarms are
+denser, and each robot has more contacts and more robots near its line of sight to the beacon. The time
+per robot of a tile grows with its robots, so splitting them evenly also cuts the total work.
+"""
+import os
+import sys
+import math
+import time as wallclock  # framework.py exports the function time()
+import ctypes
+import datetime
+import re
+import traceback
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+
+import numpy
+
+from framework import *
+from headless_framework import HeadlessFramework
+from settings import make_settings, parse_args
+from arena import Arena
+from robot import Robot, ROBOT_DIAMETER
+from proxSensor import ProxSensor
+from beta_controller import BetaController
+from omega_controller import OmegaController
+from placement import place_robots
+from rng import RandomStreams
+from swarm_state import SwarmState
+from swarm_controller import SwarmController, sensor_contacts, FORWARD, AVOID, TURNING, FRONT_LEFT, FRONT_RIGHT
+from obstacles import Obstacles, VisibilityMap, load_polygons
+from illumination import IlluminationTracker
+from swarm_sim import run_name
+from log_writer import LogWriter, LOG_COLUMNS, log_extension
+
+REBALANCE_INTERVAL = 50  # Fewest ticks between moves of the tile borders, as every move migrates robots
+
+
+def parse_tiles(text):
+    # "COLUMNSxROWS" -> (columns, rows)
+    try:
+        (columns, rows) = [int(part) for part in text.lower().split("x")]
+    except ValueError:
+        raise Exception("tiles must be given as COLUMNSxROWS, e.g. 4x2")
+    if columns < 1 or rows < 1:
+        raise Exception("tiles must be given as COLUMNSxROWS, e.g. 4x2")
+    return (columns, rows)
+
+
+def pairs_within(points, radius):
+    """
+    All pairs (first, second) of indices into points, an (n, 2) array, that are closer than radius, with
+    first < second. Points are binned into a grid of cells of size radius, so only neighbouring cells are
+    compared.
+    """
+    if len(points) < 2:
+        return (numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64))
+    cells = numpy.floor((points - points.min(axis=0)) / radius).astype(numpy.int64)
+    stride = cells[:, 1].max() + 3
+    keys = (cells[:, 0] + 1) * stride + cells[:, 1] + 1
+    order = numpy.argsort(keys, kind="mergesort")
+    sorted_keys = keys[order]
+
+    firsts = []
+    seconds = []
+    # The cell itself and half of its neighbours, so that every pair of cells is compared once
+    for (dx, dy) in [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]:
+        target = keys + dx * stride + dy
+        start = numpy.searchsorted(sorted_keys, target, "left")
+        counts = numpy.searchsorted(sorted_keys, target, "right") - start
+        first = numpy.repeat(numpy.arange(len(points)), counts)
+        offsets = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        second = order[numpy.repeat(start, counts) + offsets]
+        if (dx, dy) == (0, 0):
+            keep = first < second
+            (first, second) = (first[keep], second[keep])
+        firsts.append(first)
+        seconds.append(second)
+
+    (first, second) = (numpy.concatenate(firsts), numpy.concatenate(seconds))
+    close = ((points[first] - points[second]) ** 2).sum(axis=1) < radius * radius
+    (first, second) = (first[close], second[close])
+    swap = first > second
+    return (numpy.where(swap, second, first), numpy.where(swap, first, second))
+
+
+def sorted_contains(sorted_values, values):
+    # Whether each of values is in sorted_values, a sorted array
+    if not len(sorted_values):
+        return numpy.zeros(len(values), dtype=bool)
+    index = numpy.minimum(numpy.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return sorted_values[index] == values
+
+
+def split_points(values, parts):
+    """
+    parts - 1 increasing values that split values into parts of equal size, each halfway between the
+    values either side of it, or None if there are no values.
+    """
+    if not len(values):
+        return None
+    values = numpy.sort(values)
+    ends = (numpy.arange(1, parts) * len(values)) // parts
+    below = values[numpy.maximum(ends - 1, 0)]
+    above = values[numpy.minimum(ends, len(values) - 1)]
+    return (below + above) / 2
+
+
+class Tiling(object):
+    """
+    columns x rows tiles over the arena, which spans x from -width / 2 to width / 2 and y from 0 to height.
+    The arena is split into columns at x_edges, and every column into rows at its own y_edges, so that the
+    tiles can follow the swarm rather than the arena; they start as a grid. The edges are in shared memory,
+    so processes forked with the tiling see balance() move them. Tiles are numbered along the rows, starting
+    nearest the beacon.
+    """
+    def __init__(self, columns, rows, width, height):
+        self.columns = columns
+        self.rows = rows
+        self.width = float(width)
+        self.height = float(height)
+        self.x_edges = numpy.frombuffer(RawArray(ctypes.c_double, columns + 1), dtype=numpy.float64)
+        self.y_edges = numpy.frombuffer(RawArray(ctypes.c_double, columns * (rows + 1)),
+                                        dtype=numpy.float64).reshape(columns, rows + 1)
+        self.x_edges[:] = numpy.linspace(-self.width / 2, self.width / 2, columns + 1)
+        self.y_edges[:] = numpy.linspace(0.0, self.height, rows + 1)
+
+    def __len__(self):
+        return self.columns * self.rows
+
+    def balance(self, positions):
+        # Move the inner edges so that every tile holds as many of positions, an (n, 2) array, as the others
+        x_edges = split_points(positions[:, 0], self.columns)
+        if x_edges is None:
+            return
+        self.x_edges[1:-1] = x_edges
+        columns = self.column_of(positions)
+        for column in range(self.columns):
+            y_edges = split_points(positions[columns == column, 1], self.rows)
+            if y_edges is not None:
+                self.y_edges[column, 1:-1] = y_edges
+
+    def bounds(self, tile):
+        # (xmin, ymin, xmax, ymax) of a tile
+        (row, column) = divmod(tile, self.columns)
+        return (self.x_edges[column], self.y_edges[column, row], self.x_edges[column + 1], self.y_edges[column, row + 1])
+
+    def column_of(self, positions):
+        return numpy.searchsorted(self.x_edges[1:-1], positions[:, 0], side="right")
+
+    def tile_of(self, positions):
+        # The tile containing each of positions, an (n, 2) array
+        columns = self.column_of(positions)
+        rows = (positions[:, 1:2] >= self.y_edges[columns, 1:-1]).sum(axis=1)
+        return rows * self.columns + columns
+
+    def within(self, positions, tile, margin):
+        # Whether each of positions is inside the tile grown by margin on every side
+        (xmin, ymin, xmax, ymax) = self.bounds(tile)
+        return ((positions[:, 0] >= xmin - margin) & (positions[:, 0] < xmax + margin) &
+                (positions[:, 1] >= ymin - margin) & (positions[:, 1] < ymax + margin))
+
+
+class SharedSnapshot(object):
+    """
+    The published state of every robot, as NumPy views onto shared memory. Positions are kept for this tick
+    and the previous one, at index clock % 2. owners is the tile each robot belongs to.
+    """
+    FIELDS = [("positions", ctypes.c_double, numpy.float64, (2, -1, 2)),
+              ("angles", ctypes.c_double, numpy.float64, (-1,)),
+              ("velocities", ctypes.c_double, numpy.float64, (-1, 3)),  # x, y and angular velocity
+              ("forces", ctypes.c_double, numpy.float64, (-1, 3)),  # x, y and torque the robot was driven with
+              ("states", ctypes.c_uint8, numpy.uint8, (-1,)),
+              ("timers", ctypes.c_int64, numpy.int64, (-1,)),
+              ("heading_angles", ctypes.c_double, numpy.float64, (-1,)),
+              ("heading_achieved", ctypes.c_bool, numpy.bool_, (-1,)),
+              ("illuminated", ctypes.c_bool, numpy.bool_, (-1,)),
+              ("owners", ctypes.c_int32, numpy.int32, (-1,))]
+
+    def __init__(self, num_robots):
+        for (name, ctype, dtype, shape) in self.FIELDS:
+            shape = tuple(num_robots if size == -1 else size for size in shape)
+            raw = RawArray(ctype, int(numpy.prod(shape)))
+            setattr(self, name, numpy.frombuffer(raw, dtype=dtype).reshape(shape))
+
+
+class Ghost(object):
+    # A robot of another tile, standing in for it in this tile's world
+
+    __slots__ = ["robotid", "body", "diameter"]
+
+    def __init__(self, robotid, body, diameter):
+        self.robotid = robotid
+        self.body = body
+        self.diameter = diameter
+
+
+class TileRobot(object):
+    """
+    Mixin for a tile's robots: adds up the force and torque each robot is driven with in a tick, in the
+    tile's forces, for its ghosts in other tiles.
+    """
+    __slots__ = []
+
+    def applyWheelForce(self, f, p):
+        super(TileRobot, self).applyWheelForce(f, p)
+        centre = self.body.worldCenter
+        self.framework.forces[self.robotid] += (f[0], f[1], (p[0] - centre[0]) * f[1] - (p[1] - centre[1]) * f[0])
+
+
+class TileBetaRobot(TileRobot, BetaController):
+    __slots__ = []
+
+
+class TileOmegaRobot(TileRobot, OmegaController):
+    __slots__ = []
+
+
+class TileWorld(HeadlessFramework):
+    """
+    One tile's world, in a worker process: the arena, beacon and obstacles, the robots the tile owns and
+    ghosts of the robots around it. Looks enough like a SwarmSimulation for the robots and controllers.
+    """
+    def __init__(self, settings, seed, tile, tiling, snapshot):
+        super(TileWorld, self).__init__(settings)
+        self.tile = tile
+        self.tiling = tiling
+        self.snapshot = snapshot
+        self.streams = RandomStreams(seed)
+
+        self.ticklength = 0.25
+        self.clock = 0
+        self.unitsize = 10.0
+        self.world.gravity = (0.0, 0.0)
+
+        self.beacon_position = b2Vec2(0, 1)
+        self.beacon_radius = 0.5
+        beaconfixture = b2FixtureDef(shape=b2CircleShape(radius=self.beacon_radius), userData=self)
+        self.world.CreateStaticBody(position=self.beacon_position, angle=math.radians(270), fixtures=beaconfixture, userData=self)
+        self.thearena = Arena(self.world, tiling.width, tiling.height)
+
+        self.obstacles = None
+        self.visibility = None
+        if self.settings.obstacles:
+            arena_size = (self.settings.arena_size, self.settings.arena_size)
+            polygons = load_polygons(self.settings.obstacles, arena_size)
+            self.obstacles = Obstacles(self.world, [[(self.calcSimSize(x), self.calcSimSize(y)) for (x, y) in polygon]
+                                                    for polygon in polygons])
+            self.visibility = VisibilityMap.cached(self.obstacles.edges, tuple(self.beacon_position),
+                                                   (-tiling.width / 2, 0, tiling.width / 2, tiling.height),
+                                                   self.calcSimSize(self.settings.visibility_resolution))
+
+        self.diameter = self.calcSimSize(ROBOT_DIAMETER)
+        self.wireless_range = self.calcSimSize(self.settings.wireless_range)
+        # Robots stay with their tile until they are this far out of it, so they do not migrate back and forth
+        self.margin = self.diameter / 2
+        # Robots of other tiles this close to the tile are ghosts: any robot within IR sensor range of one of
+        # the tile's robots, with room for a tick of movement
+        self.halo = self.margin + 2 * self.diameter + self.calcSimSize(10)
+
+        num_robots = len(snapshot.owners)
+        self.swarm = SwarmState(num_robots)
+        self.robotlist = [None] * num_robots  # Only the tile's own robots
+        self.held = numpy.zeros(num_robots, dtype=bool)
+        self.forces = numpy.zeros((num_robots, 3))  # Force and torque the tile's robots are driven with
+        self.ghosts = {}  # robot id -> Ghost
+
+        self.swarm.positions[:] = snapshot.positions[0]
+        self.update_ghosts(snapshot.positions[0], snapshot.owners == tile)
+        self.adopt(numpy.nonzero(snapshot.owners == tile)[0], snapshot.positions[0])
+        if self.obstacles is not None and self.obstacles.blocked(self.swarm.positions[self.held], self.diameter / 2).any():
+            raise Exception("Robots would start inside or touching an obstacle, keep the placement region clear")
+
+        self.illumination = IlluminationTracker(self, self.diameter / 2)
+        if self.settings.taxis_algorithm == "beta":
+            self.controller = TileBetaController(self)
+        else:
+            self.controller = TileOmegaController(self)
+
+    def step(self, clock):
+        # First phase of a tick: step the world and publish the tile's robots
+        self.clock = clock
+        # Drive the ghosts as their robots were driven, as Box2D clears forces every step
+        for robotid in sorted(self.ghosts):
+            (fx, fy, torque) = self.snapshot.forces[robotid].tolist()
+            self.ghosts[robotid].body.ApplyForceToCenter((fx, fy), True)
+            self.ghosts[robotid].body.ApplyTorque(torque, True)
+        super(TileWorld, self).Step(self.settings)
+
+        rows = numpy.nonzero(self.held)[0]
+        if not len(rows):
+            return
+        self.swarm.sync(rows.tolist())
+        snapshot = self.snapshot
+        positions = self.swarm.positions[rows]
+        snapshot.positions[clock % 2][rows] = positions
+        snapshot.angles[rows] = self.swarm.angles[rows]
+        snapshot.velocities[rows] = [(body.linearVelocity.x, body.linearVelocity.y, body.angularVelocity)
+                                     for body in [self.swarm.bodies[row] for row in rows.tolist()]]
+        snapshot.states[rows] = self.swarm.states[rows]
+        snapshot.timers[rows] = self.swarm.timers[rows]
+        snapshot.heading_angles[rows] = self.swarm.heading_angles[rows]
+        snapshot.heading_achieved[rows] = self.swarm.heading_achieved[rows]
+        snapshot.illuminated[rows] = self.swarm.illuminated[rows]
+
+        # Hand robots that have left the tile to the tile they are now in
+        leaving = ~self.tiling.within(positions, self.tile, self.margin)
+        snapshot.owners[rows[leaving]] = self.tiling.tile_of(positions[leaving])
+
+    def drive(self, clock):
+        # Second phase of a tick: take over arriving robots, move the ghosts and drive the tile's robots
+        self.clock = clock
+        snapshot = self.snapshot
+        positions = snapshot.positions[clock % 2]
+        mine = snapshot.owners == self.tile
+
+        self.release(numpy.nonzero(self.held & ~mine)[0])
+        self.update_ghosts(positions, mine)
+        self.adopt(numpy.nonzero(mine & ~self.held)[0], positions)
+
+        # Every robot's position, and the illumination of the other tiles' robots, as published
+        swarm = self.swarm
+        swarm.positions[:] = positions
+        swarm.angles[:] = snapshot.angles
+        illuminated = snapshot.illuminated.copy()
+        swarm.illuminated[:] = illuminated
+        swarm.illuminated[self.held] = self.illumination.update(self.held)[self.held]
+
+        rows = numpy.nonzero(self.held)[0]
+        self.forces[rows] = 0
+        self.controller.drive(illuminated)
+        snapshot.forces[rows] = self.forces[rows]
+
+    def adopt(self, rows, positions):
+        # Build the bodies and controllers of robots that now belong to this tile, from their published state
+        snapshot = self.snapshot
+        for robotid in rows.tolist():
+            ghost = self.ghosts.pop(robotid, None)
+            if ghost is not None:
+                self.world.DestroyBody(ghost.body)
+
+            position = b2Vec2(float(positions[robotid, 0]), float(positions[robotid, 1]))
+            if self.settings.taxis_algorithm == "beta":
+                robot = TileBetaRobot(self, robotid, position)
+            else:
+                robot = TileOmegaRobot(self, robotid, position)
+            robot.body.transform = (position, float(snapshot.angles[robotid]))
+            (vx, vy, spin) = snapshot.velocities[robotid].tolist()
+            robot.body.linearVelocity = (vx, vy)
+            robot.body.angularVelocity = spin
+
+            self.swarm.states[robotid] = snapshot.states[robotid]
+            self.swarm.timers[robotid] = snapshot.timers[robotid]
+            self.swarm.heading_angles[robotid] = snapshot.heading_angles[robotid]
+            self.swarm.heading_achieved[robotid] = snapshot.heading_achieved[robotid]
+            self.swarm.illuminated[robotid] = snapshot.illuminated[robotid]
+            self.swarm.sensors[robotid] = 0  # Box2D reports the new body's contacts in the next step
+            self.swarm.contact_distances[robotid] = 0
+            self.robotlist[robotid] = robot
+            self.held[robotid] = True
+
+    def release(self, rows):
+        # Remove robots that have moved to another tile
+        for robotid in rows.tolist():
+            self.world.DestroyBody(self.robotlist[robotid].body)
+            self.robotlist[robotid] = None
+            self.swarm.bodies[robotid] = None
+            self.held[robotid] = False
+
+    def update_ghosts(self, positions, mine):
+        # Make ghosts of the other tiles' robots in the halo, where they were published
+        wanted = set(numpy.nonzero(~mine & self.tiling.within(positions, self.tile, self.halo))[0].tolist())
+        for robotid in list(self.ghosts):
+            if robotid not in wanted:
+                self.world.DestroyBody(self.ghosts.pop(robotid).body)
+
+        snapshot = self.snapshot
+        for robotid in sorted(wanted):
+            position = (float(positions[robotid, 0]), float(positions[robotid, 1]))
+            ghost = self.ghosts.get(robotid)
+            if ghost is None:
+                ghost = Ghost(robotid, None, self.diameter)
+                fixture = b2FixtureDef(shape=b2CircleShape(radius=self.diameter / 2), density=1, friction=0.3, userData=ghost)
+                ghost.body = self.world.CreateDynamicBody(position=position, fixtures=fixture, linearDamping=5,
+                                                          angularDamping=5, userData=ghost)
+                self.ghosts[robotid] = ghost
+            ghost.body.transform = (position, float(snapshot.angles[robotid]))
+            (vx, vy, spin) = snapshot.velocities[robotid].tolist()
+            ghost.body.linearVelocity = (vx, vy)
+            ghost.body.angularVelocity = spin
+
+    def neighbour_pairs(self, positions):
+        """
+        (robot, neighbour) pairs of the tile's robots and every robot within wireless range of them, at
+        positions, sorted by robot and then neighbour.
+        """
+        candidates = numpy.nonzero(self.tiling.within(positions, self.tile,
+                                                      self.margin + self.wireless_range + self.diameter))[0]
+        (first, second) = pairs_within(positions[candidates], self.wireless_range)
+        (first, second) = (candidates[first], candidates[second])
+        (robots, neighbours) = (numpy.concatenate([first, second]), numpy.concatenate([second, first]))
+        own = self.held[robots]
+        (robots, neighbours) = (robots[own], neighbours[own])
+        order = numpy.lexsort((neighbours, robots))
+        return (robots[order], neighbours[order])
+
+    # Check for contact between fixtures, as SwarmSimulation does, with ghosts standing in for other tiles' robots
+    def BeginContact(self, contact):
+        for (fixture, other) in ((contact.fixtureA, contact.fixtureB), (contact.fixtureB, contact.fixtureA)):
+            sensor = fixture.userData
+            if isinstance(sensor, ProxSensor) and not isinstance(other.userData, ProxSensor):
+                sensor.contactObs = True
+                if isinstance(other.userData, (Robot, Ghost)):
+                    distance = self.calcDistance(sensor.robottransform.position, other.body.position)
+                    sensor.contactDistance = distance - other.userData.diameter
+
+    def EndContact(self, contact):
+        if isinstance(contact.fixtureA.userData, ProxSensor):
+            contact.fixtureA.userData.contactObs = False
+        elif isinstance(contact.fixtureB.userData, ProxSensor):
+            contact.fixtureB.userData.contactObs = False
+
+    def calcSimSize(self, sizeInCm):
+        return (1 / float(self.unitsize)) * sizeInCm
+
+    def calcDistance(self, point_a, point_b):
+        return math.sqrt(math.pow(point_a[0] - point_b[0], 2) + math.pow(point_a[1] - point_b[1], 2))
+
+
+class TileBetaController(SwarmController):
+    """
+    BetaController.drive for a tile's robots, as BetaSwarmController does it but with the neighbours of
+    every robot worked out from the snapshot.
+    """
+    def __init__(self, framework):
+        super(TileBetaController, self).__init__(framework)
+        self.beta = framework.settings.beta
+        self.wireless_range = framework.wireless_range
+
+    def drive(self, illuminated_before):
+        tile = self.framework
+        swarm = self.swarm
+        held = tile.held
+        num_robots = len(held)
+        states = swarm.states.copy()
+        achieved = swarm.heading_achieved.copy()
+        contacts = sensor_contacts(swarm)
+
+        # The neighbours of the tile's robots now and at the previous tick
+        positions = tile.snapshot.positions[tile.clock % 2]
+        (robots, neighbours) = tile.neighbour_pairs(positions)
+        if tile.clock > 0:
+            (previous_robots, previous_neighbours) = tile.neighbour_pairs(tile.snapshot.positions[(tile.clock - 1) % 2])
+        else:
+            (previous_robots, previous_neighbours) = (robots[:0], neighbours[:0])
+
+        forward = held & (states == FORWARD)
+        self.call("driveForward", forward)
+
+        # Robots that have lost a link check whether they need to perform coherence
+        lost_link = forward & (numpy.bincount(robots, minlength=num_robots) <
+                               numpy.bincount(previous_robots, minlength=num_robots))
+        keys = robots * num_robots + neighbours
+        previous_keys = previous_robots * num_robots + previous_neighbours
+        lost = lost_link[previous_robots] & ~sorted_contains(keys, previous_keys)
+        (lost_by, lost_robot) = (previous_robots[lost], previous_neighbours[lost])
+        if len(lost_by):
+            # How many of each robot's neighbours can still see the robot it lost
+            start = numpy.searchsorted(robots, lost_by, "left")
+            counts = numpy.searchsorted(robots, lost_by, "right") - start
+            pair = numpy.repeat(numpy.arange(len(lost_by)), counts)
+            offsets = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+            neighbour = neighbours[numpy.repeat(start, counts) + offsets]
+            gaps = numpy.sqrt(((positions[neighbour] - positions[lost_robot[pair]]) ** 2).sum(axis=1))
+            still_connected = numpy.bincount(pair[gaps < self.wireless_range], minlength=len(lost_by))
+
+            coherence = (still_connected < self.beta) | illuminated_before[lost_robot]
+            for index in numpy.unique(lost_by[coherence]).tolist():
+                robot = self.robotlist[index]
+                robot.state = "turning"
+                robot.changeHeading(180)
+
+        front = contacts[:, FRONT_LEFT + FRONT_RIGHT].any(axis=1)
+        swarm.states[forward & ~lost_link & front] = AVOID
+
+        avoid = held & (states == AVOID)
+        left = avoid & contacts[:, FRONT_LEFT].any(axis=1)
+        right = avoid & ~left & contacts[:, FRONT_RIGHT].any(axis=1)
+        self.call("driveForwardLeft", left)
+        self.call("driveForwardRight", right)
+        swarm.states[avoid & ~left & ~right] = FORWARD
+
+        turning = held & (states == TURNING)
+        self.turn(turning & ~achieved)
+        swarm.states[turning & achieved] = FORWARD
+
+
+class TileOmegaController(SwarmController):
+    """
+    OmegaController.drive for a tile's robots, as OmegaSwarmController does it but with the centroid of the
+    swarm worked out from the snapshot.
+    """
+    def __init__(self, framework):
+        super(TileOmegaController, self).__init__(framework)
+        self.omega_ticks = framework.settings.omega / framework.ticklength
+        self.srange = framework.calcSimSize(10) / 2
+
+    def drive(self, illuminated_before):
+        tile = self.framework
+        swarm = self.swarm
+        held = tile.held
+        swarm.timers[held] += 1
+        states = swarm.states.copy()
+        achieved = swarm.heading_achieved.copy()
+
+        active = sensor_contacts(swarm) & (swarm.illuminated[:, None] | (swarm.contact_distances < self.srange))
+
+        forward = held & (states == FORWARD)
+        self.call("driveForward", forward)
+        front = active[:, FRONT_LEFT + FRONT_RIGHT].any(axis=1)
+        swarm.states[forward & front] = AVOID
+
+        # Cohere towards the centroid of the rest of the swarm
+        cohere = numpy.nonzero(forward & ~front & (swarm.timers > self.omega_ticks))[0]
+        if len(cohere):
+            positions = tile.snapshot.positions[tile.clock % 2]
+            total = positions.sum(axis=0)
+            for index in cohere.tolist():
+                (x, y) = ((total - positions[index]) / (len(positions) - 1)).tolist()
+                robot = self.robotlist[index]
+                robot.state = "turning"
+                robot.changeHeading(robot.headingToCoordinate(x, y))
+
+        avoid = held & (states == AVOID)
+        left = avoid & active[:, FRONT_LEFT].any(axis=1)
+        right = avoid & ~left & active[:, FRONT_RIGHT].any(axis=1)
+        self.call("driveForwardLeft", left)
+        self.call("driveForwardRight", right)
+        finished = avoid & ~left & ~right
+        swarm.states[finished] = FORWARD
+        swarm.timers[finished] = 0
+
+        turning = held & (states == TURNING)
+        self.turn(turning & ~achieved)
+        finished = turning & achieved
+        swarm.states[finished] = FORWARD
+        swarm.timers[finished] = 0
+
+
+def tile_worker(settings, seed, tile, tiling, snapshot, connection):
+    """
+    Worker process of one tile: builds its world, then runs the phases it is told to until told to stop.
+    Replies with the number of robots it holds and the CPU time it took.
+    """
+    try:
+        started = wallclock.process_time()
+        world = TileWorld(settings, seed, tile, tiling, snapshot)
+        connection.send(("ready", (int(world.held.sum()), wallclock.process_time() - started)))
+        while True:
+            (command, clock) = connection.recv()
+            started = wallclock.process_time()
+            if command == "stop":
+                break
+            elif command == "step":
+                world.step(clock)
+            else:
+                world.drive(clock)
+            connection.send(("done", (int(world.held.sum()), wallclock.process_time() - started)))
+    except Exception:
+        connection.send(("error", traceback.format_exc()))
+    connection.close()
+
+
+class DecomposedSimulation(object):
+    """
+    A headless simulation split into settings.tiles tiles, one worker process each. Steps like
+    SwarmSimulation, and writes the same experiment logs.
+    """
+    def __init__(self, settings=None):
+        if settings is None:
+            settings = make_settings()
+        self.settings = settings
+        if self.settings.taxis_algorithm not in ["beta", "omega"]:
+            raise Exception("settings.taxis_algorithm must be either 'beta' or 'omega'")
+        if self.settings.log_advanced:
+            raise Exception("Advanced logs are not supported with tiles, use --experiment")
+        if self.settings.tile_balance and self.settings.tile_balance < 1:
+            raise Exception("settings.tile_balance must be at least 1, or 0 for a fixed grid")
+
+        if self.settings.seed is None:
+            seed = re.sub(r"\D", "", str(datetime.datetime.now()))
+        else:
+            seed = str(self.settings.seed)
+        self.seed = seed
+        self.streams = RandomStreams(seed)
+        self.run_name = run_name(self.settings, seed)
+
+        self.path = 'logs/'
+        if self.settings.experiment:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+            self.logwriter = LogWriter(self.path + self.run_name + log_extension(self.settings), LOG_COLUMNS[2],
+                                       self.settings.log_batch_rows, self.settings.log_batches,
+                                       self.settings.log_fsync_batches, self.settings.log_format,
+                                       self.settings.log_decimals)
+
+        self.ticklength = 0.25
+        self.clock = 0
+        self.experiment_ticks = 50000
+        self.unitsize = 10.0
+        self.beacon_position = (0.0, 1.0)
+        self.running = True
+
+        (columns, rows) = parse_tiles(self.settings.tiles)
+        arena = self.calcSimSize(self.settings.arena_size)
+        self.tiling = Tiling(columns, rows, arena, arena)
+
+        # Place the swarm as SwarmSimulation does, with the same random streams
+        num_robots = self.settings.robots
+        robot_radius = self.calcSimSize(ROBOT_DIAMETER) / 2
+        positions = place_robots(num_robots, self.calcSimSize(ROBOT_DIAMETER), self.streams.subsystem("placement"),
+                                 layout=self.settings.placement, centre=(0, (float(arena) / 6) * 5),
+                                 size=(float(arena) / 6, float(arena) / 6),
+                                 clearance=self.calcSimSize(self.settings.placement_clearance),
+                                 clusters=self.settings.placement_clusters,
+                                 bounds=(-arena / 2 + robot_radius, robot_radius, arena / 2 - robot_radius, arena - robot_radius))
+
+        self.snapshot = SharedSnapshot(num_robots)
+        self.snapshot.positions[0] = positions
+        self.snapshot.positions[1] = positions
+        self.snapshot.angles[:] = [math.radians(self.streams.robot(robotid).integers(0, 360))
+                                   for robotid in range(num_robots)]
+        self.snapshot.states[:] = FORWARD
+        self.snapshot.heading_achieved[:] = True
+        if self.settings.tile_balance:
+            self.tiling.balance(positions)
+        self.snapshot.owners[:] = self.tiling.tile_of(positions)
+        self.balanced_at = 0
+        self.rebalances = 0
+
+        self.connections = []
+        self.workers = []
+        for tile in range(len(self.tiling)):
+            (connection, worker_connection) = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=tile_worker,
+                                             args=(settings, seed, tile, self.tiling, self.snapshot, worker_connection))
+            worker.daemon = True
+            worker.start()
+            self.connections.append(connection)
+            self.workers.append(worker)
+        # CPU time of every worker, and the sum over phases of the longest, which is what the run would take
+        # with a CPU for every worker
+        self.busy = numpy.zeros(len(self.tiling))
+        self.critical_path = 0.0
+        self.held = self.wait()
+        self.busy[:] = 0
+        self.critical_path = 0.0
+
+    def wait(self):
+        # Wait for every worker to finish what it was told, and return how many robots each one holds
+        replies = [connection.recv() for connection in self.connections]
+        for (status, value) in replies:
+            if status == "error":
+                self.Finish()
+                raise Exception("A tile worker failed:\n" + value)
+        cpu = numpy.array([value[1] for (status, value) in replies])
+        self.busy += cpu
+        self.critical_path += cpu.max()
+        return [value[0] for (status, value) in replies]
+
+    def Step(self):
+        for phase in ("step", "drive"):
+            for connection in self.connections:
+                connection.send((phase, self.clock))
+            self.held = self.wait()
+            if phase == "step":
+                self.rebalance()
+
+        # Output to log file
+        if self.settings.experiment:
+            centroid = self.calculate_swarm_centroid()
+            distance = self.calccmSize(self.calcDistance(centroid, self.beacon_position))
+            self.logwriter.append([self.clock * self.ticklength, distance])
+            # End the simulation after a fixed number of iterations
+            if self.clock > self.experiment_ticks:
+                self.running = False
+
+        self.clock += 1
+
+    def rebalance(self):
+        """
+        Between the phases of a tick, move the tile borders to the swarm if the busiest tile holds more than
+        settings.tile_balance times the mean number of robots. Robots whose tile changes migrate as usual in
+        the drive phase.
+        """
+        if not self.settings.tile_balance or self.clock - self.balanced_at < REBALANCE_INTERVAL:
+            return
+        counts = numpy.bincount(self.snapshot.owners, minlength=len(self.tiling))
+        if counts.max() <= self.settings.tile_balance * counts.mean():
+            return
+        positions = self.snapshot.positions[self.clock % 2]
+        self.tiling.balance(positions)
+        self.snapshot.owners[:] = self.tiling.tile_of(positions)
+        self.balanced_at = self.clock
+        self.rebalances += 1
+
+    def run(self, ticks):
+        while self.running and self.clock < ticks:
+            self.Step()
+
+    def Finish(self):
+        # Stop the workers and close the log
+        for (connection, worker) in zip(self.connections, self.workers):
+            if worker.is_alive():
+                try:
+                    connection.send(("stop", self.clock))
+                except (IOError, OSError):
+                    pass
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+        if self.settings.experiment:
+            self.logwriter.close()
+
+    def calculate_swarm_centroid(self):
+        (x, y) = self.snapshot.positions[self.clock % 2].mean(axis=0).tolist()
+        return (x, y)
+
+    def calcSimSize(self, sizeInCm):
+        return (1 / float(self.unitsize)) * sizeInCm
+
+    def calccmSize(self, sizeinUnits):
+        return sizeinUnits * float(self.unitsize)
+
+    def calcDistance(self, point_a, point_b):
+        return math.sqrt(math.pow(point_a[0] - point_b[0], 2) + math.pow(point_a[1] - point_b[1], 2))
+
+
+if __name__ == '__main__':
+    settings = make_settings()
+    args = parse_args(sys.argv[1:], settings)
+    ticks = int(args[0]) if args else 1000
+
+    started = wallclock.time()
+    simulation = DecomposedSimulation(settings)
+    built = wallclock.time()
+    try:
+        simulation.run(ticks)
+    finally:
+        simulation.Finish()
+    finished = wallclock.time()
+    print("%d robots in %d tiles %s, robots per tile %s" % (settings.robots, len(simulation.tiling), settings.tiles,
+                                                            simulation.held))
+    print("built in %.1fs, %d ticks in %.1fs (%.1f ticks/s)" % (built - started, simulation.clock, finished - built,
+                                                               simulation.clock / max(finished - built, 1e-9)))
+    print("CPU time of every tile in those ticks %s s, %d rebalances; with a CPU per tile they would take %.1fs" %
+          ([round(busy, 1) for busy in simulation.busy.tolist()], simulation.rebalances, simulation.critical_path))
@@ -2,59 +2,86 @@
 from subprocess import Popen
 from os.path import expanduser
 
+from result_cache import ResultCache
+from sweep_dataset import build, sweep_logs
+
 # set your python command here
 python_command = expanduser("python")
 
+# reuse the logs of runs that have already been simulated with the same settings, seed and simulator code
+use_cache = True
+
+# merge the logs into the dataset read by data_analysis/sweep_dataset.r once every run has finished
+merge_dataset = True
+
+
+def run_batch(jobs):
+    # run each job (a list of command line options) in its own process, unless it is in the result cache
+    cache = ResultCache() if use_cache else None
+    processes = []
+    for options in jobs:
+        if cache is not None and cache.restore_run(options):
+            continue
+        processes.append((options, Popen([python_command, "Pi-Swarm-Sim.py"] + options)))
+
+    for (options, process) in processes:
+        if process.wait() == 0 and cache is not None:
+            cache.store_run(options)
+
 
 def generate_calibration_beta_data():
 
     for beta in [2, 4, 6, 8, 10, 12, 14, 16, 18]:
-        processes = []
+        jobs = []
         for seed in range(4):
 
-            processes.append(Popen([python_command, "Pi-Swarm-Sim.py", "--taxis_algorithm=beta",
-                                    "--beta=" + str(beta), "--robots=20", "--experiment", "--headless", "--seed=" + str(seed)]))
+            jobs.append(["--taxis_algorithm=beta", "--beta=" + str(beta), "--robots=20", "--experiment", "--headless",
+                         "--seed=" + str(seed)])
 
-        [process.wait() for process in processes]
+        run_batch(jobs)
 
 
 def generate_calibration_omega_data():
 
     for omega in [20, 25, 30, 35, 40]:
-        processes = []
+        jobs = []
         for seed in range(4):
 
-            processes.append(Popen([python_command, "Pi-Swarm-Sim.py", "--taxis_algorithm=omega",
-                                    "--omega=" + str(omega), "--robots=20", "--experiment", "--headless", "--seed=" + str(seed)]))
+            jobs.append(["--taxis_algorithm=omega", "--omega=" + str(omega), "--robots=20", "--experiment", "--headless",
+                         "--seed=" + str(seed)])
 
-        [process.wait() for process in processes]
+        run_batch(jobs)
 
 
 def generate_beta_comparison_data():
 
     for group in range(1, 4):
-        processes = []
+        jobs = []
         for seed in range(group * 4, group * 4 + 4):
 
-            processes.append(Popen([python_command, "Pi-Swarm-Sim.py", "--taxis_algorithm=beta",
-                                    "--beta=2", "--robots=20", "--log_advanced", "--headless", "--seed=" + str(seed)]))
+            jobs.append(["--taxis_algorithm=beta", "--beta=2", "--robots=20", "--log_advanced", "--headless",
+                         "--seed=" + str(seed)])
 
-        [process.wait() for process in processes]
+        run_batch(jobs)
 
 
 def generate_omega_comparison_data():
 
     for group in range(1, 4):
-        processes = []
+        jobs = []
         for seed in range(group * 4, group * 4 + 4):
 
-            processes.append(Popen([python_command, "Pi-Swarm-Sim.py", "--taxis_algorithm=omega",
-                                    "--omega=35", "--robots=20", "--log_advanced", "--headless", "--seed=" + str(seed)]))
+            jobs.append(["--taxis_algorithm=omega", "--omega=35", "--robots=20", "--log_advanced", "--headless",
+                         "--seed=" + str(seed)])
+
+        run_batch(jobs)
 
-        [process.wait() for process in processes]
 
+if __name__ == '__main__':
+    generate_calibration_beta_data()
+    generate_calibration_omega_data()
+    generate_beta_comparison_data()
+    generate_omega_comparison_data()
 
-generate_calibration_beta_data()
-generate_calibration_omega_data()
-generate_beta_comparison_data()
-generate_omega_comparison_data()
\ No newline at end of file
+    if merge_dataset:
+        build(sweep_logs())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Renders frames from a recorded trajectory file (see trajectory.py) off-screen, without a display.
+
+Usage: python export_frames.py logs/beta_2_0.traj [--every=4] [--output=frames/]
+       python export_frames.py logs/beta_2_0.traj --raw --output=- | ffmpeg -f rawvideo -pix_fmt rgb24 \
+           -s 1000x800 -r 30 -i - beta_2_0.mp4
+
+Frame ranges are split across a pool of worker processes. Frames are written either as a numbered PNG
+sequence, or as one uncompressed RGB24 stream (to a file, or to stdout with --output=-) for a video encoder.
+"""
+import os
+import sys
+from multiprocessing import Pool
+from optparse import OptionParser
+
+import pygame
+
+from trajectory import TrajectoryReader
+from swarm_renderer import SwarmRenderer, BACKGROUND_COLOUR
+
+FRAME_SIZE = (1000, 800)
+TEXT_COLOUR = (255, 255, 255)
+FIT_MARGIN = 0.05  # Fraction of the frame left around the arena when fitting the view to it
+
+
+def fit_view(arena_vertices, size):
+    # Zoom and centre showing the whole arena
+    xs = [vertex[0] for vertex in arena_vertices]
+    ys = [vertex[1] for vertex in arena_vertices]
+    width = max(max(xs) - min(xs), 1e-6)
+    height = max(max(ys) - min(ys), 1e-6)
+    zoom = (1.0 - 2 * FIT_MARGIN) * min(size[0] / width, size[1] / height)
+    return (zoom, ((max(xs) + min(xs)) / 2.0, (max(ys) + min(ys)) / 2.0))
+
+
+class FrameRenderer(object):
+    """
+    Draws snapshots of the swarm onto an off-screen surface, from the run description that the simulator
+    stores in trajectory files (sensor_vertices, robot_radius, beacon_position, beacon_radius, arena_vertices
+    and ticklength).
+    """
+    def __init__(self, meta, size=FRAME_SIZE, zoom=None, centre=None, rays_visible=True, show_time=True):
+        pygame.font.init()
+        self.font = pygame.font.Font(None, 15)
+        self.size = size
+        self.ticklength = meta.get("ticklength", 0.25)
+        self.rays_visible = rays_visible
+        self.show_time = show_time
+
+        (fit_zoom, fit_centre) = fit_view(meta["arena_vertices"], size)
+        self.zoom = zoom or fit_zoom
+        self.centre = centre or fit_centre
+        self.offset = (self.centre[0] * self.zoom - size[0] / 2.0, self.centre[1] * self.zoom - size[1] / 2.0)
+
+        self.surface = pygame.Surface(size)
+        self.renderer = SwarmRenderer(meta["sensor_vertices"], meta["robot_radius"], meta["beacon_position"],
+                                      meta["beacon_radius"], meta["arena_vertices"], font=self.font,
+                                      obstacle_polygons=meta.get("obstacle_polygons", ()))
+
+    def render(self, snapshot):
+        self.surface.fill(BACKGROUND_COLOUR)
+        self.renderer.draw(self.surface, snapshot, self.zoom, self.offset, self.size[1], [],
+                           rays_visible=self.rays_visible)
+        if self.show_time:
+            text = "Time: %f s" % (snapshot.clock * self.ticklength)
+            self.surface.blit(self.font.render(text, True, TEXT_COLOUR), (5, 5))
+        return self.surface
+
+    def rgb(self, snapshot):
+        return pygame.image.tostring(self.render(snapshot), "RGB")
+
+    def save(self, snapshot, path):
+        pygame.image.save(self.render(snapshot), path)
+
+
+def frame_path(output_dir, number):
+    return os.path.join(output_dir, "frame_%06d.png" % (number))
+
+
+# Each worker opens the trajectory and sets up its own renderer once, then renders the chunks it is given
+worker = {}
+
+
+def start_worker(path, view):
+    worker["trajectory"] = TrajectoryReader(path)
+    worker["renderer"] = FrameRenderer(worker["trajectory"].meta, **view)
+    worker["snapshot"] = None
+
+
+def render_chunk(job):
+    # Render the samples in a chunk; PNGs are saved by the worker, raw frames are returned in order
+    (samples, first_number, output_dir) = job
+    (trajectory, renderer) = (worker["trajectory"], worker["renderer"])
+    frames = []
+    for (number, sample) in enumerate(samples, first_number):
+        worker["snapshot"] = trajectory.frame(sample, worker["snapshot"])
+        if output_dir is None:
+            frames.append(renderer.rgb(worker["snapshot"]))
+        else:
+            renderer.save(worker["snapshot"], frame_path(output_dir, number))
+    return b"".join(frames)
+
+
+def export(path, output, start=0, stop=None, every=1, raw=False, processes=None, chunk=8, view=None):
+    """
+    Render every `every`th sample of a trajectory between start and stop, either as PNG files in the
+    directory output, or (raw) as a stream of RGB24 frames written to output (a path or a binary file).
+    Returns the number of frames written.
+    """
+    view = view or {}
+    count = len(TrajectoryReader(path))
+    samples = list(range(start, count if stop is None else min(stop, count), max(1, every)))
+    chunks = [samples[first:first + chunk] for first in range(0, len(samples), chunk)]
+
+    output_dir = None
+    if not raw:
+        output_dir = output
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+    jobs = [(samples_in_chunk, number * chunk, output_dir) for (number, samples_in_chunk) in enumerate(chunks)]
+
+    stream = None
+    if raw:
+        stream = open(output, "wb") if isinstance(output, str) else output
+
+    pool = Pool(processes, initializer=start_worker, initargs=(path, view))
+    try:
+        # imap keeps the chunks in order, so the raw stream can be written as the frames arrive
+        for frames in pool.imap(render_chunk, jobs):
+            if stream is not None:
+                stream.write(frames)
+    finally:
+        pool.close()
+        pool.join()
+        if stream is not None and stream is not output:
+            stream.close()
+
+    return len(samples)
+
+
+if __name__ == '__main__':
+    parser = OptionParser(usage="usage: %prog [options] trajectory_file")
+    parser.add_option('', '--output', dest='output', default='frames/',
+                      help='directory for PNG frames, or file for --raw (- for stdout)')
+    parser.add_option('', '--raw', dest='raw', default=False, action='store_true',
+                      help='write an uncompressed RGB24 stream instead of PNG files')
+    parser.add_option('', '--start', dest='start', default=0, type='int', help='first sample to render')
+    parser.add_option('', '--stop', dest='stop', default=None, type='int', help='sample to stop rendering at')
+    parser.add_option('', '--every', dest='every', default=1, type='int', help='render every Nth sample')
+    parser.add_option('', '--width', dest='width', default=FRAME_SIZE[0], type='int', help='frame width')
+    parser.add_option('', '--height', dest='height', default=FRAME_SIZE[1], type='int', help='frame height')
+    parser.add_option('', '--zoom', dest='zoom', default=None, type='float',
+                      help='pixels per simulation unit (default: fit the arena)')
+    parser.add_option('', '--no_rays', dest='rays', default=True, action='store_false',
+                      help='do not draw the beacon rays')
+    parser.add_option('', '--processes', dest='processes', default=None, type='int',
+                      help='number of worker processes (default: one per core)')
+    (options, args) = parser.parse_args()
+
+    if len(args) != 1:
+        parser.print_help()
+        sys.exit(1)
+
+    output = options.output
+    if options.raw and output == '-':
+        output = getattr(sys.stdout, "buffer", sys.stdout)
+
+    view = {"size": (options.width, options.height), "zoom": options.zoom, "rays_visible": options.rays}
+    count = export(args[0], output, options.start, options.stop, options.every, options.raw, options.processes,
+                   view=view)
+
+    message = "%d frames written" % (count)
+    if options.raw:
+        message += " (rawvideo, rgb24, %dx%d)" % (options.width, options.height)
+    sys.stderr.write(message + "\n")
@@ -24,7 +24,7 @@ The framework's base is FrameworkBase. See its help for more information.
 """
 from Box2D import *
 from settings import fwSettings
-from time import time
+from time import time, sleep
 
 ## Use psyco if available
 #try:
@@ -116,11 +116,16 @@ class FrameworkBase(b2ContactListener):
         self.destructionListener= None
         self.renderer           = None
 
-    def __init__(self):
+    def __init__(self, settings=None):
         super(FrameworkBase, self).__init__()
 
         self.__reset()
 
+        # Each framework can have its own settings object (see make_settings), otherwise the
+        # global fwSettings are used
+        if settings is not None:
+            self.settings = settings
+
         # Box2D Initialization
         self.world = b2World(gravity=(0,-10), doSleep=True)
 
@@ -304,6 +309,13 @@ class FrameworkBase(b2ContactListener):
         """
         raise NotImplementedError()
 
+    def Quit(self):
+        """
+        Stop the main loop, e.g. once an experiment has finished.
+        NOTE: Renderer subclasses must implement this
+        """
+        raise NotImplementedError()
+
     def PreSolve(self, contact, old_manifold):
         """
         This is a critical function when there are many contacts in the world.
@@ -374,6 +386,38 @@ class FrameworkBase(b2ContactListener):
         Override this function with your own Draw to screen
         """
         pass
+
+    def FrameRate(self):
+        """
+        The rate (in frames per second) at which the renderer should draw.
+        """
+        return self.settings.hz
+
+    def Idle(self):
+        """
+        Called by the simulation thread instead of stepping while paused.
+        """
+        sleep(0.05)
+
+    def Finish(self):
+        """
+        Called once the main loop has finished, e.g. to close output files.
+        """
+        pass
+
+    def UseDirtyRects(self):
+        """
+        Return True if everything drawn by DrawWorld and Draw is recorded in
+        self.frameRects, so that only those areas of the screen need updating.
+        """
+        return False
+
+    def DrawWorld(self):
+        """
+        Draw the Box2D world with the debug draw. Override this if the world
+        should not be read from the rendering thread.
+        """
+        self.world.DrawDebugData()
         
 
 def main(test_class):
@@ -385,6 +429,7 @@ def main(test_class):
     if fwSettings.onlyInit:
         return
     test.run()
+    test.Finish()
 
 if __name__=='__main__':
     print('Please run one of the examples directly. This is just the base for all of the frameworks.')
@@ -394,14 +439,21 @@ if __name__=='__main__':
 # framework, then your file should be 'foobar_framework.py' and you should
 # have a class 'FoobarFramework' that derives FrameworkBase. Ensure proper
 # capitalization for portability.
-try:
-    framework_module=__import__('%s_framework' % (fwSettings.backend.lower()), fromlist=['%sFramework' % fwSettings.backend.capitalize()])
-    Framework=getattr(framework_module, '%sFramework' % fwSettings.backend.capitalize())
-except:
-    from sys import exc_info
-    ex=exc_info()[1]
-    print('Unable to import the back-end %s: %s' % (fwSettings.backend, ex))
-    print('Attempting to fall back on the pygame back-end.')
-
-    from pygame_framework import PygameFramework as Framework
+def load_backend(backend):
+    """
+    Import and return the framework class of a back-end, e.g. PygameFramework
+    for 'pygame'. Back-ends are only imported when asked for, so that headless
+    and library use do not load any graphics libraries.
+    """
+    try:
+        framework_module=__import__('%s_framework' % (backend.lower()), fromlist=['%sFramework' % backend.capitalize()])
+        return getattr(framework_module, '%sFramework' % backend.capitalize())
+    except:
+        from sys import exc_info
+        ex=exc_info()[1]
+        print('Unable to import the back-end %s: %s' % (backend, ex))
+        print('Attempting to fall back on the pygame back-end.')
+
+        from pygame_framework import PygameFramework
+        return PygameFramework
 #s/\.Get\(.\)\(.\{-\}\)()/.\L\1\l\2/g
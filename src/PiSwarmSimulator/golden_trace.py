@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Golden traces: the state of a fixed set of seeded beta and omega scenarios, recorded every few ticks, to
+check that a faster engine or mode still simulates the same swarm.
+
+Usage: python golden_trace.py record [--scenario=NAME]...
+       python golden_trace.py compare [--set=name=value]... [--tolerance=1e-4]
+
+record runs the scenarios with the default settings and stores their traces in golden/. compare runs
+them again with the settings given by --set (e.g. --set=controller_mode=vectorised) and reports the
+first tick and robot at which each one diverges. Without --tolerance the comparison is exact, on
+digests of the quantised state; with it, positions and angles may differ by up to the tolerance (in
+simulation units and radians) and the discrete state must match.
+
+The traces in golden/ were recorded with the default settings (controller_mode=robot,
+illumination=raycast). controller_mode=vectorised and illumination=incremental both match them exactly.
+"""
+import os
+import sys
+import json
+import math
+import hashlib
+from optparse import OptionParser
+
+import numpy
+
+from api import create_simulation
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+# name -> settings; every scenario is seeded so that it is reproducible
+SCENARIOS = {
+    "beta_seed1": {"taxis_algorithm": "beta", "beta": 2, "robots": 20, "seed": 1},
+    "beta_seed2": {"taxis_algorithm": "beta", "beta": 4, "robots": 20, "seed": 2},
+    "omega_seed1": {"taxis_algorithm": "omega", "omega": 35, "robots": 20, "seed": 1},
+    "omega_seed2": {"taxis_algorithm": "omega", "omega": 25, "robots": 20, "seed": 2},
+}
+
+DEFAULT_TICKS = 5000
+DEFAULT_EVERY = 50
+QUANTUM = 1e-9  # Continuous values are rounded to multiples of this before hashing
+
+CONTINUOUS = ["x", "y", "angle", "heading"]
+DISCRETE = ["state", "timer", "illuminated", "sensors"]
+
+
+def capture(simulation):
+    # The state of every robot, one array per field
+    robots = simulation.robotlist
+    state = {"x": numpy.zeros(len(robots)), "y": numpy.zeros(len(robots)), "angle": numpy.zeros(len(robots)),
+             "heading": numpy.zeros(len(robots)), "state": numpy.zeros(len(robots), dtype=numpy.int64),
+             "timer": numpy.zeros(len(robots), dtype=numpy.int64),
+             "illuminated": numpy.zeros(len(robots), dtype=numpy.int64),
+             "sensors": numpy.zeros(len(robots), dtype=numpy.int64)}
+    for (index, robot) in enumerate(robots):
+        position = robot.body.position
+        state["x"][index] = position.x
+        state["y"][index] = position.y
+        state["angle"][index] = robot.body.angle
+        state["heading"][index] = robot.headingAngle
+        state["state"][index] = robot.stateCode()
+        state["timer"][index] = getattr(robot, "timer", 0)
+        state["illuminated"][index] = robot.illuminated
+        state["sensors"][index] = sum(1 << sensor.proxid for sensor in robot.IRSensList if sensor.contactObs)
+    return state
+
+
+def digest(state, quantum=QUANTUM):
+    # Hash of the quantised state of the swarm
+    hasher = hashlib.sha256()
+    for name in CONTINUOUS:
+        hasher.update(numpy.round(state[name] / quantum).astype("<i8").tobytes())
+    for name in DISCRETE:
+        hasher.update(state[name].astype("<i8").tobytes())
+    return hasher.hexdigest()
+
+
+def run_trace(settings, ticks=DEFAULT_TICKS, every=DEFAULT_EVERY, quantum=QUANTUM):
+    """
+    Run a headless simulation with the given settings (a dict) and return its trace: the ticks sampled,
+    the digest of every sample (quantised to quantum) and the state of every sample, stacked into
+    (samples, robots) arrays.
+    """
+    simulation = create_simulation(**settings)
+    samples = []
+    simulation.running = True
+    try:
+        while simulation.running and simulation.clock < ticks:
+            simulation.SimulationLoop()
+            if simulation.clock % every == 0:
+                samples.append((simulation.clock, capture(simulation)))
+    finally:
+        simulation.Finish()
+
+    trace = {"tick": numpy.array([tick for (tick, state) in samples], dtype=numpy.int64),
+             "digest": numpy.array([digest(state, quantum) for (tick, state) in samples])}
+    for name in CONTINUOUS + DISCRETE:
+        trace[name] = numpy.array([state[name] for (tick, state) in samples])
+    return trace
+
+
+def trace_path(directory, name):
+    return os.path.join(directory, name + ".npz")
+
+
+def save_trace(path, trace, settings, ticks, every, quantum=QUANTUM):
+    meta = {"settings": settings, "ticks": ticks, "every": every, "quantum": quantum}
+    numpy.savez_compressed(path, meta=numpy.array(json.dumps(meta, sort_keys=True)), **trace)
+
+
+def load_trace(path):
+    if not os.path.exists(path):
+        raise Exception("There is no golden trace %s, record it with: python golden_trace.py record" % (path))
+    with numpy.load(path) as data:
+        trace = dict((name, data[name]) for name in data.files if name != "meta")
+        meta = json.loads(str(data["meta"]))
+    return (trace, meta)
+
+
+def angle_difference(first, second):
+    return numpy.abs((first - second + math.pi) % (2 * math.pi) - math.pi)
+
+
+def compare(golden, candidate, tolerance=None, quantum=QUANTUM):
+    """
+    Compare a candidate trace with a golden one. Returns None if they match, or a dict describing the first
+    divergence: its tick, the first robot that differs, the fields that differ and their values in each trace.
+    Exact comparison (tolerance None) uses the digests, of the state quantised to the quantum both traces
+    were recorded with; otherwise positions and angles may differ by up to tolerance and discrete fields
+    must be equal.
+    """
+    samples = min(len(golden["tick"]), len(candidate["tick"]))
+    for sample in range(samples):
+        if golden["tick"][sample] != candidate["tick"][sample]:
+            return {"tick": int(golden["tick"][sample]), "robot": None, "fields": ["tick"]}
+        if tolerance is None and golden["digest"][sample] == candidate["digest"][sample]:
+            continue
+
+        if golden["x"].shape[1] != candidate["x"].shape[1]:
+            return {"tick": int(golden["tick"][sample]), "robot": None, "fields": ["robots"]}
+        robots = golden["x"].shape[1]
+
+        differs = {}
+        for name in CONTINUOUS:
+            (expected, actual) = (golden[name][sample], candidate[name][sample])
+            if tolerance is None:
+                differs[name] = numpy.round(expected / quantum) != numpy.round(actual / quantum)
+            elif name in ("angle", "heading"):
+                differs[name] = angle_difference(expected, actual) > tolerance
+            else:
+                differs[name] = numpy.abs(expected - actual) > tolerance
+        for name in DISCRETE:
+            differs[name] = golden[name][sample] != candidate[name][sample]
+
+        any_differs = numpy.zeros(robots, dtype=bool)
+        for mask in differs.values():
+            any_differs |= mask
+        if any_differs.any():
+            robot = int(numpy.nonzero(any_differs)[0][0])
+            fields = [name for name in CONTINUOUS + DISCRETE if differs[name][robot]]
+            return {"tick": int(golden["tick"][sample]), "robot": robot, "fields": fields,
+                    "expected": dict((name, golden[name][sample][robot].item()) for name in fields),
+                    "actual": dict((name, candidate[name][sample][robot].item()) for name in fields)}
+
+    if len(golden["tick"]) != len(candidate["tick"]):
+        return {"tick": int(golden["tick"][samples - 1]) if samples else 0, "robot": None, "fields": ["length"]}
+    return None
+
+
+def parse_setting(text):
+    # name=value with numbers converted
+    (name, value) = text.split("=", 1)
+    for convert in (int, float):
+        try:
+            return (name, convert(value))
+        except ValueError:
+            pass
+    return (name, value)
+
+
+if __name__ == '__main__':
+    parser = OptionParser(usage="usage: %prog [options] record | compare")
+    parser.add_option('', '--directory', dest='directory', default=DEFAULT_DIRECTORY, help='directory of the traces')
+    parser.add_option('', '--scenario', dest='scenarios', default=[], action='append',
+                      help='scenario to run, one of ' + ", ".join(sorted(SCENARIOS)) + ' (default: all)')
+    parser.add_option('', '--ticks', dest='ticks', default=DEFAULT_TICKS, type='int', help='ticks to record')
+    parser.add_option('', '--every', dest='every', default=DEFAULT_EVERY, type='int', help='ticks between samples')
+    parser.add_option('', '--set', dest='overrides', default=[], action='append',
+                      help='setting of the engine being compared, as name=value')
+    parser.add_option('', '--tolerance', dest='tolerance', default=None, type='float',
+                      help='compare positions and angles within this tolerance instead of exactly')
+    (options, args) = parser.parse_args()
+
+    if len(args) != 1 or args[0] not in ("record", "compare"):
+        parser.error("give record or compare")
+    names = options.scenarios or sorted(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error("unknown scenario " + name)
+    overrides = dict(parse_setting(setting) for setting in options.overrides)
+
+    if args[0] == "record":
+        if not os.path.exists(options.directory):
+            os.makedirs(options.directory)
+        for name in names:
+            settings = dict(SCENARIOS[name], **overrides)
+            trace = run_trace(settings, options.ticks, options.every)
+            save_trace(trace_path(options.directory, name), trace, settings, options.ticks, options.every)
+            print("%s: %d samples recorded" % (name, len(trace["tick"])))
+        sys.exit(0)
+
+    failures = 0
+    for name in names:
+        (golden, meta) = load_trace(trace_path(options.directory, name))
+        settings = dict(meta["settings"], **overrides)
+        candidate = run_trace(settings, meta["ticks"], meta["every"], meta["quantum"])
+        divergence = compare(golden, candidate, options.tolerance, meta["quantum"])
+        if divergence is None:
+            print("%s: matches (%d samples)" % (name, len(golden["tick"])))
+            continue
+        failures += 1
+        print("%s: diverges at tick %d, robot %s, in %s" % (name, divergence["tick"], divergence["robot"],
+                                                              ", ".join(divergence["fields"])))
+        for field in divergence.get("expected", {}):
+            print("    %s: golden %r, now %r" % (field, divergence["expected"][field], divergence["actual"][field]))
+    sys.exit(1 if failures else 0)
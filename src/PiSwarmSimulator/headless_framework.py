@@ -0,0 +1,41 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Framework back-end that runs without a display (selected with --headless)
+from framework import *
+
+class HeadlessFramework(FrameworkBase):
+    """
+    Steps the simulation as fast as possible, in the calling thread, until Quit
+    is called. Nothing is drawn, and no graphics libraries are loaded.
+    """
+    def __init__(self, settings=None):
+        super(HeadlessFramework, self).__init__(settings)
+        self.running = False
+
+    def run(self):
+        self.running = True
+        while self.running:
+            self.SimulationLoop()
+
+    def Quit(self):
+        self.running = False
+
+    def DrawStringAt(self, x, y, str, color=(229,153,153,255)):
+        pass
+
+    def Print(self, str, color=(229,153,153,255)):
+        pass
@@ -0,0 +1,269 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Incremental illumination (illumination = "incremental"): which robots can see the beacon, worked out
+# analytically and only for robots whose line of sight may have changed.
+#
+# A robot is illuminated when the segment from the beacon to the point where that line meets the robot's
+# body passes no other robot's body (and, behind obstacles, no obstacle edge). When that is evaluated the
+# tracker also keeps the robot's occluder and its slack: how far the nearest other body is from crossing
+# into, or out of, the corridor around the segment, less what single precision can get wrong. The segment
+# and the bodies can then move by up to the slack without changing the answer. Every tick, the distance every robot has moved is added up, and only
+# robots whose own movement (counted twice, as the end of their segment also turns with them) plus the
+# largest movement of any robot since their last evaluation could have used up their slack are evaluated
+# again. In a dense swarm on the move most robots still need evaluating every tick, so each evaluation has
+# to be cheap too.
+#
+# So a segment is not tested against the whole swarm. Every tick that robots are evaluated, the robots
+# are indexed by their distance from the beacon, in rings RING_WIDTH wide, and by their bearing from the
+# beacon within each ring. The only robots that can come within CORRIDOR of a segment are those in rings
+# that reach no further from the beacon than the segment plus CORRIDOR, within an angular window of
+# asin(CORRIDOR / inner radius of the ring) either side of the segment's bearing (the whole of the
+# innermost ring). Only those are tested; every other robot is at least CORRIDOR from the segment, which
+# bounds the slack. The work per evaluation follows the number of robots near the segment.
+#
+# Each evaluation reproduces the raycast of the raycast mode: the nearby bodies are tested the way Box2D
+# tests them, in single precision, so that lines of sight grazing a robot or an obstacle get the same
+# answer. Where the ray meets nothing at all, the robot keeps its illumination, as with the raycast.
+import numpy
+
+from obstacles import SHADOWED, VISIBLE, EDGE
+
+NO_OCCLUDER = -1
+OBSTACLE = -2
+
+EVALUATION_BLOCK = 1 << 12  # Most robots evaluated at once, to bound memory in large swarms
+CORRIDOR = 3  # Distance from a segment, in robot radii, within which robots are tested against it
+RING_WIDTH = 8  # Width of the rings of the index, in robot radii; at least CORRIDOR
+RING_KEY = 8.0  # Spacing of the rings in the index keys, more than the 2 pi range of bearings
+SINGLE = numpy.float32
+# Bound on the error of Box2D's single precision ray tests, relative to the squared distance from the beacon
+# over the robot radius, as a distance
+RAYCAST_ERROR = 16 * float(numpy.finfo(SINGLE).eps)
+
+
+def circle_entries(start, ends, centres, radius):
+    """
+    How far along each ray from start to ends, an (n, 2) array, it enters a circle of radius at each of
+    centres, computed as b2CircleShape::RayCast does in single precision: the fraction of the ray times its
+    squared length, or inf where it misses. Returns that and the squared lengths. All arguments are float32.
+    """
+    s = start - centres
+    b = (s[:, 0] * s[:, 0] + s[:, 1] * s[:, 1]) - radius * radius
+    r = ends - start
+    c = s[:, 0] * r[:, 0] + s[:, 1] * r[:, 1]
+    rr = r[:, 0] * r[:, 0] + r[:, 1] * r[:, 1]
+    sigma = c * c - rr * b
+    with numpy.errstate(invalid="ignore"):
+        a = -(c + numpy.sqrt(sigma))
+    hit = (sigma >= 0) & (rr >= numpy.finfo(SINGLE).eps) & (a >= 0) & (a <= rr)
+    return (numpy.where(hit, a, SINGLE(numpy.inf)), rr)
+
+
+def edge_fractions(start, ends, edges):
+    """
+    The fraction of each ray from start to ends, an (n, 2) array, at which it crosses each of edges, an
+    (m, 2, 2) array, computed as b2EdgeShape::RayCast does in single precision: an (n, m) array, inf where
+    the ray misses the edge. All arguments are float32.
+    """
+    d = (ends - start)[:, None, :]
+    (v1, v2) = (edges[None, :, 0, :], edges[None, :, 1, :])
+    e = v2 - v1
+    (nx, ny) = (e[..., 1], -e[..., 0])
+    length = numpy.sqrt(nx * nx + ny * ny)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        (nx, ny) = (nx * (SINGLE(1) / length), ny * (SINGLE(1) / length))
+        numerator = nx * (v1[..., 0] - start[0]) + ny * (v1[..., 1] - start[1])
+        denominator = nx * d[..., 0] + ny * d[..., 1]
+        t = numerator / denominator
+        q = start + t[..., None] * d
+        rr = e[..., 0] * e[..., 0] + e[..., 1] * e[..., 1]
+        along = ((q[..., 0] - v1[..., 0]) * e[..., 0] + (q[..., 1] - v1[..., 1]) * e[..., 1]) / rr
+    hit = ((length >= numpy.finfo(SINGLE).eps) & (denominator != 0) & (t >= 0) & (t <= 1) & (rr != 0) &
+           (along >= 0) & (along <= 1))
+    return numpy.where(hit, t, SINGLE(numpy.inf))
+
+
+class IlluminationTracker(object):
+
+    def __init__(self, simulation, robot_radius):
+        self.swarm = simulation.swarm
+        self.beacon = numpy.array(tuple(simulation.beacon_position), dtype=numpy.float64)
+        self.radius = robot_radius
+        self.visibility = simulation.visibility
+        self.edges = simulation.obstacles.edges if simulation.obstacles is not None else None
+
+        # The same in single precision, as Box2D has them
+        self.beacon_single = self.beacon.astype(SINGLE)
+        self.radius_single = SINGLE(robot_radius)
+        self.edges_single = self.edges.astype(SINGLE) if self.edges is not None else None
+
+        # Robots this close to the beacon are evaluated every tick, as their segment turns quickly
+        self.near_beacon = 4 * robot_radius + simulation.beacon_radius
+
+        num_robots = len(self.swarm)
+        self.illuminated = numpy.zeros(num_robots, dtype=bool)
+        self.occluder = numpy.full(num_robots, NO_OCCLUDER, dtype=numpy.int64)
+        self.slack = numpy.full(num_robots, -numpy.inf)  # Forces the first evaluation
+
+        # Distance moved by every robot, and sum of the largest distance moved by any robot in each tick
+        self.positions = self.swarm.positions.copy()
+        self.travelled = numpy.zeros(num_robots)
+        self.max_travelled = 0.0
+        self.travelled_at = numpy.zeros(num_robots)  # travelled and max_travelled at the last evaluation
+        self.max_travelled_at = numpy.zeros(num_robots)
+
+        self.evaluations = 0  # Robots evaluated so far
+
+    def update(self, mask=None):
+        """
+        Return the illumination of every robot at the current positions, evaluating only the robots that
+        need it. If mask is given, only the robots in it are evaluated and the others keep their last result.
+        """
+        positions = self.swarm.positions
+        moved = numpy.sqrt(((positions - self.positions) ** 2).sum(axis=1))
+        self.positions[:] = positions
+        self.travelled += moved
+        if len(moved):
+            self.max_travelled += moved.max()
+
+        dirty = (2 * (self.travelled - self.travelled_at) + (self.max_travelled - self.max_travelled_at) >=
+                 self.slack)
+        if self.visibility is not None:
+            classes = self.visibility.classify_all(positions)
+            shadowed = classes == SHADOWED
+            self.illuminated[shadowed] = False
+            self.occluder[shadowed] = OBSTACLE
+            self.slack[shadowed] = -numpy.inf  # Evaluate once out of the shadow
+            dirty &= ~shadowed
+            dirty |= classes == EDGE  # Whatever their slack, as they may have just come out of a VISIBLE cell
+        else:
+            classes = None
+        if mask is not None:
+            dirty &= mask
+
+        rows = numpy.nonzero(dirty)[0]
+        if len(rows):
+            self.index()
+        for start in range(0, len(rows), EVALUATION_BLOCK):
+            self.evaluate(rows[start:start + EVALUATION_BLOCK], classes)
+        return self.illuminated
+
+    def index(self):
+        # Sort the robots by ring, then bearing from the beacon
+        offsets = self.swarm.positions - self.beacon
+        rings = numpy.floor(numpy.sqrt((offsets ** 2).sum(axis=1)) / (RING_WIDTH * self.radius))
+        keys = rings * RING_KEY + numpy.arctan2(offsets[:, 1], offsets[:, 0]) + numpy.pi
+        self.order = numpy.argsort(keys, kind="mergesort")
+        self.keys = keys[self.order]
+        self.rings = numpy.unique(rings)  # Rings with robots in
+
+    def candidates(self, segments, length):
+        """
+        Pairs (segment, robot) of every robot that may be within CORRIDOR of each segment, as two arrays
+        sorted by segment.
+        """
+        corridor = CORRIDOR * self.radius
+        ring_width = RING_WIDTH * self.radius
+
+        # The occupied rings each segment reaches
+        reached = numpy.searchsorted(self.rings, (length + corridor) / ring_width, side="right")
+        pair_segment = numpy.repeat(numpy.arange(len(segments)), reached)
+        pair_ring = self.rings[numpy.arange(len(pair_segment)) - numpy.repeat(numpy.cumsum(reached) - reached, reached)]
+
+        # Angular window of each pair, as up to three ranges of keys so that windows can wrap around
+        inner = pair_ring * ring_width
+        window = numpy.where(inner > corridor, numpy.arcsin(numpy.minimum(corridor / numpy.maximum(inner, 1e-12), 1.0)),
+                             numpy.pi)
+        bearing = numpy.arctan2(segments[:, 1], segments[:, 0])[pair_segment] + numpy.pi
+        starts = []
+        counts = []
+        for shift in (-2 * numpy.pi, 0.0, 2 * numpy.pi):
+            low = pair_ring * RING_KEY + numpy.clip(bearing - window + shift, 0.0, 2 * numpy.pi)
+            high = pair_ring * RING_KEY + numpy.clip(bearing + window + shift, 0.0, 2 * numpy.pi)
+            first = numpy.searchsorted(self.keys, low)
+            starts.append(first)
+            counts.append(numpy.searchsorted(self.keys, high) - first)
+        starts = numpy.stack(starts, axis=1).ravel()
+        counts = numpy.stack(counts, axis=1).ravel()
+        ranges = numpy.repeat(pair_segment, 3)
+
+        segment = numpy.repeat(ranges, counts)
+        within = numpy.arange(len(segment)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        return (segment, self.order[numpy.repeat(starts, counts) + within])
+
+    def evaluate(self, rows, classes):
+        positions = self.swarm.positions
+        self.evaluations += len(rows)
+
+        # Segments from the beacon to where the line of sight meets each robot's body
+        towards = positions[rows] - self.beacon
+        distance = numpy.sqrt((towards ** 2).sum(axis=1))
+        segments = towards * ((distance - self.radius) / numpy.maximum(distance, 1e-12))[:, None]
+        length = numpy.maximum(distance - self.radius, 0.0)
+
+        # Distance from the robots near each segment to it, ignoring the robot at the end of the segment
+        (segment, robot) = self.candidates(segments, length)
+        keep = robot != rows[segment]
+        (segment, robot) = (segment[keep], robot[keep])
+        offsets = positions[robot] - self.beacon
+        length_sq = numpy.maximum((segments[segment] ** 2).sum(axis=1), 1e-12)
+        along = numpy.clip((offsets * segments[segment]).sum(axis=1) / length_sq, 0.0, 1.0)
+        gaps = numpy.sqrt(((offsets - along[:, None] * segments[segment]) ** 2).sum(axis=1))
+        clearance = gaps - self.radius
+
+        # Every robot that was not tested is at least CORRIDOR from the segment
+        slack = numpy.full(len(rows), (CORRIDOR - 1) * self.radius)
+        if len(segment):
+            firsts = numpy.nonzero(numpy.diff(segment, prepend=-1))[0]
+            slack[segment[firsts]] = numpy.minimum(slack[segment[firsts]],
+                                                   numpy.minimum.reduceat(numpy.abs(clearance), firsts))
+        slack -= RAYCAST_ERROR * (distance + CORRIDOR * self.radius) ** 2 / self.radius  # Less rounding
+
+        # Which robots block the ray from the beacon to the robot's centre, and the closest of them, the
+        # occluder, as the raycast finds them: a robot blocks if the ray enters it before the robot itself
+        ends = positions[rows].astype(SINGLE)
+        (own, ray_sq) = circle_entries(self.beacon_single, ends, ends, self.radius_single)
+        entry = circle_entries(self.beacon_single, ends[segment], positions[robot].astype(SINGLE),
+                               self.radius_single)[0]
+        occluder = numpy.full(len(rows), NO_OCCLUDER, dtype=numpy.int64)
+        nearest = numpy.full(len(rows), numpy.inf, dtype=SINGLE)
+        blocked = numpy.nonzero(entry < own[segment])[0]
+        if len(blocked):
+            closest = blocked[numpy.lexsort((entry[blocked], segment[blocked]))]
+            (blocked_segments, firsts) = numpy.unique(segment[closest], return_index=True)
+            occluder[blocked_segments] = robot[closest[firsts]]
+            nearest[blocked_segments] = entry[closest[firsts]]
+        hit = numpy.isfinite(own) | numpy.isfinite(nearest)
+
+        # Robots near the beacon or near the edge of an obstacle's shadow are evaluated every tick
+        slack[distance < self.near_beacon] = -numpy.inf
+        if classes is not None:
+            edge = classes[rows] != VISIBLE
+            if edge.any():
+                crossing = edge_fractions(self.beacon_single, ends[edge], self.edges_single).min(axis=1)
+                closer = crossing < numpy.minimum(own[edge], nearest[edge]) / ray_sq[edge]
+                occluder[numpy.nonzero(edge)[0][closer]] = OBSTACLE
+                hit[edge] |= numpy.isfinite(crossing)
+                slack[edge] = -numpy.inf
+
+        # Where the ray meets nothing, the robot keeps its illumination and is evaluated again next tick
+        slack[~hit] = -numpy.inf
+        self.occluder[rows[hit]] = occluder[hit]
+        self.illuminated[rows[hit]] = occluder[hit] == NO_OCCLUDER
+        self.slack[rows] = slack
+        self.travelled_at[rows] = self.travelled[rows]
+        self.max_travelled_at[rows] = self.max_travelled
@@ -0,0 +1,159 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Writes the simulator's logs from a background thread, so that a slow disk does not stall the simulation.
+#
+# The simulation only copies each row of numbers into a preallocated batch. Full batches are handed to the
+# writer thread, which writes them out, then returns the batch for reuse. CSV logs are formatted exactly as
+# the simulator always has (str() of each value); chunked logs store each batch as a compressed chunk, see
+# chunked_log.py. There is a fixed number of batches: when the writer falls that far behind, the
+# simulation waits for a batch to come back rather than using more memory.
+#
+# The log is flushed and fsynced every fsync_every batches and when it is closed, so after a crash it holds
+# every row up to the last sync. Logs still open when the interpreter exits are closed then.
+import os
+import atexit
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # Python 2
+
+import numpy
+
+from chunked_log import ChunkedLogWriter
+
+# Columns of the simulator's logs, and the type of their values, by number of columns (experiment and advanced)
+LOG_COLUMNS = {2: ["time", "beacon_distance"],
+               4: ["time", "beacon_distance", "centroid_distance", "lost_robots"]}
+LOG_FORMATS = {2: [float, float],
+               4: [float, float, float, int]}
+
+# File extension of each log_format
+LOG_EXTENSIONS = {"csv": ".log", "chunked": ".clog"}
+
+
+def log_extension(settings):
+    if settings.log_format not in LOG_EXTENSIONS:
+        raise Exception("settings.log_format must be either 'csv' or 'chunked'")
+    return LOG_EXTENSIONS[settings.log_format]
+
+
+class CsvOutput(object):
+    # Headerless CSV, with every value converted with its column's format and written with str()
+
+    def __init__(self, path, formats):
+        self.formats = formats
+        self.logfile = open(path, 'w')
+
+    def write(self, rows):
+        formats = self.formats
+        self.logfile.write("".join(",".join([str(convert(value)) for (convert, value) in zip(formats, row)]) + "\n"
+                                   for row in rows.tolist()))
+
+    def sync(self):
+        self.logfile.flush()
+        os.fsync(self.logfile.fileno())
+
+    def close(self):
+        self.sync()
+        self.logfile.close()
+
+
+class LogWriter(object):
+
+    def __init__(self, path, columns, batch_rows=1024, batches=4, fsync_every=16, log_format="csv", decimals=-1):
+        """
+        Log rows of one number per column in columns, one of the LOG_COLUMNS, to path as log_format
+        ("csv" or "chunked"). Chunked logs keep decimals decimal places of each value, or exact values if
+        decimals is negative.
+        """
+        self.path = path
+        self.fsync_every = fsync_every
+        formats = LOG_FORMATS[len(columns)]
+        if log_format == "chunked":
+            self.output = ChunkedLogWriter(path, columns, formats, decimals)
+        else:
+            self.output = CsvOutput(path, formats)
+
+        self.free = queue.Queue()
+        self.full = queue.Queue()
+        for batch in range(max(2, batches)):
+            self.free.put(numpy.zeros((max(1, batch_rows), len(columns))))
+        self.batch = self.free.get()
+        self.rows = 0
+
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="log writer " + os.path.basename(path))
+        self.thread.daemon = True
+        self.thread.start()
+        atexit.register(self.close)
+
+    def append(self, values):
+        # Add a row to the log
+        if self.closed:
+            raise Exception("The log %s has been closed" % (self.path))
+        self.batch[self.rows] = values
+        self.rows += 1
+        if self.rows == len(self.batch):
+            self.submit()
+
+    def submit(self):
+        # Hand the current batch to the writer and wait for an empty one
+        self.check()
+        self.full.put((self.batch, self.rows))
+        self.batch = self.free.get()
+        self.rows = 0
+
+    def check(self):
+        if self.error is not None:
+            raise Exception("Writing the log %s failed: %s" % (self.path, self.error))
+
+    def close(self):
+        # Write out the remaining rows, wait for the writer and sync the log to disk
+        if self.closed:
+            return
+        self.closed = True
+        if self.rows:
+            self.full.put((self.batch, self.rows))
+        self.full.put(None)
+        self.thread.join()
+        try:
+            self.output.close()
+        except Exception as error:
+            if self.error is None:
+                self.error = error
+        self.check()
+
+    def run(self):
+        # The writer thread
+        written = 0
+        while True:
+            item = self.full.get()
+            if item is None:
+                break
+            (batch, rows) = item
+            if self.error is None:
+                try:
+                    self.output.write(batch[:rows])
+                    written += 1
+                    if self.fsync_every > 0 and written % self.fsync_every == 0:
+                        self.output.sync()
+                except Exception as error:
+                    # Keep returning batches, so the simulation finds out the next time it submits one
+                    self.error = error
+            self.free.put(batch)
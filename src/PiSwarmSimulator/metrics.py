@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Evaluates swarm metrics over recorded trajectory files (see trajectory.py) instead of re-running simulations.
+
+Usage: python metrics.py [--metrics=beacon_distance,centroid_distance] [--output=metrics/] logs/*.traj
+
+Each run gets a headerless CSV file named after its trajectory file, with the time in the first column and
+one column per metric, in the same layout as the simulator's own logs, so the R scripts in data_analysis
+can read them unchanged.
+
+New metrics are functions of a block of samples, registered with the @metric decorator, returning one value
+per sample. They can live in their own module and be loaded with --module.
+"""
+import os
+import sys
+import importlib
+from multiprocessing import Pool
+from optparse import OptionParser
+
+import numpy
+
+from trajectory import TrajectoryReader
+from swarm_state import count_lost
+
+# Registered metrics, by name
+METRICS = {}
+
+# Columns of the simulator's advanced logs
+DEFAULT_METRICS = ["beacon_distance", "centroid_distance", "lost_robots"]
+
+# Number of samples evaluated at once, to bound memory use on long runs of large swarms
+BLOCK_SAMPLES = 8192
+
+
+def metric(name):
+    # Decorator registering a metric function under name
+    def register(function):
+        METRICS[name] = function
+        return function
+    return register
+
+
+class SampleBlock(object):
+    # A block of consecutive samples of a run, as float64/bool arrays of shape (samples, robots)
+    def __init__(self, trajectory, start, stop):
+        self.meta = trajectory.meta
+        self.tick = trajectory.tick[start:stop].astype(numpy.int64)
+        self.x = trajectory.x[start:stop].astype(numpy.float64)
+        self.y = trajectory.y[start:stop].astype(numpy.float64)
+        self.angle = trajectory.angle[start:stop].astype(numpy.float64)
+        self.state = numpy.array(trajectory.state[start:stop])
+        self.illuminated = trajectory.illuminated()[start:stop]
+        self.contacts = numpy.array(trajectory.contacts[start:stop])
+
+    def __len__(self):
+        return len(self.tick)
+
+    def to_cm(self, units):
+        return units * self.meta.get("unitsize", 10.0)
+
+    def centroid(self):
+        return (self.x.mean(axis=1), self.y.mean(axis=1))
+
+
+@metric("beacon_distance")
+def beacon_distance(block):
+    # Distance of the swarm centroid from the beacon, in cm
+    (cx, cy) = block.centroid()
+    (bx, by) = block.meta["beacon_position"]
+    return block.to_cm(numpy.hypot(cx - bx, cy - by))
+
+
+@metric("centroid_distance")
+def centroid_distance(block):
+    # Mean distance of the robots from the swarm centroid, in cm
+    (cx, cy) = block.centroid()
+    return block.to_cm(numpy.hypot(block.x - cx[:, None], block.y - cy[:, None]).mean(axis=1))
+
+
+@metric("lost_robots")
+def lost_robots(block):
+    # Number of robots with no other robot within wireless range, as SwarmSimulation.num_lost_robots
+    wireless_range = block.meta.get("wireless_range", 50) / block.meta.get("unitsize", 10.0)
+    return count_lost(block.x, block.y, wireless_range)
+
+
+@metric("illuminated_robots")
+def illuminated_robots(block):
+    # Number of robots with line of sight to the beacon
+    return block.illuminated.sum(axis=1)
+
+
+def evaluate(path, names):
+    # Evaluate the named metrics over a whole run, returning the time column and one array per metric
+    trajectory = TrajectoryReader(path)
+    ticklength = trajectory.meta.get("ticklength", 0.25)
+    columns = [[] for name in names]
+    for start in range(0, len(trajectory), BLOCK_SAMPLES):
+        block = SampleBlock(trajectory, start, min(start + BLOCK_SAMPLES, len(trajectory)))
+        for (column, name) in zip(columns, names):
+            column.append(numpy.asarray(METRICS[name](block), dtype=numpy.float64))
+
+    time = trajectory.tick.astype(numpy.float64) * ticklength
+    return (time, [numpy.concatenate(column) if column else numpy.zeros(0) for column in columns])
+
+
+def output_path(path, output_dir):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + ".log")
+
+
+def write_log(path, time, values):
+    # Headerless CSV, formatted like the simulator's logs
+    numpy.savetxt(path, numpy.column_stack([time] + values), fmt="%.12g", delimiter=",")
+
+
+def process_run(job):
+    (path, names, output_dir) = job
+    (time, values) = evaluate(path, names)
+    destination = output_path(path, output_dir)
+    write_log(destination, time, values)
+    return (destination, len(time))
+
+
+def load_modules(modules):
+    # Importing a module registers the metrics it defines
+    for module in modules:
+        importlib.import_module(module)
+
+
+def process_runs(paths, names, output_dir, processes=None, modules=()):
+    """
+    Evaluate the named metrics over every trajectory file in paths, one worker process per run, writing one
+    log per run into output_dir. Returns a list of (log path, number of samples).
+    """
+    load_modules(modules)
+    unknown = [name for name in names if name not in METRICS]
+    if unknown:
+        raise Exception("Unknown metrics: " + ", ".join(unknown))
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    jobs = [(path, names, output_dir) for path in paths]
+    if processes == 1 or len(jobs) <= 1:
+        return [process_run(job) for job in jobs]
+
+    pool = Pool(processes, initializer=load_modules, initargs=(list(modules),))
+    try:
+        return pool.map(process_run, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+if __name__ == '__main__':
+    parser = OptionParser(usage="usage: %prog [options] trajectory_files")
+    parser.add_option('', '--metrics', dest='metrics', default=",".join(DEFAULT_METRICS),
+                      help='comma separated metrics to evaluate, in column order')
+    parser.add_option('', '--output', dest='output', default='metrics/', help='directory to write logs to')
+    parser.add_option('', '--processes', dest='processes', default=None, type='int',
+                      help='number of worker processes (default: one per core)')
+    parser.add_option('', '--module', dest='modules', default=[], action='append',
+                      help='module defining extra metrics (may be repeated)')
+    parser.add_option('', '--list', dest='list', default=False, action='store_true',
+                      help='list the available metrics and exit')
+    (options, args) = parser.parse_args()
+
+    if options.list:
+        load_modules(options.modules)
+        for name in sorted(METRICS):
+            print(name)
+        sys.exit(0)
+
+    if not args:
+        parser.print_help()
+        sys.exit(1)
+
+    names = [name for name in options.metrics.split(",") if name]
+    for (path, samples) in process_runs(args, names, options.output, options.processes, options.modules):
+        print("%s: %d samples" % (path, samples))
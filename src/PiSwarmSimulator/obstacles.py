@@ -0,0 +1,296 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Static obstacles inside the arena, and a precomputed map of the beacon's shadow behind them.
+#
+# Obstacles are loaded from a file given by the obstacles setting, in cm, with x from -250 to 250 and y from
+# 0 (the beacon's wall) to 500:
+#   - a JSON file: {"polygons": [[[x, y], [x, y], ...], ...]}, any simple polygons
+#   - an occupancy image (e.g. PNG, loaded with pygame) or a .npy array covering the whole arena, in which
+#     dark pixels (or non-zero values) are obstacles; the top row is the far wall
+#
+# Obstacles never move, so whether the beacon can see a point past them only has to be worked out once.
+# VisibilityMap classifies the cells of a raster over the arena as wholly visible, wholly shadowed or
+# neither. A robot in a shadowed cell cannot be illuminated, so only robots in the other cells are raycast,
+# and in visible cells only other robots can be in the way. Maps are cached on disk, keyed by the geometry,
+# and memory mapped read-only so that the workers of a sweep share one copy.
+import os
+import json
+import hashlib
+
+import numpy
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "visibility")
+
+# Cell classes of a VisibilityMap
+SHADOWED = 0
+VISIBLE = 1
+EDGE = 2  # Part of the cell may be in shadow, raycast against everything
+
+MAP_VERSION = 3  # Of the way maps are built; part of the cache key, so maps built an older way are rebuilt
+SIGHTLINE_MARGIN = 64 * float(numpy.finfo(numpy.float32).eps)  # Relative to the size of the arena
+
+
+def load_polygons(path, arena_size):
+    """
+    Read obstacle polygons, in cm, from a JSON file or an occupancy image covering an arena of arena_size
+    (width, height) cm.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path) as obstacle_file:
+            data = json.load(obstacle_file)
+        polygons = data["polygons"] if isinstance(data, dict) else data
+        return [[(float(x), float(y)) for (x, y) in polygon] for polygon in polygons]
+    elif extension == ".npy":
+        occupied = numpy.load(path) != 0
+    else:
+        import pygame # Only load pygame when it is needed
+        pixels = pygame.surfarray.array3d(pygame.image.load(path)).swapaxes(0, 1)  # (rows, columns, rgb)
+        occupied = pixels.mean(axis=2) < 128
+    return occupancy_polygons(occupied, arena_size)
+
+
+def occupancy_polygons(occupied, arena_size):
+    """
+    Rectangles covering the occupied cells of a boolean grid stretched over the arena, merging runs of
+    cells along rows and identical runs in consecutive rows.
+    """
+    (rows, columns) = occupied.shape
+    (width, height) = arena_size
+    cell = (float(width) / columns, float(height) / rows)
+
+    rectangles = []  # (first column, end column, first row, end row)
+    open_runs = {}  # (first column, end column) -> first row of a rectangle still growing downwards
+    for row in range(rows + 1):
+        runs = set()
+        if row < rows:
+            padded = numpy.concatenate([[False], occupied[row], [False]])
+            changes = numpy.nonzero(padded[1:] != padded[:-1])[0]
+            runs = set(zip(changes[0::2].tolist(), changes[1::2].tolist()))
+        for run in list(open_runs):
+            if run not in runs:
+                rectangles.append(run + (open_runs.pop(run), row))
+        for run in runs:
+            if run not in open_runs:
+                open_runs[run] = row
+
+    polygons = []
+    for (first_column, end_column, first_row, end_row) in sorted(rectangles):
+        (left, right) = (-width / 2.0 + first_column * cell[0], -width / 2.0 + end_column * cell[0])
+        (top, bottom) = (height - first_row * cell[1], height - end_row * cell[1])
+        polygons.append([(left, bottom), (left, top), (right, top), (right, bottom)])
+    return polygons
+
+
+def polygon_edges(polygons):
+    # (edges, 2, 2) array of the edges of closed polygons
+    edges = []
+    for polygon in polygons:
+        for index in range(len(polygon)):
+            edges.append((polygon[index], polygon[(index + 1) % len(polygon)]))
+    return numpy.array(edges, dtype=numpy.float64).reshape(-1, 2, 2)
+
+
+def cross(ax, ay, bx, by):
+    return ax * by - ay * bx
+
+
+def visible_from(source, points, edges):
+    """
+    Whether the segment from source to each of points, an (..., 2) array, misses every edge. Segments
+    touching an edge count as blocked.
+    """
+    (sx, sy) = source
+    (px, py) = (points[..., 0], points[..., 1])
+    visible = numpy.ones(points.shape[:-1], dtype=bool)
+    for ((x1, y1), (x2, y2)) in edges.tolist():
+        # The segment and the edge cross if each one's end points are on opposite sides of the other
+        side_source = cross(x2 - x1, y2 - y1, sx - x1, sy - y1)
+        side_point = cross(x2 - x1, y2 - y1, px - x1, py - y1)
+        side_first = cross(px - sx, py - sy, x1 - sx, y1 - sy)
+        side_second = cross(px - sx, py - sy, x2 - sx, y2 - sy)
+        visible &= ~((side_source * side_point <= 0) & (side_first * side_second <= 0))
+    return visible
+
+
+def shadows_cells(source, corners, edge):
+    """
+    Whether edge casts a shadow from source over the whole of each cell, given by the (..., 4, 2) array of
+    its corners. The shadow of an edge is convex, so the cell is inside it if its corners are; corners on
+    the border of the shadow count as lit.
+    """
+    (sx, sy) = source
+    ((x1, y1), (x2, y2)) = edge
+    (px, py) = (corners[..., 0], corners[..., 1])
+    side_source = cross(x2 - x1, y2 - y1, sx - x1, sy - y1)
+    side_point = cross(x2 - x1, y2 - y1, px - x1, py - y1)
+    side_first = cross(px - sx, py - sy, x1 - sx, y1 - sy)
+    side_second = cross(px - sx, py - sy, x2 - sx, y2 - sy)
+    return ((side_source * side_point < 0) & (side_first * side_second < 0)).all(axis=-1)
+
+
+def crosses_sightlines(source, corners, edge, margin=0.0):
+    """
+    Whether edge comes within margin of any segment from source to a point of each cell, given by the
+    (..., 4, 2) array of its corners: whether it meets the convex hull of source and the cell, grown by
+    margin. Tested on the separating axes of the edge and the hull; touching counts as meeting.
+    """
+    (sx, sy) = source
+    ((x1, y1), (x2, y2)) = edge
+    hull = numpy.concatenate([numpy.broadcast_to(numpy.array(source, dtype=numpy.float64),
+                                                 corners.shape[:-2] + (1, 2)), corners], axis=-2)
+    axes = [(y1 - y2, x2 - x1), (1.0, 0.0), (0.0, 1.0)]
+    axes += [(sy - corners[..., corner, 1], corners[..., corner, 0] - sx) for corner in range(4)]
+    meets = numpy.ones(corners.shape[:-2], dtype=bool)
+    for (ax, ay) in axes:
+        ax = numpy.asarray(ax)[..., None]
+        ay = numpy.asarray(ay)[..., None]
+        projected = hull[..., 0] * ax + hull[..., 1] * ay
+        (first, second) = ((x1 * ax + y1 * ay)[..., 0], (x2 * ax + y2 * ay)[..., 0])
+        grown = margin * numpy.sqrt(ax * ax + ay * ay)[..., 0]
+        meets &= ~((numpy.maximum(first, second) < projected.min(axis=-1) - grown) |
+                   (numpy.minimum(first, second) > projected.max(axis=-1) + grown))
+    return meets
+
+
+def inside_polygons(points, polygons):
+    # Whether each of points, an (n, 2) array, lies inside any of the polygons (even-odd rule)
+    inside = numpy.zeros(len(points), dtype=bool)
+    for polygon in polygons:
+        crossings = numpy.zeros(len(points), dtype=bool)
+        for ((x1, y1), (x2, y2)) in polygon_edges([polygon]).tolist():
+            straddles = (y1 > points[:, 1]) != (y2 > points[:, 1])
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                x = x1 + (points[:, 1] - y1) * (x2 - x1) / (y2 - y1)
+            crossings ^= straddles & (points[:, 0] < x)
+        inside |= crossings
+    return inside
+
+
+def distance_to_edges(points, edges):
+    # Distance from each of points, an (n, 2) array, to the nearest edge
+    nearest = numpy.full(len(points), numpy.inf)
+    for (start, end) in edges:
+        direction = end - start
+        length_sq = max(numpy.dot(direction, direction), 1e-12)
+        along = numpy.clip(numpy.dot(points - start, direction) / length_sq, 0.0, 1.0)
+        closest = start + along[:, None] * direction
+        nearest = numpy.minimum(nearest, numpy.sqrt(((points - closest) ** 2).sum(axis=1)))
+    return nearest
+
+
+class Obstacles(object):
+    """
+    Static obstacles, as closed edge chains on one static body, in simulation units.
+    """
+    def __init__(self, world, polygons):
+        self.polygons = [[tuple(vertex) for vertex in polygon] for polygon in polygons]
+        self.edges = polygon_edges(self.polygons)
+        self.body = world.CreateBody(position=(0, 0), userData=self)
+        for polygon in self.polygons:
+            self.body.CreateEdgeChain(polygon + [polygon[0]])
+
+    def blocked(self, points, radius):
+        # Whether circles of radius at points overlap an obstacle
+        points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+        return inside_polygons(points, self.polygons) | (distance_to_edges(points, self.edges) < radius)
+
+
+class VisibilityMap(object):
+    """
+    Raster of the beacon's visibility past the static obstacles, with cells of size cell starting at origin.
+
+    Every cell is tested as a whole, not sampled. A cell is VISIBLE if no obstacle edge comes near any line of
+    sight from the beacon to it, SHADOWED if one edge shadows all of it, and EDGE otherwise. Near means
+    within what Box2D's single precision raycast can get wrong, so the raycast never hits an edge from a
+    VISIBLE cell. A thin shadow or beam
+    that slips between a cell's corners therefore makes it EDGE. Cells shadowed only by several edges together
+    are EDGE too, which costs raycasts but never changes a result.
+    """
+    def __init__(self, classes, origin, cell):
+        self.classes = classes
+        self.origin = origin
+        self.cell = cell
+
+    @classmethod
+    def build(cls, edges, beacon, bounds, cell):
+        (xmin, ymin, xmax, ymax) = bounds
+        columns = int(numpy.ceil((xmax - xmin) / cell))
+        rows = int(numpy.ceil((ymax - ymin) / cell))
+        (ys, xs) = numpy.mgrid[0:rows + 1, 0:columns + 1]
+        points = numpy.dstack([xmin + xs * cell, ymin + ys * cell])
+        corners = numpy.stack([points[:-1, :-1], points[:-1, 1:], points[1:, 1:], points[1:, :-1]], axis=2)
+
+        # A cell can only be VISIBLE if its corners are, or SHADOWED if they are not, so only those are tested
+        visible = visible_from(beacon, points, edges).astype(numpy.int8)
+        count = visible[:-1, :-1] + visible[1:, :-1] + visible[:-1, 1:] + visible[1:, 1:]
+        classes = numpy.full((rows, columns), EDGE, dtype=numpy.uint8)
+
+        margin = SIGHTLINE_MARGIN * max(numpy.abs(bounds).max(), numpy.abs(beacon).max())
+        lit = numpy.nonzero(count == 4)
+        clear = numpy.ones(len(lit[0]), dtype=bool)
+        dark = numpy.nonzero(count == 0)
+        shadowed = numpy.zeros(len(dark[0]), dtype=bool)
+        for edge in edges.tolist():
+            clear &= ~crosses_sightlines(beacon, corners[lit], edge, margin)
+            shadowed |= shadows_cells(beacon, corners[dark], edge)
+        classes[lit[0][clear], lit[1][clear]] = VISIBLE
+        classes[dark[0][shadowed], dark[1][shadowed]] = SHADOWED
+        return cls(classes, (xmin, ymin), cell)
+
+    @classmethod
+    def cached(cls, edges, beacon, bounds, cell, directory=DEFAULT_DIRECTORY):
+        """
+        Load the map for this geometry from directory, building and saving it first if needed. The map is
+        memory mapped read-only.
+        """
+        description = {"edges": numpy.round(edges, 9).tolist(), "beacon": list(beacon), "bounds": list(bounds),
+                       "cell": cell, "version": MAP_VERSION}
+        key = hashlib.sha256(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+        path = os.path.join(directory, "visibility_%s.npy" % (key))
+        if not os.path.exists(path):
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            built = cls.build(edges, beacon, bounds, cell)
+            temporary = path + ".%d.tmp" % (os.getpid())
+            with open(temporary, "wb") as map_file:
+                numpy.save(map_file, built.classes)
+            os.rename(temporary, path)
+        return cls(numpy.load(path, mmap_mode="r"), (bounds[0], bounds[1]), cell)
+
+    def classify(self, position):
+        # Class of the cell containing position; EDGE outside the map
+        column = int((position[0] - self.origin[0]) // self.cell)
+        row = int((position[1] - self.origin[1]) // self.cell)
+        if 0 <= row < self.classes.shape[0] and 0 <= column < self.classes.shape[1]:
+            return self.classes[row, column]
+        return EDGE
+
+    def classify_all(self, positions):
+        # Classes of the cells containing each of positions, an (n, 2) array
+        columns = numpy.floor((positions[:, 0] - self.origin[0]) / self.cell).astype(numpy.int64)
+        rows = numpy.floor((positions[:, 1] - self.origin[1]) / self.cell).astype(numpy.int64)
+        inside = ((rows >= 0) & (rows < self.classes.shape[0]) & (columns >= 0) & (columns < self.classes.shape[1]))
+        classes = numpy.full(len(positions), EDGE, dtype=numpy.uint8)
+        classes[inside] = self.classes[rows[inside], columns[inside]]
+        return classes
+
+
+def file_hash(path):
+    # Hash of an obstacle file, so results can be cached by its contents rather than its name
+    with open(path, "rb") as obstacle_file:
+        return hashlib.sha256(obstacle_file.read()).hexdigest()
@@ -3,6 +3,8 @@ from robot import *
 
 class OmegaController(Robot):
 
+    __slots__ = ["omega_ticks", "wireless_range", "srange"]
+
     def __init__(self, framework, robotid, position):
 
         super(OmegaController, self).__init__(framework, robotid, position)
@@ -75,8 +77,9 @@ class OmegaController(Robot):
         #  iterate through all other robots and collect positions
         for another_robot in self.framework.robotlist:
             if self != another_robot:
-                xpos += another_robot.body.position.x
-                ypos += another_robot.body.position.y
+                (x, y) = another_robot.position
+                xpos += x
+                ypos += y
 
         #  find the number of robots in the main swarm
         num_robots = len(self.framework.robotlist) - 1
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Searches for the best beta/omega, wireless_range and robots settings with successive halving or Hyperband.
+
+Usage: python optimiser.py --taxis_algorithm=beta --beta=2,4,6,8,10,12,14,16,18 [--method=hyperband]
+       python optimiser.py --taxis_algorithm=omega --omega=20,25,30,35,40 --wireless_range=30,50,70
+
+Every configuration is first run for a short horizon (min_ticks) on every seed. Only the best 1/eta of them
+are promoted to a horizon eta times longer, and so on until max_ticks, so poor configurations cost little.
+Hyperband runs several such brackets, trading the number of configurations against their starting horizon.
+Runs are spread over a pool of worker processes with the library API (see api.py), and can be served from
+the result cache.
+"""
+import math
+import random
+import itertools
+from multiprocessing import Pool
+from optparse import OptionParser
+
+import numpy
+
+from api import run_experiment, beacon_distance
+from result_cache import ResultCache
+
+# Only the beacon distance is needed to score a run
+METRICS = [("beacon_distance", beacon_distance)]
+
+PARAMETERS = ["beta", "omega", "wireless_range", "robots"]
+
+
+def mean_beacon_distance(results):
+    # Mean distance of the swarm from the beacon over the run - rewards getting there quickly and staying
+    return float(results["beacon_distance"].mean())
+
+
+def final_beacon_distance(results):
+    return float(results["beacon_distance"][-1])
+
+
+# Objectives, all minimised
+OBJECTIVES = {"mean_beacon_distance": mean_beacon_distance, "final_beacon_distance": final_beacon_distance}
+
+
+def configurations(taxis_algorithm, space):
+    # Every combination of the candidate values in space (parameter name -> list of values)
+    names = sorted(space)
+    return [dict([("taxis_algorithm", taxis_algorithm)] + list(zip(names, values)))
+            for values in itertools.product(*[space[name] for name in names])]
+
+
+def evaluate(job):
+    # Score one configuration on one seed over a number of ticks
+    (configuration, seed, ticks, objective, use_cache) = job
+    cache = ResultCache() if use_cache else None
+    results = run_experiment(ticks=ticks, metrics=METRICS, cache=cache, seed=seed, **configuration)
+    return OBJECTIVES[objective](results)
+
+
+class Optimiser(object):
+    """
+    Successive halving and Hyperband over a list of configurations (dicts of settings), scored by the mean
+    of an objective over a fixed set of seeds. Every configuration sees the same seeds, so they are compared
+    on the same initial placements.
+    """
+    def __init__(self, pool, seeds=4, min_ticks=2000, max_ticks=50002, eta=3, objective="mean_beacon_distance",
+                 use_cache=True, verbose=True):
+        self.pool = pool
+        self.seeds = list(range(seeds))
+        self.min_ticks = min_ticks
+        self.max_ticks = max_ticks
+        self.eta = eta
+        self.objective = objective
+        self.use_cache = use_cache
+        self.verbose = verbose
+        self.ticks_simulated = 0
+        self.history = []  # (configuration, ticks, score) of every configuration evaluated
+
+    def score(self, candidates, ticks):
+        # Mean score of every candidate over all the seeds, evaluated in parallel
+        jobs = [(configuration, seed, ticks, self.objective, self.use_cache)
+                for configuration in candidates for seed in self.seeds]
+        scores = self.pool.map(evaluate, jobs, chunksize=1)
+        self.ticks_simulated += ticks * len(jobs)
+
+        means = []
+        for (number, configuration) in enumerate(candidates):
+            mean = float(numpy.mean(scores[number * len(self.seeds):(number + 1) * len(self.seeds)]))
+            means.append(mean)
+            self.history.append((configuration, ticks, mean))
+        return means
+
+    def successive_halving(self, candidates, ticks=None):
+        """
+        Run the candidates from a horizon of ticks (min_ticks by default), keeping the best 1/eta after
+        every rung and multiplying the horizon by eta, until the survivors have been run for max_ticks.
+        Returns (best configuration, its score at max_ticks, max_ticks).
+        """
+        ticks = ticks or self.min_ticks
+        while True:
+            ticks = min(ticks, self.max_ticks)
+            scores = self.score(candidates, ticks)
+            ranked = sorted(zip(scores, range(len(candidates))))
+            if self.verbose:
+                print("%d configurations at %d ticks, best %s: %.2f" % (len(candidates), ticks,
+                                                                       describe(candidates[ranked[0][1]]),
+                                                                       ranked[0][0]))
+            if ticks >= self.max_ticks:
+                (score, best) = ranked[0]
+                return (candidates[best], score, ticks)
+            survivors = max(1, int(len(candidates) / self.eta))
+            candidates = [candidates[index] for (score, index) in ranked[:survivors]]
+            ticks *= self.eta
+
+    def hyperband(self, candidates, rng):
+        """
+        Hyperband: successive halving brackets that start from fewer configurations at longer horizons, as
+        a hedge against short runs being misleading. Configurations are sampled from candidates with rng.
+        """
+        s_max = int(math.floor(math.log(float(self.max_ticks) / self.min_ticks, self.eta) + 1e-9))
+        best = None
+        for s in range(s_max, -1, -1):
+            count = int(math.ceil((s_max + 1) / float(s + 1) * self.eta ** s))
+            ticks = int(math.ceil(float(self.max_ticks) / self.eta ** s))
+            sample = rng.sample(candidates, min(count, len(candidates)))
+            if self.verbose:
+                print("Bracket %d: %d configurations from %d ticks" % (s, len(sample), ticks))
+            result = self.successive_halving(sample, ticks)
+            # Every bracket ends at max_ticks, so their winners can be compared directly
+            if best is None or result[1] < best[1]:
+                best = result
+        return best
+
+
+def describe(configuration):
+    return ", ".join("%s=%s" % (name, configuration[name]) for name in PARAMETERS if name in configuration)
+
+
+def parse_values(text):
+    # Comma separated numbers, as ints if they all are
+    values = [float(value) for value in text.split(",") if value]
+    if all(value == int(value) for value in values):
+        return [int(value) for value in values]
+    return values
+
+
+if __name__ == '__main__':
+    parser = OptionParser()
+    parser.add_option('', '--taxis_algorithm', dest='taxis_algorithm', default='beta', help='beta or omega')
+    for name in PARAMETERS:
+        parser.add_option('', '--' + name, dest=name, default=None,
+                          help='comma separated candidate values of ' + name)
+    parser.add_option('', '--method', dest='method', default='halving', help='halving or hyperband')
+    parser.add_option('', '--objective', dest='objective', default='mean_beacon_distance',
+                      help='one of ' + ", ".join(sorted(OBJECTIVES)))
+    parser.add_option('', '--seeds', dest='seeds', default=4, type='int', help='seeds per configuration')
+    parser.add_option('', '--min_ticks', dest='min_ticks', default=2000, type='int', help='shortest horizon')
+    parser.add_option('', '--max_ticks', dest='max_ticks', default=50002, type='int',
+                      help='longest horizon (a full experiment by default)')
+    parser.add_option('', '--eta', dest='eta', default=3, type='int', help='1/eta of configurations survive a rung')
+    parser.add_option('', '--processes', dest='processes', default=None, type='int',
+                      help='number of worker processes (default: one per core)')
+    parser.add_option('', '--no_cache', dest='use_cache', default=True, action='store_false',
+                      help='do not use the result cache')
+    parser.add_option('', '--random_seed', dest='random_seed', default=0, type='int',
+                      help='seed for sampling configurations in Hyperband')
+    (options, args) = parser.parse_args()
+
+    if options.objective not in OBJECTIVES:
+        parser.error("unknown objective " + options.objective)
+
+    # Search the algorithm's own parameter and any others given
+    space = {}
+    for name in PARAMETERS:
+        if getattr(options, name) is not None:
+            space[name] = parse_values(getattr(options, name))
+    if options.taxis_algorithm not in space:
+        parser.error("give candidate values with --" + options.taxis_algorithm)
+    space.pop("omega" if options.taxis_algorithm == "beta" else "beta", None)
+    candidates = configurations(options.taxis_algorithm, space)
+
+    pool = Pool(options.processes)
+    optimiser = Optimiser(pool, options.seeds, options.min_ticks, options.max_ticks, options.eta, options.objective,
+                          options.use_cache)
+    if options.method == "hyperband":
+        (best, score, ticks) = optimiser.hyperband(candidates, random.Random(options.random_seed))
+    else:
+        (best, score, ticks) = optimiser.successive_halving(candidates)
+    pool.close()
+    pool.join()
+
+    # Compare with running every configuration on every seed for the full horizon
+    grid_ticks = len(candidates) * options.seeds * options.max_ticks
+    print("Best: %s, %s %.2f at %d ticks" % (describe(best), options.objective, score, ticks))
+    print("Simulated %d ticks, %.1f%% of the full grid (%d ticks)" % (optimiser.ticks_simulated,
+                                                                    100.0 * optimiser.ticks_simulated / grid_ticks,
+                                                                    grid_ticks))
@@ -0,0 +1,101 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Pacing of the simulation thread when running with the GUI
+import time
+
+# How far behind schedule (in seconds) the simulation may fall before the schedule is reset rather than caught up
+MAX_LAG = 0.25
+
+# How often (in seconds) the measured tick rate is updated
+RATE_WINDOW = 0.5
+
+
+class Pacer(object):
+    """
+    Keeps the simulation at a target real-time factor (simulated seconds per wall-clock second).
+
+    In fast-forward mode the simulation runs as fast as it can, snapshots are only published every
+    render_every ticks and the renderer drops to fast_forward_fps, so drawing takes as little time
+    away from the simulation as possible.
+    """
+    def __init__(self, ticklength, real_time_factor, render_every=100, fast_forward_fps=10.0, fast_forward=False):
+        self.ticklength = ticklength
+        self.real_time_factor = real_time_factor
+        self.render_every = max(1, render_every)
+        self.fast_forward_fps = fast_forward_fps
+        self.fast_forward = fast_forward
+
+        self.deadline = None
+
+        # Measured rates
+        self.tick_rate = 0.0
+        self.achieved_factor = 0.0
+        self.window_start = None
+        self.window_ticks = 0
+
+    def set_real_time_factor(self, real_time_factor):
+        self.real_time_factor = max(real_time_factor, 0.01)
+        self.deadline = None
+
+    def toggle_fast_forward(self):
+        self.fast_forward = not self.fast_forward
+        self.deadline = None
+
+    def tick(self):
+        # Call once at the end of every simulation tick; sleeps until the tick is due
+        now = time.time()
+        self.measure(now)
+
+        if self.fast_forward:
+            return
+
+        if self.deadline is None or now - self.deadline > MAX_LAG:
+            # First tick, just resumed from a pause, or too far behind to catch up
+            self.deadline = now
+
+        self.deadline += self.ticklength / self.real_time_factor
+        delay = self.deadline - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def measure(self, now):
+        if self.window_start is None:
+            self.window_start = now
+        self.window_ticks += 1
+
+        elapsed = now - self.window_start
+        if elapsed >= RATE_WINDOW:
+            self.tick_rate = self.window_ticks / elapsed
+            self.achieved_factor = self.tick_rate * self.ticklength
+            self.window_start = now
+            self.window_ticks = 0
+
+    def should_render(self, clock):
+        # Whether the state at this tick should be published to the renderer
+        return not self.fast_forward or clock % self.render_every == 0
+
+    def frame_rate(self, default_rate):
+        if self.fast_forward:
+            return self.fast_forward_fps
+        return default_rate
+
+    def idle(self, paused_hz=20.0):
+        # Sleep instead of spinning while the simulation is paused
+        time.sleep(1.0 / paused_hz)
+        self.deadline = None
+        self.window_start = None
+        self.window_ticks = 0
@@ -0,0 +1,192 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Non-overlapping initial placement of the swarm using Poisson-disk sampling on a background grid
+import math
+import numpy
+
+PLACEMENT_LAYOUTS = ["box", "disc", "clusters"]
+
+# Approximate number of samples per unit area (in units of min_distance squared) that a saturated
+# Poisson-disk sampling reaches, used to size regions so that a single sampling pass is usually enough
+SATURATED_DENSITY = 0.6
+
+# Offsets of the grid cells that may hold a sample closer than min_distance to a sample in the centre cell
+NEIGHBOUR_OFFSETS = [(di, dj) for di in range(-2, 3) for dj in range(-2, 3)
+                     if not (abs(di) == 2 and abs(dj) == 2)]
+
+
+def poisson_disk_sample(width, height, min_distance, rng, attempts=30, limit=None):
+    """
+    Sample points in [0, width) x [0, height) that are at least min_distance apart.
+
+    The background grid has cells of size min_distance / sqrt(2), so each cell holds at most one sample.
+    Darts are thrown into every empty cell at once; cells are processed in 9 interleaved phases so that
+    cells of the same phase are at least 3 cells (> min_distance) apart and never conflict with each other.
+    After `attempts` rounds the sampling is saturated in the same sense as Bridson's algorithm. Sampling
+    stops early once at least `limit` samples have been accepted.
+    """
+    cell = min_distance / math.sqrt(2)
+    cols = int(math.ceil(width / cell))
+    rows = int(math.ceil(height / cell))
+
+    # Grid of sample coordinates padded by 2 cells on every side, NaN marks an empty cell
+    grid = numpy.full((rows + 4, cols + 4, 2), numpy.nan)
+    min_distance_sq = min_distance * min_distance
+
+    # Empty cells of each phase, as (row, col) index arrays that shrink as cells are filled
+    row_index, col_index = numpy.mgrid[0:rows, 0:cols]
+    phases = [numpy.nonzero((row_index % 3 == pi) & (col_index % 3 == pj)) for pi in range(3) for pj in range(3)]
+    accepted_total = 0
+
+    for attempt in range(attempts):
+        for phase in rng.permutation(len(phases)):
+            (cell_rows, cell_cols) = phases[phase]
+            if len(cell_rows) == 0:
+                continue
+
+            # One dart per empty cell, uniformly within the cell
+            darts = rng.random((len(cell_rows), 2))
+            xs = (cell_cols + darts[:, 0]) * cell
+            ys = (cell_rows + darts[:, 1]) * cell
+            candidates = numpy.nonzero((xs < width) & (ys < height))[0]
+
+            # Reject darts that are too close to an existing sample, dropping them as we go
+            for (di, dj) in NEIGHBOUR_OFFSETS:
+                neighbours = grid[cell_rows[candidates] + 2 + di, cell_cols[candidates] + 2 + dj]
+                with numpy.errstate(invalid="ignore"):
+                    too_close = ((neighbours[:, 0] - xs[candidates]) ** 2 +
+                                 (neighbours[:, 1] - ys[candidates]) ** 2) < min_distance_sq
+                candidates = candidates[~too_close]
+
+            grid[cell_rows[candidates] + 2, cell_cols[candidates] + 2, 0] = xs[candidates]
+            grid[cell_rows[candidates] + 2, cell_cols[candidates] + 2, 1] = ys[candidates]
+            accepted_total += len(candidates)
+
+            remaining = numpy.ones(len(cell_rows), dtype=bool)
+            remaining[candidates] = False
+            phases[phase] = (cell_rows[remaining], cell_cols[remaining])
+
+        if limit is not None and accepted_total >= limit:
+            break
+
+    samples = grid[2:-2, 2:-2].reshape(-1, 2)
+    return samples[~numpy.isnan(samples[:, 0])]
+
+
+def sample_disc(centre, radius, min_distance, rng, limit=None):
+    # Sample the bounding square of the disc and keep the samples inside it
+    if limit is not None:
+        limit = int(math.ceil(limit * 4 / math.pi))
+    points = poisson_disk_sample(2 * radius, 2 * radius, min_distance, rng, limit=limit)
+    points -= radius
+    points = points[(points ** 2).sum(axis=1) <= radius * radius]
+    return points + centre
+
+
+def sample_box(centre, width, height, min_distance, rng, limit=None):
+    points = poisson_disk_sample(width, height, min_distance, rng, limit=limit)
+    return points + (centre[0] - width / 2.0, centre[1] - height / 2.0)
+
+
+def choose(points, count, rng):
+    # Pick a random subset so the chosen samples are spread over the whole region
+    return points[rng.permutation(len(points))[:count]]
+
+
+def clamp_centre(centre, half_width, half_height, bounds):
+    # Shift a region so that it lies within bounds = (xmin, ymin, xmax, ymax), where possible
+    (xmin, ymin, xmax, ymax) = bounds
+    if 2 * half_width > xmax - xmin or 2 * half_height > ymax - ymin:
+        raise Exception("The requested number of robots does not fit in the arena")
+    x = min(max(centre[0], xmin + half_width), xmax - half_width)
+    y = min(max(centre[1], ymin + half_height), ymax - half_height)
+    return (x, y)
+
+
+def place_robots(count, diameter, rng, layout="box", centre=(0.0, 0.0), size=(1.0, 1.0), clearance=0.0,
+                 clusters=3, bounds=None):
+    """
+    Return a (count, 2) array of robot positions with no two robots closer than diameter + clearance.
+
+    layout is one of PLACEMENT_LAYOUTS. size gives the width and height of the preferred region around
+    centre (the disc and the cluster area use the smaller of the two as their diameter). The region is
+    grown around its centre when it is too small to hold the swarm, but is kept within bounds.
+    """
+    if layout not in PLACEMENT_LAYOUTS:
+        raise Exception("placement layout must be one of " + ", ".join(PLACEMENT_LAYOUTS))
+    if count == 0:
+        return numpy.zeros((0, 2))
+
+    spacing = float(diameter + clearance)
+    growth = 1.25
+
+    if layout == "box":
+        (width, height) = size
+        # Grow the box (keeping its aspect ratio) until it can hold the swarm when saturated
+        needed_area = count * spacing * spacing / SATURATED_DENSITY
+        if width * height < needed_area:
+            scale = math.sqrt(needed_area / (width * height))
+            (width, height) = (width * scale, height * scale)
+        while True:
+            region_centre = centre
+            if bounds is not None:
+                region_centre = clamp_centre(centre, width / 2.0, height / 2.0, bounds)
+            points = sample_box(region_centre, width, height, spacing, rng, limit=count)
+            if len(points) >= count:
+                return choose(points, count, rng)
+            (width, height) = (width * growth, height * growth)
+
+    if layout == "disc":
+        return place_disc(count, spacing, centre, min(size) / 2.0, rng, bounds)
+
+    # Scattered clusters: split the swarm evenly between clusters whose centres are themselves
+    # Poisson-disk sampled, so clusters never overlap each other
+    clusters = max(1, min(clusters, count))
+    shares = [count // clusters + (1 if c < count % clusters else 0) for c in range(clusters)]
+    cluster_radius = disc_radius_for(max(shares), spacing) + spacing / 2.0
+    (width, height) = size
+    while True:
+        region_centre = centre
+        if bounds is not None:
+            region_centre = clamp_centre(centre, width / 2.0, height / 2.0, bounds)
+        # Keep whole clusters inside the region by sampling their centres in a shrunken box
+        inner = (width - 2 * cluster_radius, height - 2 * cluster_radius)
+        if inner[0] > 0 and inner[1] > 0:
+            centres = sample_box(region_centre, inner[0], inner[1], 2 * cluster_radius + spacing, rng,
+                                     limit=clusters)
+            if len(centres) >= clusters:
+                centres = choose(centres, clusters, rng)
+                return numpy.concatenate([place_disc(share, spacing, cluster_centre, cluster_radius, rng)
+                                          for (share, cluster_centre) in zip(shares, centres)])
+        (width, height) = (width * growth, height * growth)
+
+
+def disc_radius_for(count, spacing):
+    # Radius of a disc that holds count saturated samples
+    return math.sqrt(count * spacing * spacing / SATURATED_DENSITY / math.pi)
+
+
+def place_disc(count, spacing, centre, radius, rng, bounds=None):
+    radius = max(radius, disc_radius_for(count, spacing))
+    while True:
+        disc_centre = centre
+        if bounds is not None:
+            disc_centre = clamp_centre(centre, radius, radius, bounds)
+        points = sample_disc(disc_centre, radius, spacing, rng, limit=count)
+        if len(points) >= count:
+            return choose(points, count, rng)
+        radius *= 1.25
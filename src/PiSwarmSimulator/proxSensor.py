@@ -18,13 +18,20 @@
 import math
 from framework import *
 
-class ProxSensor:
+# A view onto the sensor's bit of its robot's sensor bitmask, and its contact distance, in the swarm state arrays
+class ProxSensor(object):
+
+        __slots__ = ["proxid", "swarm", "robotid", "robotRadius", "radpos", "robottransform", "radius", "leftangle",
+                     "rightangle", "leftcoord", "rightcoord", "sensorshape", "sensorfixture"]
+
         # Each sensor on a robot has a unique ID, a field of view calculated using the radius and sensor apeture and a position in degrees around the edge of the robot
         # For the distance sensing we also need the robot position and rotation (robottransform)
-        def __init__(self, sensid, robotRadius, sensorRange, sensApeture, position, robottransform):
+        def __init__(self, sensid, robotRadius, sensorRange, sensApeture, position, robottransform, swarm, robotid):
             
             # Sensor properties
             self.proxid = sensid 
+            self.swarm = swarm
+            self.robotid = robotid
             self.contactObs = False     # If an obstacle is in this sensor's range then true
             self.contactDistance = 0
             
@@ -59,4 +66,23 @@ class ProxSensor:
             
             # Return fixture with correct polygon shape
             self.sensorshape=b2PolygonShape(vertices=vertices)
-            self.sensorfixture = b2FixtureDef(shape=self.sensorshape, isSensor=True, userData=self)
\ No newline at end of file
+            self.sensorfixture = b2FixtureDef(shape=self.sensorshape, isSensor=True, userData=self)
+
+        @property
+        def contactObs(self):
+            return (self.swarm.sensors.item(self.robotid) >> self.proxid) & 1 == 1
+
+        @contactObs.setter
+        def contactObs(self, contact):
+            if contact:
+                self.swarm.sensors[self.robotid] |= 1 << self.proxid
+            else:
+                self.swarm.sensors[self.robotid] &= 0xFF ^ (1 << self.proxid)
+
+        @property
+        def contactDistance(self):
+            return self.swarm.contact_distances.item(self.robotid, self.proxid)
+
+        @contactDistance.setter
+        def contactDistance(self, distance):
+            self.swarm.contact_distances[self.robotid, self.proxid] = distance
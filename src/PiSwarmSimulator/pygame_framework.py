@@ -25,6 +25,8 @@
 """
 Global Keys:
     F1     - toggle menu (can greatly improve fps)
+    F2     - single step
+    F3     - pause/resume
     Space  - shoot projectile
     Z/X    - zoom
     Escape - quit
@@ -60,11 +62,22 @@ class updateThread(threading.Thread):
     def __init__(self, frmwk):
         threading.Thread.__init__(self)
         self.frmwk = frmwk
+        self.stopping = threading.Event()
+        
+    def stop(self):
+        # Finish the current step and stop, so that the simulation can be finished safely
+        self.stopping.set()
+        self.join()
         
     def run(self):
-        while True:
-            # Run the simulation loop 
-            self.frmwk.SimulationLoop()    
+        while not self.stopping.is_set():
+            settings = self.frmwk.settings
+            # Sleep while paused rather than stepping with a zero time step
+            if settings.pause and not settings.singleStep:
+                self.frmwk.Idle()
+            else:
+                # Run the simulation loop
+                self.frmwk.SimulationLoop()
 
 class PygameDraw(b2DrawExtended):
     """
@@ -193,6 +206,7 @@ class PygameDraw(b2DrawExtended):
 
 class PygameFramework(FrameworkBase):
     TEXTLINE_START=30
+    MAX_DIRTY_RECTS=200 # Above this, the screen areas drawn are merged into one before updating
     def setup_keys(self):
         keys = [s for s in dir(pygame.locals) if s.startswith('K_')]
         for key in keys:
@@ -209,16 +223,18 @@ class PygameFramework(FrameworkBase):
         self.textLine           = 30
         self.font               = None
         self.fps                = 0
+        self.frameRects         = [] # Screen areas drawn in the current frame
+        self.previousRects      = [] # Screen areas drawn in the previous frame
 
         # GUI-related (PGU)
         self.gui_app  =None
         self.gui_table=None
         self.setup_keys()
         
-    def __init__(self):
-        super(PygameFramework, self).__init__()
+    def __init__(self, settings=None):
+        super(PygameFramework, self).__init__(settings)
 
-        if fwSettings.onlyInit: # testing mode doesn't initialize pygame
+        if self.settings.onlyInit: # testing mode doesn't initialize pygame
             return
 
         self.__reset()
@@ -367,8 +383,19 @@ class PygameFramework(FrameworkBase):
         
         while running:
             running = self.checkEvents()
-            self.screen.fill( (0,0,0) )
-            #self.screen.fill( (130,130,130) )
+
+            # Only erase and update the parts of the screen drawn in this and the previous frame, unless
+            # something that doesn't report what it drew (debug draw, mouse joint, contacts, GUI) is shown
+            fullRedraw = not self.UseDirtyRects() or self.mouseJoint or self.bombSpawning or \
+                         self.settings.drawContactPoints or self.settings.drawContactNormals or \
+                         (GUIEnabled and self.settings.drawMenu)
+            if fullRedraw:
+                self.screen.fill( (0,0,0) )
+                #self.screen.fill( (130,130,130) )
+            else:
+                for rect in self.previousRects:
+                    self.screen.fill( (0,0,0), rect )
+            self.frameRects = []
 
             # Check keys that should be checked every loop (not only on initial keydown)
             self.CheckKeys()
@@ -400,7 +427,7 @@ class PygameFramework(FrameworkBase):
             if self.renderer:
                 self.renderer.StartDraw()
      
-            self.world.DrawDebugData()
+            self.DrawWorld()
      
             # If the bomb is frozen, get rid of it.
             if self.bomb and not self.bomb.awake:
@@ -445,10 +472,17 @@ class PygameFramework(FrameworkBase):
             if GUIEnabled and self.settings.drawMenu:
                 self.gui_app.paint(self.screen)
 
-            pygame.display.flip()
-            clock.tick(self.settings.hz)
+            if fullRedraw:
+                pygame.display.flip()
+            else:
+                pygame.display.update(self.mergeRects(self.previousRects + self.frameRects))
+            self.previousRects = self.mergeRects(self.frameRects)
+
+            clock.tick(self.FrameRate())
             self.fps = clock.get_fps()
     
+        # Stop stepping before Finish() closes the logs
+        update_thread.stop()
         self.world.contactListener = None
         self.world.destructionListener=None
         self.world.renderer=None
@@ -473,6 +507,10 @@ class PygameFramework(FrameworkBase):
                 self.settings.singleStep=True
                 if GUIEnabled:
                     self.gui_table.updateGUI(self.settings)
+            elif key==Keys.K_F3:    # Toggle pause
+                self.settings.pause = not self.settings.pause
+                if GUIEnabled:
+                    self.gui_table.updateGUI(self.settings)
             else:              # Inform the test of the key press
                 self.Keyboard(key)
         else:
@@ -513,6 +551,15 @@ class PygameFramework(FrameworkBase):
             # those settings.
             self.gui_table.updateGUI(self.settings)
 
+    def mergeRects(self, rects):
+        """
+        Updating many small areas of the screen costs more than updating their
+        bounding box once, so merge rects into one if there are too many.
+        """
+        if len(rects) > self.MAX_DIRTY_RECTS:
+            return [rects[0].unionall(rects[1:])]
+        return rects
+
     def ConvertScreenToWorld(self, x, y):
         return b2Vec2((x + self.viewOffset.x) / self.viewZoom, 
                            ((self.screenSize.y - y + self.viewOffset.y) / self.viewZoom))
@@ -521,14 +568,14 @@ class PygameFramework(FrameworkBase):
         """
         Draw some text, str, at screen coordinates (x, y).
         """
-        self.screen.blit(self.font.render(str, True, color), (x,y))
+        self.frameRects.append(self.screen.blit(self.font.render(str, True, color), (x,y)))
 
     def Print(self, str, color=(229,153,153,255)):
         """
         Draw some text at the top status lines
         and advance to the next line.
         """
-        self.screen.blit(self.font.render(str, True, color), (5,self.textLine))
+        self.frameRects.append(self.screen.blit(self.font.render(str, True, color), (5,self.textLine)))
         self.textLine += 15
 
     def Keyboard(self, key):
@@ -549,8 +596,11 @@ class PygameFramework(FrameworkBase):
         """
         pass
     
+    def Quit(self):
+        self.QuitPygame()
+
     #Added function to allow to quit in code
     def QuitPygame(self):
-        print "quitting"
+        print("quitting")
         quitev = pygame.event.Event(QUIT)
         pygame.event.post(quitev)
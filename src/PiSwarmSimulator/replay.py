@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Replays a recorded trajectory file (see trajectory.py) without running the physics.
+
+Usage: python replay.py logs/beta_2_0.traj [--speed=50]
+
+Keys:
+    Space          - play/pause
+    Left/Right     - step back/forward one sample
+    Shift+Left/Right - scrub (hold)
+    Page Up/Down   - jump back/forward 10% of the run
+    Home/End       - jump to the start/end
+    Up/Down        - double/halve the playback speed
+    R              - reverse playback
+    B              - toggle beacon rays
+    Z/X, Scroll    - zoom
+    Escape         - quit
+
+Mouse:
+    Left click/drag on the timeline - jump to that point of the run
+    Right drag                      - pan
+"""
+import sys
+from optparse import OptionParser
+
+import pygame
+from pygame.locals import *
+
+from trajectory import TrajectoryReader
+from swarm_renderer import SwarmRenderer, BACKGROUND_COLOUR
+
+SCREEN_SIZE = (1000, 800)
+TIMELINE_HEIGHT = 12
+TEXT_COLOUR = (255, 255, 255)
+TIMELINE_COLOUR = (80, 80, 80)
+TIMELINE_POSITION_COLOUR = (229, 153, 153)
+
+
+class ReplayViewer(object):
+
+    def __init__(self, path, speed=50.0, fps=60.0):
+        self.trajectory = TrajectoryReader(path)
+        if len(self.trajectory) == 0:
+            raise Exception("%s contains no samples" % (path))
+
+        meta = self.trajectory.meta
+        self.ticklength = meta.get("ticklength", 0.25)
+        self.sample_length = self.ticklength * self.trajectory.interval  # Simulated seconds between samples
+
+        # Playback state - position is a (fractional) sample index, speed is in simulated seconds per second
+        self.position = 0.0
+        self.speed = speed
+        self.direction = 1
+        self.playing = True
+        self.fps = fps
+
+        # View, using the same conventions as the simulator's pygame framework
+        self.zoom = 10.0
+        self.centre = [0.0, 20.0]
+        self.rays_visible = True
+        self.panning = False
+        self.scrubbing = False
+
+        pygame.init()
+        pygame.display.set_caption("Pi Swarm Simulator - replay of " + path)
+        self.screen = pygame.display.set_mode(SCREEN_SIZE)
+        self.font = pygame.font.Font(None, 15)
+
+        self.renderer = SwarmRenderer(meta["sensor_vertices"], meta["robot_radius"], meta["beacon_position"],
+                                      meta["beacon_radius"], meta["arena_vertices"], font=self.font,
+                                      obstacle_polygons=meta.get("obstacle_polygons", ()))
+        self.snapshot = None
+
+    def offset(self):
+        return (self.centre[0] * self.zoom - SCREEN_SIZE[0] / 2.0, self.centre[1] * self.zoom - SCREEN_SIZE[1] / 2.0)
+
+    def last_sample(self):
+        return len(self.trajectory) - 1
+
+    def seek(self, position):
+        # Any sample can be reached directly, as the trajectory file is indexed rather than decoded
+        self.position = min(max(position, 0.0), float(self.last_sample()))
+
+    def timeline(self):
+        return pygame.Rect(0, SCREEN_SIZE[1] - TIMELINE_HEIGHT, SCREEN_SIZE[0], TIMELINE_HEIGHT)
+
+    def seek_to_timeline(self, x):
+        self.seek(float(x) / SCREEN_SIZE[0] * self.last_sample())
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+                return False
+            elif event.type == KEYDOWN:
+                self.keyboard(event.key)
+            elif event.type == MOUSEBUTTONDOWN:
+                if event.button == 1 and self.timeline().collidepoint(event.pos):
+                    self.scrubbing = True
+                    self.seek_to_timeline(event.pos[0])
+                elif event.button == 3:
+                    self.panning = True
+                elif event.button == 4:
+                    self.zoom *= 1.1
+                elif event.button == 5:
+                    self.zoom /= 1.1
+            elif event.type == MOUSEBUTTONUP:
+                if event.button == 1:
+                    self.scrubbing = False
+                elif event.button == 3:
+                    self.panning = False
+            elif event.type == MOUSEMOTION:
+                if self.scrubbing:
+                    self.seek_to_timeline(event.pos[0])
+                elif self.panning:
+                    self.centre[0] -= event.rel[0] / self.zoom
+                    self.centre[1] += event.rel[1] / self.zoom
+        return True
+
+    def keyboard(self, key):
+        jump = 0.1 * self.last_sample()
+        if key == K_SPACE:
+            self.playing = not self.playing
+        elif key == K_RIGHT:
+            self.seek(int(self.position) + 1)
+        elif key == K_LEFT:
+            self.seek(int(self.position) - 1)
+        elif key == K_PAGEUP:
+            self.seek(self.position - jump)
+        elif key == K_PAGEDOWN:
+            self.seek(self.position + jump)
+        elif key == K_HOME:
+            self.seek(0)
+        elif key == K_END:
+            self.seek(self.last_sample())
+        elif key == K_UP:
+            self.speed *= 2
+        elif key == K_DOWN:
+            self.speed /= 2
+        elif key == K_r:
+            self.direction = -self.direction
+        elif key == K_b:
+            self.rays_visible = not self.rays_visible
+        elif key == K_z:
+            self.zoom = min(1.1 * self.zoom, 50.0)
+        elif key == K_x:
+            self.zoom = max(0.9 * self.zoom, 0.02)
+
+    def advance(self, seconds):
+        if self.playing:
+            self.seek(self.position + self.direction * seconds * self.speed / self.sample_length)
+
+    def draw(self):
+        self.screen.fill(BACKGROUND_COLOUR)
+
+        sample = int(self.position)
+        self.snapshot = self.trajectory.frame(sample, self.snapshot)
+        rects = []
+        self.renderer.draw(self.screen, self.snapshot, self.zoom, self.offset(), SCREEN_SIZE[1], rects,
+                           rays_visible=self.rays_visible)
+
+        status = [
+            "Time: %f s (tick %d, sample %d of %d)" % (self.snapshot.clock * self.ticklength, self.snapshot.clock,
+                                                       sample, self.last_sample()),
+            "Playback: %.1fx%s%s" % (self.speed, " reversed" if self.direction < 0 else "",
+                                     "" if self.playing else " (paused)"),
+        ]
+        for (line, text) in enumerate(status):
+            self.screen.blit(self.font.render(text, True, TEXT_COLOUR), (5, 30 + 15 * line))
+
+        # Timeline, with the current position marked
+        timeline = self.timeline()
+        self.screen.fill(TIMELINE_COLOUR, timeline)
+        marker = int(float(sample) / max(1, self.last_sample()) * (SCREEN_SIZE[0] - 1))
+        self.screen.fill(TIMELINE_POSITION_COLOUR, (marker - 1, timeline.top, 3, timeline.height))
+
+        pygame.display.flip()
+
+    def run(self):
+        clock = pygame.time.Clock()
+        running = True
+        while running:
+            running = self.handle_events()
+
+            # Holding the arrow keys scrubs through the run
+            keys = pygame.key.get_pressed()
+            if keys[K_RIGHT] and keys[K_LSHIFT]:
+                self.seek(self.position + 1)
+            elif keys[K_LEFT] and keys[K_LSHIFT]:
+                self.seek(self.position - 1)
+
+            seconds = clock.tick(self.fps) / 1000.0
+            self.advance(seconds)
+            self.draw()
+
+        pygame.quit()
+
+
+if __name__ == '__main__':
+    parser = OptionParser(usage="usage: %prog [options] trajectory_file")
+    parser.add_option('', '--speed', dest='speed', default=50.0, type='float',
+                      help='playback speed, in simulated seconds per second')
+    parser.add_option('', '--fps', dest='fps', default=60.0, type='float', help='frames per second')
+    (options, args) = parser.parse_args()
+
+    if len(args) != 1:
+        parser.print_help()
+        sys.exit(1)
+
+    ReplayViewer(args[0], speed=options.speed, fps=options.fps).run()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A cache of finished simulation runs, so that sweeps and library runs are not repeated.
+
+Every run is stored under the SHA-256 of everything that determines its results: the effective settings,
+the seed and the source code of the simulator. Entries hold the run's output files (logs, trajectories)
+and/or its metric arrays, and a summary.json describing the run. The least recently used entries are
+evicted once the cache grows beyond its size limit.
+
+Usage: python result_cache.py list
+       python result_cache.py invalidate KEY_PREFIX... | invalidate --stale | clear
+       python result_cache.py evict [--max_size=MB]
+"""
+import os
+import sys
+import json
+import time
+import errno
+import shutil
+import hashlib
+from optparse import OptionParser
+
+import numpy
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows, where eviction is not locked
+
+from settings import fwSettings, make_settings, parse_args
+from obstacles import file_hash
+from log_writer import LOG_COLUMNS, LOG_EXTENSIONS, log_extension
+from chunked_log import ChunkedLog
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+SUMMARY = "summary.json"
+ARRAYS = "results.npz"
+EVICT_LOCK = ".evict.lock"
+
+# Every Python file next to this one is part of the simulator, and editing it invalidates the cache, except
+# these tools, which only analyse or display results that have already been written
+ANALYSIS_FILES = ["result_cache.py", "run_index.py", "sweep_dataset.py", "metrics.py", "replay.py", "export_frames.py",
+                  "golden_trace.py", "bench_startup.py", "adaptive_sampling.py", "optimiser.py",
+                  "experiment_wrapper.py", "check_illumination.py"]
+
+# Settings that only affect how a run is displayed or indexed, not its results
+DISPLAY_SETTINGS = ["backend", "headless", "run_index", "drawStats", "drawShapes", "drawJoints", "drawCoreShapes", "drawAABBs",
+                    "drawOBBs", "drawPairs", "drawContactPoints", "maxContactPoints", "drawContactNormals", "drawFPS",
+                    "drawMenu", "drawCOMs", "pointSize", "pause", "singleStep", "onlyInit", "real_time_factor",
+                    "fast_forward", "fast_forward_render_every", "fast_forward_fps", "lod_dot_zoom",
+                    "lod_sensor_zoom", "lod_label_zoom", "log_batch_rows", "log_batches", "log_fsync_batches"]
+
+source_hashes = {}
+
+
+def source_files(directory):
+    # The source files the results of a run depend on
+    return sorted(name for name in os.listdir(directory) if name.endswith(".py") and name not in ANALYSIS_FILES)
+
+
+def source_hash(directory=None):
+    # Hash of the simulator's source code, computed once per process
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    if directory not in source_hashes:
+        digest = hashlib.sha256()
+        for name in source_files(directory):
+            with open(os.path.join(directory, name), "rb") as source:
+                digest.update(name.encode("utf-8") + b"\0" + source.read() + b"\0")
+        source_hashes[directory] = digest.hexdigest()
+    return source_hashes[directory]
+
+
+def effective_settings(settings):
+    # Every setting that can affect the results of a run, as a JSON-friendly dict
+    names = [name for name in dir(fwSettings) if not name.startswith('_') and name not in DISPLAY_SETTINGS]
+    effective = dict((name, getattr(settings, name)) for name in names)
+    if effective["seed"] is not None:
+        effective["seed"] = str(effective["seed"])  # Seeds from the command line are strings
+    if effective["obstacles"]:
+        effective["obstacles"] = file_hash(effective["obstacles"])  # The obstacles themselves, not the file name
+    return effective
+
+
+def summarise(arrays):
+    # Final, minimum and mean of every metric
+    summary = {}
+    for (name, values) in arrays.items():
+        if name != "time" and len(values):
+            summary[name] = {"final": float(values[-1]), "min": float(values.min()), "mean": float(values.mean())}
+    if "time" in arrays and len(arrays["time"]):
+        summary["duration"] = float(arrays["time"][-1])
+    return summary
+
+
+def read_log(path):
+    # Columns of a simulator log as named arrays
+    if path.endswith(LOG_EXTENSIONS["chunked"]):
+        return ChunkedLog(path).read()
+    data = numpy.loadtxt(path, delimiter=",", ndmin=2)
+    names = LOG_COLUMNS.get(data.shape[1], ["column%d" % (column) for column in range(data.shape[1])])
+    return dict((name, data[:, column]) for (column, name) in enumerate(names))
+
+
+def directory_size(path):
+    # Size of the files in path; files removed meanwhile, by another process evicting the entry, count as empty
+    size = 0
+    for (root, dirs, files) in os.walk(path):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError as error:
+                if error.errno != errno.ENOENT:
+                    raise
+    return size
+
+
+class ResultCache(object):
+    """
+    Content-addressed store of simulation results, in one directory per run. Several processes, such as the
+    workers of a sweep, can share a cache: an entry another process removes while it is being listed is
+    left out, and only one process evicts at a time.
+    """
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def key(self, settings, extra=None):
+        """
+        The cache key of a run: a hash of its effective settings, its seed, the simulator source and any
+        extra (JSON-serialisable) description, such as the number of ticks run by the library API.
+        """
+        description = {"settings": effective_settings(settings), "source": source_hash(), "extra": extra}
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def lookup(self, key):
+        """
+        Return the summary of a cached run, or None. Finding an entry marks it as recently used.
+        """
+        summary_path = os.path.join(self.path(key), SUMMARY)
+        try:
+            os.utime(summary_path, None)
+            with open(summary_path) as summary_file:
+                return json.load(summary_file)
+        except (IOError, OSError) as error:
+            if error.errno != errno.ENOENT:
+                raise
+            return None
+
+    def store(self, key, settings, files=(), arrays=None, extra=None):
+        """
+        Store a finished run: copies of its output files and/or a dict of metric arrays. The entry is
+        written to a temporary directory and renamed into place, so readers never see a partial entry.
+        """
+        temporary = self.path(key) + ".%d.tmp" % (os.getpid())
+        if os.path.exists(temporary):
+            shutil.rmtree(temporary)
+        os.makedirs(temporary)
+
+        names = []
+        summary = {}
+        for path in files:
+            shutil.copy(path, temporary)
+            names.append(os.path.basename(path))
+            if path.endswith(tuple(LOG_EXTENSIONS.values())):
+                summary = summarise(read_log(path))
+        if arrays is not None:
+            numpy.savez(os.path.join(temporary, ARRAYS), **arrays)
+            summary = summarise(arrays)
+
+        entry = {"key": key, "settings": effective_settings(settings), "seed": effective_settings(settings)["seed"],
+                 "source": source_hash(), "extra": extra, "created": time.time(), "files": names,
+                 "arrays": arrays is not None, "summary": summary}
+        with open(os.path.join(temporary, SUMMARY), "w") as summary_file:
+            json.dump(entry, summary_file, indent=1, sort_keys=True)
+
+        # Move any earlier entry out of the way first. If another process stores the same run meanwhile, its
+        # entry has the same contents, so keep that one
+        if os.path.exists(self.path(key)):
+            replaced = self.path(key) + ".%d.old.tmp" % (os.getpid())
+            try:
+                os.rename(self.path(key), replaced)
+            except OSError as error:
+                if error.errno != errno.ENOENT:
+                    raise
+            shutil.rmtree(replaced, ignore_errors=True)
+        try:
+            os.rename(temporary, self.path(key))
+        except OSError as error:
+            if error.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                raise
+            shutil.rmtree(temporary, ignore_errors=True)
+        self.evict()
+        return entry
+
+    def load_arrays(self, key):
+        # The metric arrays of a cached run, or None if it has been evicted
+        try:
+            with numpy.load(os.path.join(self.path(key), ARRAYS)) as arrays:
+                return dict((name, arrays[name]) for name in arrays.files)
+        except (IOError, OSError) as error:
+            if error.errno != errno.ENOENT:
+                raise
+            return None
+
+    def restore_files(self, key, destination):
+        # Copy the output files of a cached run to destination, returning their paths
+        entry = self.lookup(key)
+        if entry is None:
+            return []
+        if not os.path.exists(destination):
+            os.makedirs(destination)
+        paths = []
+        for name in entry["files"]:
+            shutil.copy(os.path.join(self.path(key), name), destination)
+            paths.append(os.path.join(destination, name))
+        return paths
+
+    def entries(self):
+        # Summaries of all the cached runs, least recently used first
+        entries = []
+        for key in os.listdir(self.directory):
+            if key.endswith(".tmp") or key.startswith("."):
+                continue  # Being written or removed, or the lock
+            summary_path = os.path.join(self.path(key), SUMMARY)
+            try:
+                with open(summary_path) as summary_file:
+                    entry = json.load(summary_file)
+                entry["used"] = os.path.getmtime(summary_path)
+            except (IOError, OSError) as error:
+                if error.errno != errno.ENOENT:
+                    raise
+                continue  # Removed by another process
+            entry["size"] = directory_size(self.path(key))
+            entries.append(entry)
+        return sorted(entries, key=lambda entry: entry["used"])
+
+    def invalidate(self, key):
+        shutil.rmtree(self.path(key), ignore_errors=True)
+
+    def invalidate_stale(self):
+        # Remove the runs of older versions of the simulator
+        stale = [entry["key"] for entry in self.entries() if entry["source"] != source_hash()]
+        for key in stale:
+            self.invalidate(key)
+        return stale
+
+    def clear(self):
+        for entry in self.entries():
+            self.invalidate(entry["key"])
+
+    def evict(self, max_bytes=None):
+        # Remove least recently used runs until the cache fits in max_bytes, returning their keys. If another
+        # process is already evicting, leave it to that process
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with open(os.path.join(self.directory, EVICT_LOCK), "a") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except (IOError, OSError) as error:
+                    if error.errno not in (errno.EAGAIN, errno.EACCES):
+                        raise
+                    return []
+            entries = self.entries()
+            total = sum(entry["size"] for entry in entries)
+            evicted = []
+            for entry in entries:
+                if total <= max_bytes:
+                    break
+                self.invalidate(entry["key"])
+                total -= entry["size"]
+                evicted.append(entry["key"])
+        return evicted
+
+    # Runs of the command line simulator, described by their options
+    def run_outputs(self, options):
+        # The settings, cache key and output file names of a command line run
+        from swarm_sim import run_name
+        settings = make_settings()
+        parse_args(list(options), settings)
+        name = "logs/" + run_name(settings, settings.seed)
+        outputs = []
+        if settings.experiment or settings.log_advanced:
+            outputs.append(name + log_extension(settings))
+        if settings.record:
+            outputs.append(name + ".traj")
+        return (settings, self.key(settings), outputs)
+
+    def restore_run(self, options, destination="logs/"):
+        """
+        Copy the outputs of a cached command line run into destination. Returns False if the run has
+        to be simulated (it is not cached, or has no fixed seed).
+        """
+        (settings, key, outputs) = self.run_outputs(options)
+        if settings.seed is None or not outputs:
+            return False
+        return len(self.restore_files(key, destination)) > 0
+
+    def store_run(self, options):
+        # Store the outputs of a finished command line run
+        (settings, key, outputs) = self.run_outputs(options)
+        if settings.seed is not None and outputs and all(os.path.exists(path) for path in outputs):
+            self.store(key, settings, outputs)
+
+
+if __name__ == '__main__':
+    parser = OptionParser(usage="usage: %prog [options] list | invalidate KEY_PREFIX... | clear | evict")
+    parser.add_option('', '--directory', dest='directory', default=DEFAULT_DIRECTORY, help='cache directory')
+    parser.add_option('', '--max_size', dest='max_size', default=DEFAULT_MAX_BYTES / 1024.0 ** 2, type='float',
+                      help='size limit in MB, for evict')
+    parser.add_option('', '--stale', dest='stale', default=False, action='store_true',
+                      help='invalidate the runs of other versions of the simulator')
+    (options, args) = parser.parse_args()
+
+    if not args:
+        parser.print_help()
+        sys.exit(1)
+
+    cache = ResultCache(options.directory, int(options.max_size * 1024 ** 2))
+    command = args[0]
+    if command == "list":
+        for entry in cache.entries():
+            settings = entry["settings"]
+            print("%s  %s seed=%s robots=%s  %.1f MB  %s" % (entry["key"][:12], settings["taxis_algorithm"],
+                                                             entry["seed"], settings["robots"],
+                                                             entry["size"] / 1024.0 ** 2, " ".join(entry["files"])))
+    elif command == "invalidate":
+        removed = cache.invalidate_stale() if options.stale else []
+        for prefix in args[1:]:
+            for entry in cache.entries():
+                if entry["key"].startswith(prefix):
+                    cache.invalidate(entry["key"])
+                    removed.append(entry["key"])
+        print("%d runs invalidated" % (len(removed)))
+    elif command == "clear":
+        cache.clear()
+    elif command == "evict":
+        print("%d runs evicted" % (len(cache.evict())))
+    else:
+        parser.error("unknown command " + command)
@@ -0,0 +1,72 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Random number streams of a simulation, derived from its seed with NumPy's SeedSequence.
+#
+# The run's seed gives a root SeedSequence. Every subsystem (placement, ...) and every robot has its own
+# child sequence, identified by a fixed spawn key rather than by the order streams are asked for, so a
+# robot draws the same numbers whether robots are built one by one, in batches or in another process.
+#
+#   seed -> (SUBSYSTEM, placement)  -> placement stream
+#        -> (ROBOTS, robot id)      -> stream of that robot
+#
+# SeedSequence needs NumPy 1.17 or later, and so Python 3.
+import re
+import hashlib
+
+import numpy
+
+# First element of the spawn keys of each kind of stream
+SUBSYSTEM = 0
+ROBOTS = 1
+
+# Subsystems with their own stream, by spawn key; add new ones at the end so existing streams are unchanged
+SUBSYSTEMS = ["placement"]
+
+
+def seed_entropy(seed):
+    # Seeds are strings (see SwarmSimulation): a number written without leading zeros is used as that
+    # number, anything else (including "007") is hashed, so different strings are different seeds
+    seed = str(seed)
+    if re.match(r"(0|[1-9][0-9]*)\Z", seed):
+        return int(seed)
+    return int(hashlib.sha256(seed.encode("utf-8")).hexdigest(), 16)
+
+
+class RandomStreams(object):
+    """
+    The random number generators of one simulation. Generators are created on first use and kept, so
+    repeated calls return the same generator.
+    """
+    def __init__(self, seed):
+        self.entropy = seed_entropy(seed)
+        self.generators = {}
+
+    def sequence(self, *spawn_key):
+        return numpy.random.SeedSequence(self.entropy, spawn_key=spawn_key)
+
+    def generator(self, *spawn_key):
+        if spawn_key not in self.generators:
+            self.generators[spawn_key] = numpy.random.Generator(numpy.random.PCG64(self.sequence(*spawn_key)))
+        return self.generators[spawn_key]
+
+    def subsystem(self, name):
+        if name not in SUBSYSTEMS:
+            raise Exception("Unknown random stream: " + name)
+        return self.generator(SUBSYSTEM, SUBSYSTEMS.index(name))
+
+    def robot(self, robotid):
+        return self.generator(ROBOTS, robotid)
@@ -15,22 +15,30 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 # Import external libraries
-import random, math
+import math
 from framework import *
 
 # Import simulator classes
 from proxSensor import *
+from swarm_state import STATE_CODES, STATE_NAMES, UNKNOWN_STATE
 
+ROBOT_DIAMETER = 9.5 # Body diameter in cm
+
+# A view onto the robot's row of the swarm state arrays (see swarm_state.py), with no instance dictionary
 class Robot(object):
+
+    __slots__ = ["framework", "swarm", "robotid", "diameter", "IRSensRange", "sensor_fixtures", "fixtures", "body",
+                 "IRSensList", "direction"]
     
     def __init__(self, framework, robotid, position):
         
         # Reference to the simulation framework - allows access to global information about the world
         self.framework = framework
+        self.swarm = framework.swarm
         
         self.robotid = robotid # Unique ID for each robot
                 
-        self.diameter = framework.calcSimSize(9.5) # Body diameter - 9.5cm
+        self.diameter = framework.calcSimSize(ROBOT_DIAMETER) # Body diameter - 9.5cm
         self.IRSensRange = framework.calcSimSize(10) # IR sensor range - 10cm
         
         self.state = "forward" # Default state of finite state machine controller
@@ -42,20 +50,21 @@ class Robot(object):
         self.sensor_fixtures = [] # Used to represent IR sensor cones
         self.illuminated = False # Is the robot illuminated by the IR beacon?
         
-        # Choose initial heading at random
-        start_heading = math.radians(random.randint(0, 359))
+        # Choose initial heading at random, from the robot's own random number stream
+        start_heading = math.radians(framework.streams.robot(robotid).integers(0, 360))
                 
         # Construct body in the world
         robotshape = b2CircleShape(radius=(self.diameter / 2))
         self.fixtures = b2FixtureDef(shape=robotshape, density=1, friction=0.3, userData=self) # Pass the robot pointer to both fixture and body for use in collisions
         self.body = framework.world.CreateDynamicBody(position=position, angle=start_heading, fixtures=self.fixtures, linearDamping=5, angularDamping=5, userData=self)
+        self.swarm.attach(robotid, self.body)
     
         # Set up IR sensors at correct positions round the robot
         IRsensID = 0 # IR sensor ID
         IRposList = [15, 50, 90, 154, 206, 270, 310, 345] # Angles the IR sensors are placed at on the robot's body (in degrees)
         self.IRSensList = []
         for IRpos in IRposList:
-            IRsens = ProxSensor(IRsensID, self.diameter / 2, self.IRSensRange, 30, IRpos, self.body.transform)
+            IRsens = ProxSensor(IRsensID, self.diameter / 2, self.IRSensRange, 30, IRpos, self.body.transform, self.swarm, robotid)
             self.IRSensList.append(IRsens)
             self.body.CreateFixture(IRsens.sensorfixture)
             IRsensID += 1
@@ -63,6 +72,60 @@ class Robot(object):
     # Robot controller (implemented in sub-classes)
     def drive(self):
         pass
+
+    # State held in the swarm state arrays
+    @property
+    def state(self):
+        return STATE_NAMES[self.swarm.states.item(self.robotid)]
+
+    @state.setter
+    def state(self, state):
+        self.swarm.states[self.robotid] = STATE_CODES[state]
+
+    @property
+    def headingAngle(self):
+        return self.swarm.heading_angles.item(self.robotid)
+
+    @headingAngle.setter
+    def headingAngle(self, angle):
+        self.swarm.heading_angles[self.robotid] = angle
+
+    @property
+    def headingAngleAchieved(self):
+        return self.swarm.heading_achieved.item(self.robotid)
+
+    @headingAngleAchieved.setter
+    def headingAngleAchieved(self, achieved):
+        self.swarm.heading_achieved[self.robotid] = achieved
+
+    @property
+    def illuminated(self):
+        return self.swarm.illuminated.item(self.robotid)
+
+    @illuminated.setter
+    def illuminated(self, illuminated):
+        self.swarm.illuminated[self.robotid] = illuminated
+
+    @property
+    def timer(self):
+        return self.swarm.timers.item(self.robotid)
+
+    @timer.setter
+    def timer(self, ticks):
+        self.swarm.timers[self.robotid] = ticks
+
+    # Position and angle of the body at the last physics step, without going through Box2D
+    @property
+    def position(self):
+        return (self.swarm.positions.item(self.robotid, 0), self.swarm.positions.item(self.robotid, 1))
+
+    @property
+    def angle(self):
+        return self.swarm.angles.item(self.robotid)
+
+    # Integer code of the current controller state
+    def stateCode(self):
+        return self.swarm.states.item(self.robotid)
     
     # Returns simulation time - if you want this in 'seconds' return: self.framework.clock * self.framework.ticklength
     def getSimulationTime(self):
@@ -70,7 +133,7 @@ class Robot(object):
     
     # Specify a new heading in degrees (relative to robot's current heading)
     def changeHeading(self, desiredHeading):
-        heading = math.degrees(self.normaliseAngle(self.body.transform.R.angle))
+        heading = math.degrees(self.normaliseAngle(self.angle))
         heading = heading + desiredHeading
         self.changeHeadingRad(math.radians(heading))
     
@@ -111,7 +174,7 @@ class Robot(object):
         radOffset = math.radians(permittedOffset)
        
         # Get the current robot heading
-        heading = self.normaliseAngle(self.body.transform.R.angle)
+        heading = self.normaliseAngle(self.angle)
         
         desiredHeadingAngle = self.headingAngle
         lowestPermissable = self.normaliseAngle(desiredHeadingAngle - radOffset)
@@ -145,7 +208,7 @@ class Robot(object):
 
             # Set direction to turn the shortest way                  
             # When relative to the world it is the difference between current and desired headings
-            heading = self.normaliseAngle(self.body.transform.R.angle)
+            heading = self.normaliseAngle(self.angle)
             
             if (self.normaliseAngle(self.headingAngle - heading) >= math.pi) or (self.normaliseAngle(self.headingAngle - heading) <= 0):    
                 self.direction = "right"
@@ -156,7 +219,7 @@ class Robot(object):
                 
     def headingToCoordinate(self, x, y):
         # Get the robot's current heading in degrees
-        current_heading = math.degrees(self.normaliseAngle(self.body.transform.R.angle))
+        current_heading = math.degrees(self.normaliseAngle(self.angle))
         
         # Calculate the angle to the coordinate
         heading_to_coordinate = math.degrees(self.angleToCoord((x, y)))
@@ -165,9 +228,10 @@ class Robot(object):
         return heading_to_coordinate - current_heading
     
     # Pass in a coordinate to head to, return angle in degrees
-    def angleToCoord(self, (x2, y2)):
+    def angleToCoord(self, coordinate):
         # Get current position
-        (x1, y1) = self.body.position
+        (x1, y1) = self.position
+        (x2, y2) = coordinate
         
         # Calculate the angle of the vector between current position and desired position
         angleToCoord = self.normaliseAngle(math.atan2((y1 - y2), (x1 - x2)))
@@ -182,6 +246,10 @@ class Robot(object):
         self.driveLeftWheelForward(0.5)
         self.driveRightWheelBackward(0.5)
     
+    # Apply force f at point p of the body; every wheel function below ends here
+    def applyWheelForce(self, f, p):
+        self.body.ApplyForce(f, p, True)
+
     # Functions to control each wheel independently - allowing movement and turning of the robot
     def driveRightWheelForward(self, speed = 5):
         # Get robot heading vector from the perspective of the right wheel
@@ -194,7 +262,7 @@ class Robot(object):
         
         # Apply forward vector to wheel
         p = self.body.GetWorldPoint(localPoint=(0.0, -1.0))
-        self.body.ApplyForce(f, p, True)
+        self.applyWheelForce(f, p)
         
     def driveLeftWheelForward(self, speed = 5):
         # Get robot heading vector from the perspective of the left wheel
@@ -207,7 +275,7 @@ class Robot(object):
         
         # Apply forward vector to wheel
         p = self.body.GetWorldPoint(localPoint=(0.0, 1.0))
-        self.body.ApplyForce(f, p, True)
+        self.applyWheelForce(f, p)
             
     def driveRightWheelBackward(self, speed = 1):
         # Get robot reverse heading vector from the perspective of the right wheel
@@ -220,7 +288,7 @@ class Robot(object):
         
         # Apply forward vector to wheel
         p = self.body.GetWorldPoint(localPoint=(0.0, -1.0))
-        self.body.ApplyForce(f, p, True)
+        self.applyWheelForce(f, p)
         
     def driveLeftWheelBackward(self, speed = 1):
         # Get robot reverse heading vector from the perspective of the left wheel
@@ -233,7 +301,7 @@ class Robot(object):
         
         # Apply forward vector to wheel
         p = self.body.GetWorldPoint(localPoint=(0.0, 1.0))
-        self.body.ApplyForce(f, p, True)
+        self.applyWheelForce(f, p)
         
     # Issues where angle is negative or greater than 2pi radians (to decide whether to turn left or right)
     # Therefore normalise to a value between 0 and 2pi
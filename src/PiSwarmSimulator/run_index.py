@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+An SQLite index of logged runs, with their settings and summary statistics, so runs can be found without
+globbing and reading log files.
+
+Logged runs register themselves when they finish (see the run_index setting). Existing logs can be added
+with --add, which reads them once.
+
+Usage: python run_index.py taxis_algorithm=omega robots=20 omega=25:35
+       python run_index.py --add logs/*.log logs/*.clog
+       python run_index.py --columns=log_path,final_beacon_distance beta=2
+
+Conditions are column=value, or column=low:high for an inclusive range (either end may be left out).
+"""
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+from optparse import OptionParser
+
+DEFAULT_PATH = "logs/runs.sqlite"
+BEACON_REACHED = 50.0  # The swarm has reached the beacon when its centroid is this close, in cm
+
+COLUMNS = [
+    ("run_name", "TEXT"),
+    ("log_path", "TEXT UNIQUE"),
+    ("taxis_algorithm", "TEXT"),
+    ("beta", "REAL"),
+    ("omega", "REAL"),
+    ("robots", "INTEGER"),
+    ("wireless_range", "REAL"),
+    ("seed", "TEXT"),
+    ("settings", "TEXT"),  # JSON of every setting
+    ("finished", "REAL"),  # Unix time
+    ("wall_time", "REAL"),  # Seconds
+    ("ticks", "INTEGER"),
+    ("ticks_per_second", "REAL"),
+    ("stop_reason", "TEXT"),  # completed, stopped (e.g. window closed) or unknown (added from a log)
+    ("final_beacon_distance", "REAL"),
+    ("min_beacon_distance", "REAL"),
+    ("time_to_beacon", "REAL"),  # Simulated seconds until the centroid came within BEACON_REACHED of the beacon
+    ("mean_centroid_distance", "REAL"),
+    ("max_lost_robots", "INTEGER"),
+]
+COLUMN_NAMES = [name for (name, sqltype) in COLUMNS]
+TEXT_COLUMNS = [name for (name, sqltype) in COLUMNS if sqltype.startswith("TEXT")]
+INDEXED = [("taxis_algorithm", "robots"), ("beta",), ("omega",), ("seed",)]
+
+# Names of the simulator's logs, see run_name in swarm_sim.py
+LOG_NAME = re.compile(r"^(adv_)?(beta|omega)_([^_]+)_(.+)\.c?log$")
+
+
+def read_rows(path):
+    # The rows of a CSV or chunked simulator log, as lists of numbers
+    if path.endswith(".clog"):
+        from chunked_log import ChunkedLog # Only load NumPy when it is needed
+        for values in ChunkedLog(path).rows():
+            yield values
+    else:
+        with open(path) as log:
+            for line in log:
+                yield [float(value) for value in line.split(",")]
+
+
+class RunSummary(object):
+    """
+    Summary statistics of a run, updated with the values of every logged tick.
+    """
+    def __init__(self):
+        self.ticks = 0
+        self.final_beacon_distance = None
+        self.min_beacon_distance = None
+        self.time_to_beacon = None
+        self.centroid_distance_total = 0.0
+        self.centroid_distance_count = 0
+        self.max_lost_robots = None
+
+    def update(self, time, beacon_distance, centroid_distance=None, lost_robots=None):
+        self.ticks += 1
+        self.final_beacon_distance = beacon_distance
+        if self.min_beacon_distance is None or beacon_distance < self.min_beacon_distance:
+            self.min_beacon_distance = beacon_distance
+        if self.time_to_beacon is None and beacon_distance <= BEACON_REACHED:
+            self.time_to_beacon = time
+        if centroid_distance is not None:
+            self.centroid_distance_total += centroid_distance
+            self.centroid_distance_count += 1
+        if lost_robots is not None and (self.max_lost_robots is None or lost_robots > self.max_lost_robots):
+            self.max_lost_robots = lost_robots
+
+    def columns(self):
+        mean_centroid_distance = None
+        if self.centroid_distance_count:
+            mean_centroid_distance = self.centroid_distance_total / self.centroid_distance_count
+        return {"final_beacon_distance": self.final_beacon_distance, "min_beacon_distance": self.min_beacon_distance,
+                "time_to_beacon": self.time_to_beacon, "mean_centroid_distance": mean_centroid_distance,
+                "max_lost_robots": self.max_lost_robots}
+
+
+class RunIndex(object):
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Several simulations of a sweep can finish at once, so wait for each other's writes
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, %s)" %
+                                    (", ".join("%s %s" % column for column in COLUMNS)))
+            for columns in INDEXED:
+                self.connection.execute("CREATE INDEX IF NOT EXISTS runs_%s ON runs (%s)" %
+                                        ("_".join(columns), ", ".join(columns)))
+
+    def close(self):
+        self.connection.close()
+
+    def register(self, **values):
+        # Add a run, replacing any earlier run with the same log path
+        unknown = [name for name in values if name not in COLUMN_NAMES]
+        if unknown:
+            raise Exception("Unknown run index columns: " + ", ".join(unknown))
+        names = sorted(values)
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO runs (%s) VALUES (%s)" %
+                                    (", ".join(names), ", ".join("?" * len(names))),
+                                    [values[name] for name in names])
+
+    def register_simulation(self, simulation, log_path, summary, wall_time, stop_reason):
+        # Register a run of SwarmSimulation once it has finished
+        settings = dict((name, getattr(simulation.settings, name)) for name in dir(simulation.settings)
+                        if not name.startswith('_'))
+        values = {"run_name": simulation.run_name, "log_path": log_path, "seed": simulation.seed,
+                  "taxis_algorithm": settings["taxis_algorithm"], "beta": settings["beta"],
+                  "omega": settings["omega"], "robots": settings["robots"],
+                  "wireless_range": settings["wireless_range"], "settings": json.dumps(settings, sort_keys=True),
+                  "finished": time.time(), "wall_time": wall_time, "ticks": simulation.clock,
+                  "ticks_per_second": simulation.clock / wall_time if wall_time > 0 else None,
+                  "stop_reason": stop_reason}
+        values.update(summary.columns())
+        self.register(**values)
+
+    def add_log(self, path):
+        """
+        Register an existing log, with the settings its name encodes, reading it once for the summary.
+        """
+        match = LOG_NAME.match(os.path.basename(path))
+        if match is None:
+            raise Exception("%s is not named like a simulator log" % (path))
+        (advanced, algorithm, parameter, seed) = match.groups()
+
+        summary = RunSummary()
+        for values in read_rows(path):
+            if len(values) >= 4:
+                summary.update(values[0], values[1], values[2], int(values[3]))
+            elif len(values) >= 2:
+                summary.update(values[0], values[1])
+
+        values = {"run_name": os.path.splitext(os.path.basename(path))[0], "log_path": path, "seed": seed,
+                  "taxis_algorithm": algorithm, algorithm: float(parameter), "ticks": summary.ticks,
+                  "finished": os.path.getmtime(path), "stop_reason": "unknown"}
+        values.update(summary.columns())
+        self.register(**values)
+
+    def query(self, columns=None, order_by="log_path", **conditions):
+        """
+        Return the runs matching every condition as a list of dicts. A condition is a value, or a (low, high)
+        tuple for an inclusive range, either end of which may be None, e.g.
+        query(taxis_algorithm="omega", robots=20, omega=(25, 35)).
+        """
+        clauses = []
+        parameters = []
+        for (name, condition) in sorted(conditions.items()):
+            if name not in COLUMN_NAMES:
+                raise Exception("Unknown run index column: " + name)
+            if isinstance(condition, tuple):
+                (low, high) = condition
+                if low is not None:
+                    clauses.append("%s >= ?" % (name))
+                    parameters.append(low)
+                if high is not None:
+                    clauses.append("%s <= ?" % (name))
+                    parameters.append(high)
+            else:
+                clauses.append("%s = ?" % (name))
+                parameters.append(condition)
+
+        columns = columns or COLUMN_NAMES
+        for name in columns + [order_by]:
+            if name not in COLUMN_NAMES:
+                raise Exception("Unknown run index column: " + name)
+        sql = "SELECT %s FROM runs" % (", ".join(columns))
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY " + order_by
+        return [dict(row) for row in self.connection.execute(sql, parameters)]
+
+
+def parse_condition(text):
+    # column=value or column=low:high, with numbers converted
+    (name, value) = text.split("=", 1)
+
+    def number(part):
+        if part == "":
+            return None
+        if name in TEXT_COLUMNS:
+            return part
+        try:
+            return float(part)
+        except ValueError:
+            return part
+
+    if ":" in value:
+        (low, high) = value.split(":", 1)
+        return (name, (number(low), number(high)))
+    return (name, number(value))
+
+
+if __name__ == '__main__':
+    parser = OptionParser(usage="usage: %prog [options] [column=value | column=low:high]...")
+    parser.add_option('', '--index', dest='index', default=DEFAULT_PATH, help='path of the index database')
+    parser.add_option('', '--add', dest='add', default=False, action='store_true',
+                      help='register the log files given as arguments')
+    parser.add_option('', '--columns', dest='columns', default='log_path,taxis_algorithm,beta,omega,robots,seed,'
+                      'final_beacon_distance,time_to_beacon,mean_centroid_distance',
+                      help='comma separated columns to print')
+    (options, args) = parser.parse_args()
+
+    index = RunIndex(options.index)
+    if options.add:
+        for path in args:
+            index.add_log(path)
+        print("%d logs added" % (len(args)))
+        sys.exit(0)
+
+    columns = options.columns.split(",")
+    runs = index.query(columns, **dict(parse_condition(arg) for arg in args))
+    print("\t".join(columns))
+    for run in runs:
+        print("\t".join("" if run[name] is None else str(run[name]) for name in columns))
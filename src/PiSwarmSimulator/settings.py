@@ -62,6 +62,32 @@ class fwSettings(object):
     robots = 20  # robots is in robots (obviously)
     log_advanced = False  # creates logs with more juicy data, implies --experiment
     seed = None  # sets the random seed used for the run
+    placement = "box"  # initial layout of the swarm: box, disc or clusters
+    placement_clearance = 0.0  # extra gap between robots at placement, in cm
+    placement_clusters = 3  # number of clusters used by the clusters layout
+    real_time_factor = 50.0  # simulated seconds per real second when running with the GUI
+    fast_forward = False  # run the GUI simulation as fast as possible, toggle by pressing F
+    fast_forward_render_every = 100  # in fast-forward, only publish every Nth tick to the renderer
+    fast_forward_fps = 10.0  # renderer frame rate in fast-forward
+    lod_dot_zoom = 4.0  # below this zoom robots are drawn as dots, without sensors or labels
+    lod_sensor_zoom = 6.0  # sensor cones are drawn at or above this zoom
+    lod_label_zoom = 8.0  # robot IDs are drawn at or above this zoom
+    record = False  # record per-robot trajectories to logs/<run>.traj
+    record_interval = 1  # record every Nth tick
+    run_index = "logs/runs.sqlite"  # SQLite index that logged runs register in when they finish, see run_index.py ("" disables)
+    frames_every = 0  # save a PNG of the swarm to logs/<run>_frames/ every N ticks (0 disables), e.g. in headless runs
+    controller_mode = "robot"  # run the controllers one robot at a time ("robot") or for the whole swarm at once with NumPy ("vectorised"), see swarm_controller.py
+    obstacles = ""  # file of static obstacles in the arena, JSON polygons or an occupancy image, see obstacles.py
+    visibility_resolution = 1.0  # cell size of the precomputed map of the beacon's shadow behind obstacles, in cm
+    illumination = "raycast"  # raycast every robot every tick ("raycast") or only those whose line of sight may have changed ("incremental"), see illumination.py
+    arena_size = 500  # width and depth of the square arena, in cm
+    log_batch_rows = 1024  # log rows handed to the background log writer at a time, see log_writer.py
+    log_batches = 4  # log batches in flight before the simulation waits for the writer
+    log_fsync_batches = 16  # sync logs to disk every N batches (0: only when the run finishes)
+    log_format = "csv"  # write logs as CSV (<run>.log) or as compressed chunks ("chunked", <run>.clog), see chunked_log.py
+    log_decimals = -1  # decimal places kept by chunked logs, e.g. 4 for logs over 10x smaller than CSV (-1: exact)
+    tiles = "2x2"  # columns x rows of the tiles domain_decomposition.py splits the swarm into, one process each
+    tile_balance = 1.25  # move the tile borders to even out the robots when a tile holds this many times the mean (0: fixed grid over the arena)
 
 #             text                  variable
 checkboxes =( ("Warm Starting"   , "enableWarmStarting"), 
@@ -89,27 +115,56 @@ sliders = [
 
 from optparse import OptionParser
 
-parser = OptionParser()
-list_options = [i for i in dir(fwSettings) if not i.startswith('_')]
+def make_settings(**overrides):
+    """
+    Return a settings object of its own, with the current values of fwSettings
+    apart from the keyword arguments given, e.g. make_settings(robots=50).
+    Changing it does not affect fwSettings or any other settings object.
+    """
+    settings = fwSettings()
+    # Copy every value, so that later changes to fwSettings (e.g. parse_args) do not show through
+    for name in dir(fwSettings):
+        if not name.startswith('_'):
+            setattr(settings, name, getattr(fwSettings, name))
+    for (name, value) in overrides.items():
+        if not hasattr(fwSettings, name):
+            raise Exception("Unknown setting: %s" % (name,))
+        setattr(settings, name, value)
+    return settings
 
-for opt_name in list_options:
-    value = getattr(fwSettings, opt_name)
-    
-    if isinstance(value, bool):
-        parser.add_option('','--'+opt_name, dest=opt_name, default=value,
-                              action='store_'+str(not value).lower(),
-                              help=opt_name)
-            
-    else:
-        if isinstance(value, int):
-            opttype = 'int'
-        elif isinstance(value, float):
-            opttype = 'float'
+def parse_args(argv=None, settings=None):
+    """
+    Parse command line options (sys.argv by default) into settings (by default
+    fwSettings), and return the remaining arguments. Only the command line entry
+    point should parse into fwSettings; importing settings leaves the defaults
+    untouched.
+    """
+    if settings is None:
+        settings = fwSettings
+    parser = OptionParser()
+    list_options = [i for i in dir(fwSettings) if not i.startswith('_')]
+
+    for opt_name in list_options:
+        value = getattr(settings, opt_name)
+        
+        if isinstance(value, bool):
+            parser.add_option('','--'+opt_name, dest=opt_name, default=value,
+                                  action='store_'+str(not value).lower(),
+                                  help=opt_name)
+                
         else:
-            opttype = 'string'
-            
-        parser.add_option('','--'+opt_name, dest=opt_name, default=value,
-                          type=opttype,
-                          help='sets the %s option'%(opt_name,))
+            if isinstance(value, int):
+                opttype = 'int'
+            elif isinstance(value, float):
+                opttype = 'float'
+            else:
+                opttype = 'string'
+                
+            parser.add_option('','--'+opt_name, dest=opt_name, default=value,
+                              type=opttype,
+                              help='sets the %s option'%(opt_name,))
 
-(fwSettings, args) = parser.parse_args()
\ No newline at end of file
+    (options, args) = parser.parse_args(argv)
+    for opt_name in list_options:
+        setattr(settings, opt_name, getattr(options, opt_name))
+    return args
\ No newline at end of file
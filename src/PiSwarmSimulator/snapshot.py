@@ -0,0 +1,80 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Snapshots of the swarm state, published by the simulation thread and read by the renderer
+import threading
+import numpy
+
+
+class SwarmSnapshot(object):
+    # Compact, array-backed copy of the state of the swarm at the end of a tick, for rendering and recording
+    def __init__(self, num_robots):
+        self.clock = 0
+        self.positions = numpy.zeros((num_robots, 2), dtype=numpy.float32)
+        self.angles = numpy.zeros(num_robots, dtype=numpy.float32)
+        self.sensors = numpy.zeros(num_robots, dtype=numpy.uint8)  # Bit i is set when IR sensor i detects an obstacle
+        self.illuminated = numpy.zeros(num_robots, dtype=bool)
+        self.states = numpy.zeros(num_robots, dtype=numpy.uint8)  # FSM state codes, see STATE_CODES in swarm_state.py
+
+    def __len__(self):
+        return len(self.angles)
+
+    def capture(self, clock, swarm):
+        # Copy the state of the swarm (a SwarmState, synchronised with Box2D this tick) into the arrays
+        self.clock = clock
+        self.positions[:] = swarm.positions
+        self.angles[:] = swarm.angles
+        self.sensors[:] = swarm.sensors
+        self.illuminated[:] = swarm.illuminated
+        self.states[:] = swarm.states
+
+
+class SnapshotBuffer(object):
+    """
+    Double buffer of swarm snapshots with a spare slot.
+
+    The simulation thread fills back(), then publish() makes it the latest snapshot. The renderer calls
+    latest(), which hands it the most recently published snapshot and keeps it untouched until the next
+    call. Both sides only ever hold a lock for a pointer swap, so the simulation never waits for drawing
+    and the renderer never sees a half-written snapshot.
+    """
+    def __init__(self, num_robots):
+        self.slots = [SwarmSnapshot(num_robots) for slot in range(3)]
+        self.writing = 0    # Slot being filled by the simulation
+        self.ready = 1      # Most recently published slot
+        self.reading = 2    # Slot currently held by the renderer
+        self.fresh = False  # Has a snapshot been published since the renderer last took one?
+        self.published = False
+        self.lock = threading.Lock()
+
+    def back(self):
+        return self.slots[self.writing]
+
+    def publish(self):
+        with self.lock:
+            (self.writing, self.ready) = (self.ready, self.writing)
+            self.fresh = True
+            self.published = True
+
+    def latest(self):
+        # Returns None until the first snapshot has been published
+        with self.lock:
+            if self.fresh:
+                (self.reading, self.ready) = (self.ready, self.reading)
+                self.fresh = False
+            if not self.published:
+                return None
+        return self.slots[self.reading]
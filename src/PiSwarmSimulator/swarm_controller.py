@@ -0,0 +1,228 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Whole-swarm execution of the beta and omega controllers (controller_mode = "vectorised").
+#
+# The forward/avoid/turning state machines of BetaController and OmegaController are evaluated for every
+# robot at once, with masked NumPy operations on the swarm state arrays (see swarm_state.py), and make the
+# same decisions as running drive() on each robot in turn:
+#
+# - Robots only move in the physics step, and contacts only change during it, so every robot sees the same
+#   positions and sensors wherever it comes in the loop.
+# - A beta robot checks whether the robots it lost are still seen by its neighbours, and whether they are
+#   illuminated. Per robot, that information is already up to date for robots earlier in the loop and
+#   still from the previous tick for later ones, and the masks below reproduce exactly that.
+# - Headings are compared with the same single-wrap normaliseAngle, in the same floating point operations.
+#
+# Motors are still driven through the Robot methods, one Box2D call per wheel, and the rare changes of
+# heading (starting a coherence turn) use the per-robot code, so they are bit for bit the same.
+import math
+
+import numpy
+
+from swarm_state import STATE_CODES
+
+FORWARD = STATE_CODES["forward"]
+AVOID = STATE_CODES["avoid"]
+TURNING = STATE_CODES["turning"]
+
+FRONT_LEFT = [0, 1]  # IR sensors on the front left of the robot
+FRONT_RIGHT = [6, 7]
+
+TWO_PI = 2 * math.pi
+HEADING_TOLERANCE = math.radians(1)  # permittedOffset in Robot.headingAchieved
+
+
+def normalise_angles(angles):
+    # Robot.normaliseAngle for arrays: a single wrap into [0, 2pi]
+    return numpy.where(angles < 0, TWO_PI + angles, numpy.where(angles > TWO_PI, angles - TWO_PI, angles))
+
+
+def sensor_contacts(swarm):
+    # (robots, sensors) boolean array of contactObs
+    return ((swarm.sensors[:, None] >> numpy.arange(swarm.contact_distances.shape[1], dtype=numpy.uint8)) & 1) == 1
+
+
+class SwarmController(object):
+
+    def __init__(self, framework):
+        self.framework = framework
+        self.swarm = framework.swarm
+        self.robotlist = framework.robotlist
+
+    def drive(self, illuminated_before):
+        """
+        Drive every robot for this tick. Illumination has already been updated for every robot;
+        illuminated_before is the illumination at the start of the tick.
+        """
+        raise NotImplementedError
+
+    def call(self, method, indices):
+        # Call a Robot method on the robots at indices
+        for index in numpy.nonzero(indices)[0].tolist():
+            getattr(self.robotlist[index], method)()
+
+    def turn(self, turning):
+        """
+        The turning state for the robots in the turning mask whose heading was not yet achieved:
+        Robot.turnToHeading, which checks whether the heading has now been achieved and otherwise turns the
+        shortest way towards it.
+        """
+        swarm = self.swarm
+        rows = numpy.nonzero(turning)[0]
+        heading = normalise_angles(swarm.angles[rows])
+        target = swarm.heading_angles[rows]
+
+        lowest = normalise_angles(target - HEADING_TOLERANCE)
+        highest = normalise_angles(target + HEADING_TOLERANCE)
+        achieved = numpy.where(lowest > highest, (heading >= lowest) | (heading <= highest),
+                               (lowest <= heading) & (heading <= highest))
+        swarm.heading_achieved[rows] = achieved
+        swarm.heading_angles[rows[achieved]] = 0
+
+        rows = rows[~achieved]
+        difference = normalise_angles(target[~achieved] - heading[~achieved])
+        clockwise = (difference >= math.pi) | (difference <= 0)
+        for (index, right) in zip(rows.tolist(), clockwise.tolist()):
+            robot = self.robotlist[index]
+            if right:
+                robot.direction = "right"
+                robot.turnClockwise()
+            else:
+                robot.direction = "left"
+                robot.turnAntiClockwise()
+
+
+class BetaSwarmController(SwarmController):
+    """
+    BetaController.drive for the whole swarm. The neighbours of every robot are kept as boolean adjacency
+    matrices rather than in the robots' neighbours lists.
+    """
+    def __init__(self, framework):
+        super(BetaSwarmController, self).__init__(framework)
+        num_robots = len(self.robotlist)
+        self.neighbours = numpy.zeros((num_robots, num_robots), dtype=bool)
+        self.beta = framework.settings.beta
+        self.wireless_range = framework.calcSimSize(framework.settings.wireless_range)
+
+        # earlier[i, k]: robot k drives before robot i in a tick
+        self.earlier = numpy.tril(numpy.ones((num_robots, num_robots), dtype=bool), -1)
+
+    def drive(self, illuminated_before):
+        swarm = self.swarm
+        states = swarm.states.copy()
+        achieved = swarm.heading_achieved.copy()
+        contacts = sensor_contacts(swarm)
+
+        # Robots within wireless range of each other, as BetaController.drive measures them
+        previous = self.neighbours
+        dx = swarm.positions[:, 0, None] - swarm.positions[None, :, 0]
+        dy = swarm.positions[:, 1, None] - swarm.positions[None, :, 1]
+        current = numpy.sqrt(dx * dx + dy * dy) < self.wireless_range
+        numpy.fill_diagonal(current, False)
+
+        forward = states == FORWARD
+        self.call("driveForward", forward)
+
+        # Robots that have lost a link check whether they need to perform coherence
+        lost_link = forward & (current.sum(axis=1) < previous.sum(axis=1))
+        rows = numpy.nonzero(lost_link)[0]
+        if len(rows):
+            earlier = self.earlier[rows]
+            neighbours = current[rows]
+
+            # still_connected[r, j]: neighbours of robot rows[r] that can still see robot j, with the neighbour
+            # lists of robots earlier in the loop from this tick and of later ones from the previous tick
+            still_connected = (numpy.dot((neighbours & earlier).astype(numpy.int64), current.astype(numpy.int64)) +
+                               numpy.dot((neighbours & ~earlier).astype(numpy.int64), previous.astype(numpy.int64)))
+            illuminated = numpy.where(earlier, swarm.illuminated[None, :], illuminated_before[None, :])
+
+            lost = previous[rows] & ~current[rows]
+            coherence = (lost & ((still_connected < self.beta) | illuminated)).any(axis=1)
+            for index in rows[coherence].tolist():
+                robot = self.robotlist[index]
+                robot.state = "turning"
+                robot.changeHeading(180)
+
+        front = contacts[:, FRONT_LEFT + FRONT_RIGHT].any(axis=1)
+        swarm.states[forward & ~lost_link & front] = AVOID
+
+        avoid = states == AVOID
+        left = avoid & contacts[:, FRONT_LEFT].any(axis=1)
+        right = avoid & ~left & contacts[:, FRONT_RIGHT].any(axis=1)
+        self.call("driveForwardLeft", left)
+        self.call("driveForwardRight", right)
+        swarm.states[avoid & ~left & ~right] = FORWARD
+
+        # Robots that achieved their heading last tick stop turning, the others keep turning
+        turning = states == TURNING
+        self.turn(turning & ~achieved)
+        swarm.states[turning & achieved] = FORWARD
+
+        self.neighbours = current
+
+
+class OmegaSwarmController(SwarmController):
+    """
+    OmegaController.drive for the whole swarm.
+    """
+    def __init__(self, framework):
+        super(OmegaSwarmController, self).__init__(framework)
+        self.omega_ticks = framework.settings.omega / framework.ticklength
+        self.srange = framework.calcSimSize(10) / 2  # Half the IR sensor range, see OmegaController
+
+    def drive(self, illuminated_before):
+        swarm = self.swarm
+        swarm.timers += 1
+        states = swarm.states.copy()
+        achieved = swarm.heading_achieved.copy()
+
+        # OmegaController.is_sensor_active: the full sensor range when illuminated, half of it otherwise
+        active = sensor_contacts(swarm) & (swarm.illuminated[:, None] | (swarm.contact_distances < self.srange))
+
+        forward = states == FORWARD
+        self.call("driveForward", forward)
+        front = active[:, FRONT_LEFT + FRONT_RIGHT].any(axis=1)
+        swarm.states[forward & front] = AVOID
+
+        # Cohere towards the centroid of the rest of the swarm, computed exactly as OmegaController does
+        for index in numpy.nonzero(forward & ~front & (swarm.timers > self.omega_ticks))[0].tolist():
+            robot = self.robotlist[index]
+            robot.state = "turning"
+            centroid = robot.calculate_swarm_centroid()
+            robot.changeHeading(robot.headingToCoordinate(centroid.x, centroid.y))
+
+        avoid = states == AVOID
+        left = avoid & active[:, FRONT_LEFT].any(axis=1)
+        right = avoid & ~left & active[:, FRONT_RIGHT].any(axis=1)
+        self.call("driveForwardLeft", left)
+        self.call("driveForwardRight", right)
+        finished = avoid & ~left & ~right
+        swarm.states[finished] = FORWARD
+        swarm.timers[finished] = 0
+
+        turning = states == TURNING
+        self.turn(turning & ~achieved)
+        finished = turning & achieved
+        swarm.states[finished] = FORWARD
+        swarm.timers[finished] = 0
+
+
+def swarm_controller(framework):
+    # The whole-swarm controller for the simulation's taxis algorithm
+    if framework.settings.taxis_algorithm == "beta":
+        return BetaSwarmController(framework)
+    return OmegaSwarmController(framework)
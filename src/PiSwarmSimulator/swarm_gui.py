@@ -0,0 +1,103 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The simulation with the interactive pygame GUI
+from framework import *
+from settings import fwSettings
+from swarm_sim import SwarmSimulation
+from pacing import Pacer
+from swarm_renderer import SwarmRenderer
+
+# The back-end is only imported here, so that headless runs never load it
+Framework = load_backend(fwSettings.backend)
+
+# Initialise and run the simulation with the GUI
+class runSim(SwarmSimulation, Framework):
+    
+    def __init__(self, settings=None):
+        super(runSim, self).__init__(settings)
+        
+        # Pace the simulation to a real-time factor (simulated seconds per real second) for easier visualisation
+        self.pacer = Pacer(self.ticklength, self.settings.real_time_factor,
+                           render_every=self.settings.fast_forward_render_every,
+                           fast_forward_fps=self.settings.fast_forward_fps, fast_forward=self.settings.fast_forward)
+        
+        # Draw the swarm from snapshots, using the static geometry of the run
+        self.rays_visible = True
+        meta = self.run_meta
+        self.swarm_renderer = SwarmRenderer(meta["sensor_vertices"], meta["robot_radius"], meta["beacon_position"],
+                                            meta["beacon_radius"], meta["arena_vertices"],
+                                            font=getattr(self, 'font', None), dot_zoom=self.settings.lod_dot_zoom,
+                                            sensor_zoom=self.settings.lod_sensor_zoom,
+                                            label_zoom=self.settings.lod_label_zoom,
+                                            obstacle_polygons=meta["obstacle_polygons"])
+
+    def Step(self, settings):
+        super(runSim, self).Step(settings)
+        self.pacer.tick() # Slow simulation down for easier visualisation
+
+    # Publish a snapshot to the renderer only as often as it draws
+    def RenderDue(self):
+        return self.pacer.should_render(self.clock)
+
+    def Draw(self):
+        super(runSim, self).Draw()
+
+        # Draw only from the latest published snapshot - the Box2D world belongs to the simulation thread
+        snapshot = self.snapshots.latest()
+
+        # Beacon, beacon rays, sensors, robots, robot IDs and arena in one batched pass
+        self.swarm_renderer.draw(self.screen, snapshot, self.viewZoom, self.viewOffset, self.screenSize.y,
+                                           self.frameRects, rays_visible=self.rays_visible)
+
+        # Print simulation time elapsed in the corner of the screen
+        if snapshot is not None:
+            self.Print("Time: %f s" % (self.ticklength * snapshot.clock), (255,255,255))
+        if self.settings.pause:
+            self.Print("****PAUSED****", (200,0,0))
+        elif self.pacer.fast_forward:
+            self.Print("Real-time factor: %.1fx (fast-forward)" % (self.pacer.achieved_factor), (255,255,255))
+        else:
+            self.Print("Real-time factor: %.1fx (target %.1fx)" % (self.pacer.achieved_factor, self.pacer.real_time_factor), (255,255,255))
+        self.Print("Ticks/sec: %.0f" % (self.pacer.tick_rate), (255,255,255))
+        self.Print("FPS: %.0f" % (self.fps), (255,255,255))
+
+    # Draw less often in fast-forward so the simulation thread gets more time
+    def FrameRate(self):
+        return self.pacer.frame_rate(self.settings.hz)
+
+    # Sleep while paused
+    def Idle(self):
+        self.pacer.idle()
+
+    # Everything is drawn from snapshots in Draw, so skip the debug draw of the (concurrently stepped) world
+    def DrawWorld(self):
+        pass
+
+    # Everything Draw draws is recorded in self.frameRects
+    def UseDirtyRects(self):
+        return True
+
+    # Check for keyboard input
+    def Keyboard(self, key):
+        if key == Keys.K_p:
+           self.pacer.set_real_time_factor(self.pacer.real_time_factor * 2)
+        elif key == Keys.K_o:
+           self.pacer.set_real_time_factor(self.pacer.real_time_factor / 2)
+        elif key == Keys.K_f:
+           self.pacer.toggle_fast_forward()
+        elif key == Keys.K_b:
+           self.rays_visible = not self.rays_visible
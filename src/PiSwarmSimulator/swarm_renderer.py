@@ -0,0 +1,177 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Batched drawing of the swarm from snapshot arrays, without touching Box2D
+import numpy
+import pygame
+
+# Colours, matching the ones the debug draw produced (solid shapes are drawn at half brightness)
+BACKGROUND_COLOUR = (0, 0, 0)
+ROBOT_COLOUR = (0, 191, 191)
+ILLUMINATED_ROBOT_COLOUR = (191, 127, 0)
+SENSOR_COLOUR = (127, 63, 153)
+ACTIVE_SENSOR_COLOUR = (153, 0, 0)
+BEACON_COLOUR = (63, 114, 63)
+RAY_COLOUR = (255, 255, 0)
+AXIS_COLOUR = (255, 0, 0)
+ARENA_COLOUR = (255, 255, 255)
+LABEL_COLOUR = (0, 0, 0)
+
+# Default level-of-detail thresholds, as zoom levels (screen pixels per simulation unit)
+DOT_ZOOM = 4.0     # Below this robots are drawn as dots, without sensors or labels
+SENSOR_ZOOM = 6.0  # Sensor cones are drawn at or above this zoom
+LABEL_ZOOM = 8.0   # Robot IDs are drawn at or above this zoom
+
+
+def to_screen(points, zoom, offset, screen_height):
+    # Convert an array of world coordinates (..., 2) to integer screen coordinates, flipping the y axis
+    screen = numpy.empty(points.shape, dtype=numpy.float64)
+    screen[..., 0] = points[..., 0] * zoom - offset[0]
+    screen[..., 1] = screen_height - (points[..., 1] * zoom - offset[1])
+    return numpy.rint(screen).astype(int)
+
+
+class SwarmRenderer(object):
+    """
+    Draws the beacon, arena and swarm from a snapshot onto a pygame surface.
+
+    Every robot and sensor vertex is transformed to screen coordinates in one NumPy operation per frame,
+    and the bounding rectangle of everything drawn is appended to rects so that only the changed parts of
+    the screen need to be updated: one rectangle per robot, around its body, sensors and label, and one
+    around all the beacon rays. Detail is reduced as the view zooms out: first labels, then sensor
+    cones are skipped, and eventually robots are drawn as dots. Robot ID labels are rendered once and
+    cached, as font rendering is by far the most expensive part of a frame.
+    """
+    def __init__(self, sensor_vertices, robot_radius, beacon_position, beacon_radius, arena_vertices, font=None,
+                 dot_zoom=DOT_ZOOM, sensor_zoom=SENSOR_ZOOM, label_zoom=LABEL_ZOOM, obstacle_polygons=()):
+        self.sensor_vertices = numpy.array(sensor_vertices, dtype=numpy.float64)  # (sensors, vertices, 2), robot frame
+        self.robot_radius = robot_radius
+        self.beacon_position = numpy.array(beacon_position, dtype=numpy.float64)
+        self.beacon_radius = beacon_radius
+        self.arena_vertices = numpy.array(arena_vertices, dtype=numpy.float64)
+        self.obstacle_polygons = [numpy.array(polygon, dtype=numpy.float64) for polygon in obstacle_polygons]
+
+        self.font = font
+        self.labels = {}  # Rendered label surfaces, keyed by (robot ID, colour)
+
+        self.dot_zoom = dot_zoom
+        self.sensor_zoom = sensor_zoom
+        self.label_zoom = label_zoom
+
+    def label(self, robotid, colour):
+        key = (robotid, colour)
+        surface = self.labels.get(key)
+        if surface is None:
+            surface = self.font.render(str(robotid), True, colour)
+            self.labels[key] = surface
+        return surface
+
+    def draw(self, surface, snapshot, zoom, offset, screen_height, rects, rays_visible=True):
+        # Returns the screen coordinates of the robot centres, e.g. for drawing labels
+        beacon = to_screen(self.beacon_position, zoom, offset, screen_height).tolist()
+        beacon_radius = max(1, int(self.beacon_radius * zoom))
+        rects.append(pygame.draw.circle(surface, BEACON_COLOUR, beacon, beacon_radius, 0))
+
+        centres = numpy.zeros((0, 2), dtype=int)
+        if snapshot is not None and len(snapshot) > 0:
+            if zoom < self.dot_zoom:
+                centres = self.draw_dots(surface, snapshot, zoom, offset, screen_height, beacon, rects, rays_visible)
+            else:
+                (centres, bounds) = self.draw_swarm(surface, snapshot, zoom, offset, screen_height, beacon, rects,
+                                                    rays_visible)
+                if self.font is not None and zoom >= self.label_zoom:
+                    self.draw_labels(surface, centres, bounds)
+                rects.extend(pygame.Rect(left, top, right - left + 1, bottom - top + 1)
+                             for (left, top, right, bottom) in bounds.tolist())
+
+        arena = to_screen(self.arena_vertices, zoom, offset, screen_height).tolist()
+        rects.append(pygame.draw.polygon(surface, ARENA_COLOUR, arena, 1))
+        for polygon in self.obstacle_polygons:
+            rects.append(pygame.draw.polygon(surface, ARENA_COLOUR, to_screen(polygon, zoom, offset, screen_height).tolist(), 0))
+        return centres
+
+    def draw_swarm(self, surface, snapshot, zoom, offset, screen_height, beacon, rects, rays_visible):
+        # Returns the screen coordinates of the robot centres and the bounds (left, top, right, bottom) of each robot
+        positions = snapshot.positions.astype(numpy.float64)
+        angles = snapshot.angles.astype(numpy.float64)
+        (cos, sin) = (numpy.cos(angles), numpy.sin(angles))
+
+        centres = to_screen(positions, zoom, offset, screen_height)
+        self.draw_rays(surface, snapshot, centres, beacon, rects, rays_visible)
+
+        # Rotate every sensor cone of every robot into place at once: (robots, sensors, vertices, 2)
+        if zoom >= self.sensor_zoom:
+            local_x = self.sensor_vertices[..., 0]
+            local_y = self.sensor_vertices[..., 1]
+            world = numpy.empty((len(positions),) + self.sensor_vertices.shape)
+            world[..., 0] = positions[:, 0, None, None] + cos[:, None, None] * local_x - sin[:, None, None] * local_y
+            world[..., 1] = positions[:, 1, None, None] + sin[:, None, None] * local_x + cos[:, None, None] * local_y
+            sensor_points = to_screen(world, zoom, offset, screen_height)
+            sensors = sensor_points.tolist()
+
+        # Sensor cones, red when they detect an obstacle
+        if zoom >= self.sensor_zoom:
+            sensor_count = len(self.sensor_vertices)
+            active = (snapshot.sensors[:, None] >> numpy.arange(sensor_count, dtype=numpy.uint8)) & 1
+            for (robot_sensors, robot_active) in zip(sensors, active.tolist()):
+                for (polygon, is_active) in zip(robot_sensors, robot_active):
+                    colour = ACTIVE_SENSOR_COLOUR if is_active else SENSOR_COLOUR
+                    pygame.draw.polygon(surface, colour, polygon, 0)
+
+        # Robot bodies, with a line from the centre to the front of the robot
+        radius = max(1, int(self.robot_radius * zoom))
+        bounds = numpy.hstack([centres - radius, centres + radius])
+        if zoom >= self.sensor_zoom:
+            bounds[:, :2] = numpy.minimum(bounds[:, :2], sensor_points.min(axis=(1, 2)))
+            bounds[:, 2:] = numpy.maximum(bounds[:, 2:], sensor_points.max(axis=(1, 2)))
+        fronts = numpy.empty(centres.shape, dtype=int)
+        fronts[:, 0] = numpy.rint(centres[:, 0] - radius * cos)
+        fronts[:, 1] = numpy.rint(centres[:, 1] + radius * sin)
+        for (centre, front, illuminated) in zip(centres.tolist(), fronts.tolist(), snapshot.illuminated.tolist()):
+            colour = ILLUMINATED_ROBOT_COLOUR if illuminated else ROBOT_COLOUR
+            pygame.draw.circle(surface, colour, centre, radius, 0)
+            pygame.draw.aaline(surface, AXIS_COLOUR, centre, front)
+
+        return (centres, bounds)
+
+    def draw_rays(self, surface, snapshot, centres, beacon, rects, rays_visible):
+        # Beacon rays to illuminated robots, with one rectangle around them all
+        if rays_visible:
+            ends = centres[snapshot.illuminated]
+            for centre in ends.tolist():
+                pygame.draw.aaline(surface, RAY_COLOUR, beacon, centre)
+            if len(ends):
+                (left, top) = numpy.minimum(ends.min(axis=0), beacon).tolist()
+                (right, bottom) = numpy.maximum(ends.max(axis=0), beacon).tolist()
+                rects.append(pygame.Rect(left - 1, top - 1, right - left + 3, bottom - top + 3))
+
+    def draw_dots(self, surface, snapshot, zoom, offset, screen_height, beacon, rects, rays_visible):
+        # Lowest level of detail: a small square per robot, no heading, sensors or labels
+        centres = to_screen(snapshot.positions.astype(numpy.float64), zoom, offset, screen_height)
+        self.draw_rays(surface, snapshot, centres, beacon, rects, rays_visible)
+        for ((x, y), illuminated) in zip(centres.tolist(), snapshot.illuminated.tolist()):
+            colour = ILLUMINATED_ROBOT_COLOUR if illuminated else ROBOT_COLOUR
+            rects.append(surface.fill(colour, (x - 1, y - 1, 3, 3)))
+        return centres
+
+    def draw_labels(self, surface, centres, bounds, colour=LABEL_COLOUR):
+        # Robot IDs, blitted from cached surfaces (the index of the robot in the snapshot is its ID), growing
+        # the bounds of each robot to take in its label
+        for (robotid, (x, y)) in enumerate(centres.tolist()):
+            drawn = surface.blit(self.label(robotid, colour), (x - 1, y - 1))
+            if drawn.width and drawn.height:
+                bounds[robotid, :2] = numpy.minimum(bounds[robotid, :2], drawn.topleft)
+                bounds[robotid, 2:] = numpy.maximum(bounds[robotid, 2:], (drawn.right - 1, drawn.bottom - 1))
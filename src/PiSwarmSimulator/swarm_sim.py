@@ -0,0 +1,449 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The simulation itself, without any rendering, so that it can run headless or be embedded
+import os, math, datetime, re
+import time as wallclock  # framework.py exports the function time()
+from framework import *
+from headless_framework import HeadlessFramework
+
+# Import simulator classes
+from arena import *
+from robot import *
+from proxSensor import *
+from placement import place_robots
+from rng import RandomStreams
+from swarm_state import SwarmState, count_lost
+from swarm_controller import swarm_controller
+from obstacles import Obstacles, VisibilityMap, load_polygons, SHADOWED
+from illumination import IlluminationTracker
+from snapshot import SnapshotBuffer
+from trajectory import TrajectoryRecorder
+from run_index import RunIndex, RunSummary
+from log_writer import LogWriter, LOG_COLUMNS, log_extension
+
+from beta_controller import *
+from omega_controller import *
+
+# Name runs after the algorithm, its parameter and the seed
+def run_name(settings, seed):
+    experiment_name = ""
+    if settings.log_advanced:
+        experiment_name += "adv_"
+
+    experiment_name += settings.taxis_algorithm
+
+    if settings.taxis_algorithm == "beta":
+        experiment_name += "_" + str(settings.beta)
+    elif settings.taxis_algorithm == "omega":
+        experiment_name += "_" + str(settings.omega)
+    else:
+        pass # Add your own code here
+
+    return experiment_name + '_' + str(seed)
+
+# Initialise and run the simulation. Renderers are added by combining this with a framework, see
+# HeadlessSwarmSimulation below and runSim in swarm_gui.py
+class SwarmSimulation(FrameworkBase):
+    
+    name = "Pi Swarm Simulator"
+    
+    def __init__(self, settings=None):
+        super(SwarmSimulation, self).__init__(settings)
+        
+        if self.settings.taxis_algorithm not in ["beta", "omega"]:
+            raise Exception("settings.taxis_algorithm must be either 'beta' or 'omega'")
+
+        if self.settings.seed is None:
+            # Seed RNG, use system time converted to int so it can easily be stored and rerun
+            self.starttime = datetime.datetime.now()
+            timestamp = str(self.starttime)
+            seed = re.sub(r"\D", "", timestamp)
+        else:
+            seed = str(self.settings.seed)
+
+        # Each simulation has its own random number streams, so that several can run in one process, with
+        # one per robot and subsystem so results do not depend on the order things are built in
+        self.seed = seed
+        self.streams = RandomStreams(seed)
+            
+        self.run_name = run_name(self.settings, seed)
+
+        # Construct log files and directory
+        self.path = 'logs/'
+        if self.settings.experiment or self.settings.log_advanced or self.settings.record or self.settings.frames_every > 0:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+
+        # Log rows are written out by a background thread, see log_writer.py
+        self.logpath = self.path + self.run_name + log_extension(self.settings)
+        if self.settings.experiment or self.settings.log_advanced:
+            columns = LOG_COLUMNS[4] if self.settings.log_advanced else LOG_COLUMNS[2]
+            self.logwriter = LogWriter(self.logpath, columns, self.settings.log_batch_rows, self.settings.log_batches,
+                                       self.settings.log_fsync_batches, self.settings.log_format,
+                                       self.settings.log_decimals)
+
+        # Summary statistics of logged runs, for the run index
+        self.summary = RunSummary()
+        self.started = wallclock.time()
+
+        # Define simulation timing
+        self.ticklength = 0.25 # Proportion of a second that each timestep is
+        self.clock = 0
+        self.experiment_ticks = 50000 # Experiments end after this many ticks
+        
+        # Set up the infrared beacon
+        self.beacon_position = b2Vec2(0, 1)
+        self.beacon_radius = 0.5
+        beaconshape = b2CircleShape(radius=self.beacon_radius)
+        beaconfixture = b2FixtureDef(shape=beaconshape, userData=self)
+        self.world.CreateStaticBody(position=self.beacon_position, angle=math.radians(270), fixtures=beaconfixture, userData=self)
+        
+        # Define world parameters
+        self.world.gravity = (0.0, 0.0)
+        self.unitsize = 10.0 # Number of cm one simulation unit represents
+    
+        # Define simulation values
+        num_robots = self.settings.robots
+        arena_x_size = self.settings.arena_size # Size in cm
+        arena_y_size = self.settings.arena_size
+        
+        # Set up the arena
+        self.thearena = Arena(self.world, self.calcSimSize(arena_x_size), self.calcSimSize(arena_y_size))
+
+        # Optional static obstacles, and the beacon's shadow behind them, see obstacles.py
+        self.obstacles = None
+        self.visibility = None
+        if self.settings.obstacles:
+            polygons = load_polygons(self.settings.obstacles, (arena_x_size, arena_y_size))
+            self.obstacles = Obstacles(self.world, [[(self.calcSimSize(x), self.calcSimSize(y)) for (x, y) in polygon]
+                                                    for polygon in polygons])
+            self.visibility = VisibilityMap.cached(self.obstacles.edges, tuple(self.beacon_position),
+                                                   (-self.calcSimSize(arena_x_size) / 2, 0,
+                                                    self.calcSimSize(arena_x_size) / 2, self.calcSimSize(arena_y_size)),
+                                                   self.calcSimSize(self.settings.visibility_resolution))
+        
+        # Generate a swarm of robots, with their state held in arrays
+        self.robotlist = []
+        self.swarm = SwarmState(num_robots)
+
+        # Initial placement region - a box a sixth of the size of the arena, towards the far wall from the beacon
+        arenax = self.calcSimSize(arena_x_size)
+        arenay = self.calcSimSize(arena_y_size)
+        region_size = (float(arenax) / 6, float(arenay) / 6)
+        region_centre = (0, (float(arenay) / 6) * 5)
+
+        # Keep robots clear of the arena walls
+        robot_radius = self.calcSimSize(ROBOT_DIAMETER) / 2
+        arena_bounds = (-arenax / 2 + robot_radius, robot_radius, arenax / 2 - robot_radius, arenay - robot_radius)
+
+        # Non-overlapping positions, drawn from the placement stream
+        positions = place_robots(num_robots, self.calcSimSize(ROBOT_DIAMETER), self.streams.subsystem("placement"),
+                                 layout=self.settings.placement, centre=region_centre, size=region_size,
+                                 clearance=self.calcSimSize(self.settings.placement_clearance),
+                                 clusters=self.settings.placement_clusters, bounds=arena_bounds)
+        if self.obstacles is not None and self.obstacles.blocked(positions, robot_radius).any():
+            raise Exception("Robots would start inside or touching an obstacle, keep the placement region clear")
+
+        for x in range(num_robots):
+
+            (xpos, ypos) = (float(positions[x][0]), float(positions[x][1]))
+
+            if self.settings.taxis_algorithm == "beta":
+                currentRobot = BetaController(self, x, b2Vec2(xpos, ypos))
+            else: # self.settings.taxis_algorithm == "omega":
+                currentRobot = OmegaController(self, x, b2Vec2(xpos, ypos))
+
+            self.robotlist.append(currentRobot)
+
+        self.swarm.sync()
+
+        # Optionally run the controllers for the whole swarm at once, see swarm_controller.py
+        if self.settings.controller_mode not in ["robot", "vectorised"]:
+            raise Exception("settings.controller_mode must be either 'robot' or 'vectorised'")
+        self.swarm_controller = None
+        if self.settings.controller_mode == "vectorised":
+            self.swarm_controller = swarm_controller(self)
+
+        # Optionally work out illumination analytically, and only for robots that may have changed, see illumination.py
+        if self.settings.illumination not in ["raycast", "incremental"]:
+            raise Exception("settings.illumination must be either 'raycast' or 'incremental'")
+        self.illumination = None
+        if self.settings.illumination == "incremental":
+            self.illumination = IlluminationTracker(self, robot_radius)
+
+        # Static geometry used to draw robots from snapshots
+        sensor_vertices = []
+        if self.robotlist:
+            sensor_vertices = [[tuple(v) for v in sensor.sensorshape.vertices] for sensor in self.robotlist[0].IRSensList]
+        centre = self.thearena.centrePoint
+        arena_vertices = [(centre[0]+x[0], centre[1]+x[1]) for x in self.thearena.corners]
+
+        # Swarm state published at the end of each tick for the renderer
+        self.snapshots = SnapshotBuffer(num_robots)
+
+        # Description of the run, stored with recorded trajectories and used to render frames off-screen
+        self.run_meta = {"ticklength": self.ticklength, "unitsize": self.unitsize,
+                         "taxis_algorithm": self.settings.taxis_algorithm, "beta": self.settings.beta,
+                         "omega": self.settings.omega, "wireless_range": self.settings.wireless_range, "seed": seed,
+                         "beacon_position": tuple(self.beacon_position), "beacon_radius": self.beacon_radius,
+                         "robot_radius": self.calcSimSize(ROBOT_DIAMETER) / 2, "sensor_vertices": sensor_vertices,
+                         "arena_vertices": arena_vertices,
+                         "obstacle_polygons": self.obstacles.polygons if self.obstacles is not None else []}
+
+        # Optionally record the trajectory of every robot, see trajectory.py
+        self.recorder = None
+        if self.settings.record:
+            interval = max(1, self.settings.record_interval)
+            self.recorder = TrajectoryRecorder(self.path + self.run_name + '.traj', num_robots,
+                                               (self.experiment_ticks + 2) // interval + 1, interval, self.run_meta)
+
+        # Optionally save a picture of the swarm every N ticks, see export_frames.py
+        self.frame_renderer = None
+        if self.settings.frames_every > 0:
+            self.frames_path = self.path + self.run_name + '_frames/'
+            if not os.path.exists(self.frames_path):
+                os.makedirs(self.frames_path)
+            from export_frames import FrameRenderer # Only load pygame when it is needed
+            self.frame_renderer = FrameRenderer(self.run_meta)
+
+    # Carry out these actions at each timestep
+    def Step(self, settings):
+        super(SwarmSimulation, self).Step(settings)
+
+        # Bodies only move during the physics step, so read them all once here
+        self.swarm.sync()
+
+        illumination = None
+        if self.illumination is not None:
+            illumination = self.illumination.update()
+
+        if self.swarm_controller is None:
+            for therobot in self.robotlist:
+                if illumination is None:
+                    self.UpdateIllumination(therobot)
+                else:
+                    therobot.illuminated = illumination[therobot.robotid]
+
+                # Drive robots
+                therobot.drive()
+        else:
+            illuminated = self.swarm.illuminated.copy()
+            if illumination is None:
+                for therobot in self.robotlist:
+                    self.UpdateIllumination(therobot)
+            else:
+                self.swarm.illuminated[:] = illumination
+            self.swarm_controller.drive(illuminated)
+        
+        # Output to log file
+        if self.settings.experiment or self.settings.log_advanced:
+
+            if not self.settings.log_advanced:
+                # Output the simulation time and distance of swarm centroid from beacon
+                centroid = self.calculate_swarm_centroid()
+                distance = self.calccmSize(self.calcDistance(centroid, self.beacon_position))
+                outputlist = [self.clock * self.ticklength, distance]
+                if self.settings.run_index:
+                    self.summary.update(self.clock * self.ticklength, distance,
+                                        self.calccmSize(self.calculate_mean_distance_from_swarm_centroid()))
+
+            else:
+                # output simulation time, distance of swarm centroid from beacon and ...
+                centroid = self.calculate_swarm_centroid()
+                beacon_distance = self.calccmSize(self.calcDistance(centroid, self.beacon_position))
+                avg_distance_from_centroid = self.calccmSize(self.calculate_mean_distance_from_swarm_centroid())
+                lost_robots = self.num_lost_robots()
+                outputlist = [self.clock * self.ticklength, beacon_distance, avg_distance_from_centroid, lost_robots]
+                if self.settings.run_index:
+                    self.summary.update(self.clock * self.ticklength, beacon_distance, avg_distance_from_centroid,
+                                        lost_robots)
+
+            self.logwriter.append(outputlist)
+            # End the simulation after a fixed number of iterations
+            if self.clock > self.experiment_ticks:
+                self.Quit()
+
+        # Capture the state of the swarm for the renderer and the trajectory recorder
+        render = self.RenderDue()
+        record = self.recorder is not None and self.recorder.due(self.clock)
+        frame = self.frame_renderer is not None and self.clock % self.settings.frames_every == 0
+        if render or record or frame:
+            snapshot = self.snapshots.back()
+            snapshot.capture(self.clock, self.swarm)
+            if record:
+                self.recorder.record(snapshot)
+            if frame:
+                self.frame_renderer.save(snapshot, "%sframe_%06d.png" % (self.frames_path, self.clock // self.settings.frames_every))
+            if render:
+                self.snapshots.publish()
+
+        # Increment simulation clock
+        self.clock += 1
+
+    def UpdateIllumination(self, therobot):
+
+        # Robots in the shadow of a static obstacle cannot see the beacon, whatever else is in the way
+        if self.visibility is not None and self.visibility.classify(therobot.position) == SHADOWED:
+            therobot.illuminated = False
+            return
+
+        # Cast ray from the beacon to the robot, to check for line-of-sight 
+        callback = RayCastClosestCallback()            
+        self.world.RayCast(callback, self.beacon_position, therobot.body.position)
+        
+        # Update illumination status based on raycast result
+        if callback.hit:
+            if callback.fixture.body.position == therobot.body.position:
+                therobot.illuminated = True
+            else:
+                therobot.illuminated = False
+
+    # Whether a renderer wants a snapshot of the swarm from this tick
+    def RenderDue(self):
+        return False
+
+    # Close output files once the simulation has finished
+    def Finish(self):
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.settings.experiment or self.settings.log_advanced:
+            self.logwriter.close()
+
+            # Register the run in the index, with how long it took and why it stopped
+            if self.settings.run_index:
+                wall_time = wallclock.time() - self.started
+                stop_reason = "completed" if self.clock > self.experiment_ticks else "stopped"
+                index = RunIndex(self.settings.run_index)
+                index.register_simulation(self, self.logpath, self.summary, wall_time, stop_reason)
+                index.close()
+
+    # Check for contact between fixtures
+    def BeginContact(self, contact):
+        super(SwarmSimulation, self).BeginContact(contact)
+        
+        # Get the two objects that have collided
+        fixtureA = contact.fixtureA.userData
+        fixtureB = contact.fixtureB.userData
+        bodyA = contact.fixtureA.body.userData 
+        bodyB = contact.fixtureB.body.userData
+        
+        # Update IR sensor flag to indicate that an obstacle has been detected
+        if isinstance(fixtureA, ProxSensor) and not isinstance(fixtureB, ProxSensor):
+            fixtureA.contactObs = True
+            if isinstance(fixtureB, Robot):
+                fixtureA.contactDistance = self.calcDistance(fixtureA.robottransform.position, fixtureB.body.position)
+                fixtureA.contactDistance = fixtureA.contactDistance - fixtureB.diameter # Subtract diameter of a robot (same as radius of both the robots combined) 
+        elif isinstance(fixtureB, ProxSensor) and not isinstance(fixtureB, ProxSensor):
+            fixtureB.contactObs = True
+            if isinstance(fixtureA, Robot):
+                fixtureB.contactDistance = self.calcDistance(fixtureB.robottransform.position, fixtureA.body.position)
+                fixtureB.contactDistance = fixtureB.contactDistance - fixtureA.diameter # Subtract diameter of a robot (same as radius of both the robots combined)
+        
+    def EndContact(self, contact):
+        super(SwarmSimulation, self).EndContact(contact)
+        
+        # Get the two objects that have stopped colliding
+        fixtureA = contact.fixtureA.userData
+        fixtureB = contact.fixtureB.userData
+        bodyA = contact.fixtureA.body.userData 
+        bodyB = contact.fixtureB.body.userData
+
+        # Update IR sensor flag to indicate that an obstacle is no longer detected                
+        if isinstance(fixtureA, ProxSensor):
+            fixtureA.contactObs = False                
+        elif isinstance(fixtureB, ProxSensor):
+            fixtureB.contactObs = False
+    
+    # From the real world size in cm calculate the size in simulation units
+    def calcSimSize(self, sizeInCm):        
+        sizeInUnits = (1 / float(self.unitsize)) * sizeInCm
+        return sizeInUnits
+ 
+    # From the size in simulation units calculate real world size in cm
+    def calccmSize(self, sizeinUnits):
+        sizeIncm = sizeinUnits * float(self.unitsize)
+        return sizeIncm
+    
+    # Calculate Euclidean distance between two points
+    def calcDistance(self, point_a, point_b):
+        return math.sqrt(math.pow(point_a[0] - point_b[0], 2) + math.pow(point_a[1] - point_b[1], 2))
+
+    def calculate_swarm_centroid(self):
+
+        xpos = 0
+        ypos = 0
+
+        for (x, y) in self.swarm.positions.tolist():
+            xpos += x
+            ypos += y
+
+        num_robots = len(self.robotlist)
+
+        xpos /= num_robots
+        ypos /= num_robots
+
+        return b2Vec2(xpos, ypos)
+
+    def calculate_mean_distance_from_swarm_centroid(self):
+
+        centroid = self.calculate_swarm_centroid()
+
+        total_distance = 0
+
+        for robot_position in self.swarm.positions.tolist():
+
+            total_distance += self.calcDistance(robot_position, centroid)
+
+        return total_distance / len(self.robotlist)
+
+    def num_lost_robots(self):
+        # Robots with no other robot within wireless range, as the lost_robots metric of metrics.py
+        positions = self.swarm.positions
+        return int(count_lost(positions[None, :, 0], positions[None, :, 1],
+                              self.calcSimSize(self.settings.wireless_range))[0])
+
+
+# Raycast class modified from pybox2D raycasting example code 
+class RayCastClosestCallback(b2RayCastCallback):
+    """This callback finds the closest hit"""
+    def __repr__(self): return 'Closest hit'
+    def __init__(self, **kwargs):
+        b2RayCastCallback.__init__(self, **kwargs)
+        self.fixture=None
+        self.hit=False
+
+    # Called for each fixture found in the query. You control how the ray proceeds
+    # by returning a float that indicates the fractional length of the ray. By returning
+    # 0, you set the ray length to zero. By returning the current fraction, you proceed
+    # to find the closest point. By returning 1, you continue with the original ray
+    # clipping. By returning -1, you will filter out the current fixture (the ray
+    # will not hit it).
+    def ReportFixture(self, fixture, point, normal, fraction):
+        # You will get this error: "TypeError: Swig director type mismatch in output value of type 'float32'"
+        # without returning a value
+        if fixture.sensor == True:
+            return -1 # Ignore sensor fixtures, keeping the closest hit reported so far
+        self.hit=True
+        self.fixture=fixture
+        self.point=b2Vec2(point)
+        self.normal=b2Vec2(normal)
+        return fraction
+
+
+# The simulation without any rendering at all, e.g. for experiments
+class HeadlessSwarmSimulation(SwarmSimulation, HeadlessFramework):
+    pass
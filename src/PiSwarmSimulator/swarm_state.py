@@ -0,0 +1,74 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The hot state of the whole swarm, held as one NumPy array per field (struct of arrays) and indexed by
+# robot id. Robot and ProxSensor objects are thin views onto these arrays, so controllers can still be
+# written one robot at a time while whole-swarm code reads the arrays directly.
+#
+# Positions and angles are copied from Box2D in bulk by sync(), once after every physics step. Bodies only
+# move during the step, so every read during the rest of the tick sees the same values Box2D would give.
+import numpy
+
+# Integer codes for the states of the finite state machine controllers, e.g. for recording trajectories
+STATE_CODES = {"forward": 0, "avoid": 1, "turning": 2}
+STATE_NAMES = dict((code, name) for (name, code) in STATE_CODES.items())
+UNKNOWN_STATE = 255
+
+NUM_SENSORS = 8
+
+
+class SwarmState(object):
+
+    def __init__(self, num_robots):
+        self.positions = numpy.zeros((num_robots, 2))  # Body positions, in simulation units
+        self.angles = numpy.zeros(num_robots)  # Body angles, as given by the body's rotation, in (-pi, pi]
+        self.states = numpy.zeros(num_robots, dtype=numpy.uint8)  # FSM state codes, see STATE_CODES
+        self.timers = numpy.zeros(num_robots, dtype=numpy.int64)  # Ticks since the last coherence (omega)
+        self.illuminated = numpy.zeros(num_robots, dtype=bool)
+        self.sensors = numpy.zeros(num_robots, dtype=numpy.uint8)  # Bit i is set when IR sensor i detects an obstacle
+        self.contact_distances = numpy.zeros((num_robots, NUM_SENSORS))
+        self.heading_angles = numpy.zeros(num_robots)  # Heading a turning robot is turning to, in radians
+        self.heading_achieved = numpy.ones(num_robots, dtype=bool)
+        self.bodies = [None] * num_robots
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def attach(self, robotid, body):
+        self.bodies[robotid] = body
+
+    def sync(self, rows=None):
+        # Copy the position and angle of every body (or of the robots at rows), reading each one only once
+        if rows is None:
+            rows = slice(None)
+            transforms = [body.transform for body in self.bodies]
+        else:
+            transforms = [self.bodies[row].transform for row in rows]
+        self.positions[rows] = [(transform.position.x, transform.position.y) for transform in transforms]
+        self.angles[rows] = [transform.R.angle for transform in transforms]
+
+
+def count_lost(x, y, wireless_range):
+    """
+    Number of lost robots, with no other robot within wireless_range (the neighbour test of
+    beta_controller.py), for positions x and y of shape (samples, robots): one count per sample.
+    """
+    lost = numpy.zeros(x.shape[0], dtype=numpy.int64)
+    for robot in range(x.shape[1]):
+        distances = numpy.hypot(x - x[:, robot, None], y - y[:, robot, None])
+        distances[:, robot] = numpy.inf
+        lost += distances.min(axis=1) >= wireless_range
+    return lost
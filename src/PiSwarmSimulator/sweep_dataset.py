@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Merges the logs of a sweep into one columnar dataset, partitioned by algorithm, parameter and seed, so that
+analyses read only the columns and runs they need instead of parsing one CSV per run.
+
+Usage: python sweep_dataset.py build [LOG...]
+       python sweep_dataset.py info [column=value | column=low:high]...
+       python sweep_dataset.py read COLUMN[,COLUMN...] [column=value | column=low:high]...
+
+build merges the given logs (by default every simulator log in logs/, CSV or chunked) into the dataset,
+replacing it. info lists the partitions matching the conditions and read prints the given columns of them
+as CSV, with the partition columns first. Conditions are on the partition columns algorithm, parameter
+(the value of beta or omega) and seed, e.g. algorithm=beta parameter=2.
+
+The dataset (logs/sweep by default) is a directory of plain files, read by data_analysis/sweep_dataset.r
+as well as by SweepDataset:
+
+    schema.csv  name, type and description of every column; partition columns first
+    stats.csv   one row per column of every partition: the partition, its rows and source log, and the
+                minimum, maximum, mean and final value of the column
+    algorithm=beta/parameter=2/seed=0/time.bin, beacon_distance.bin, ...
+
+Each .bin file holds one column of one run as little-endian values of its type (float64 or int32), with
+nothing else in the file. Readers choose partitions from stats.csv, without listing directories, and read
+only the files of the columns they were asked for. A run logged both with and without log_advanced is
+taken from the advanced log, which has the same columns and more; partitions without a requested column
+(runs logged without log_advanced) are left out.
+"""
+import os
+import sys
+import glob
+import shutil
+from optparse import OptionParser
+
+import numpy
+
+from log_writer import LOG_COLUMNS, LOG_FORMATS
+from result_cache import read_log
+from run_index import LOG_NAME
+
+DEFAULT_PATH = "logs/sweep"
+SCHEMA = "schema.csv"
+STATS = "stats.csv"
+
+PARTITION_COLUMNS = ["algorithm", "parameter", "seed"]
+PARTITION_TYPES = {"algorithm": "string", "parameter": "float64", "seed": "string"}
+TYPES = {float: "<f8", int: "<i4"}
+TYPE_NAMES = {"<f8": "float64", "<i4": "int32"}
+DESCRIPTIONS = {
+    "algorithm": "taxis algorithm (partition)",
+    "parameter": "value of beta or omega (partition)",
+    "seed": "seed of the run (partition)",
+    "time": "simulated seconds",
+    "beacon_distance": "distance from the swarm centroid to the beacon in cm",
+    "centroid_distance": "mean distance of the robots from the swarm centroid in cm",
+    "lost_robots": "robots out of wireless range of the rest of the swarm",
+}
+STATS_COLUMNS = PARTITION_COLUMNS + ["rows", "log", "column", "min", "max", "mean", "final"]
+
+
+def sweep_logs(directory="logs"):
+    # Every simulator log in directory, CSV or chunked
+    return sorted(glob.glob(os.path.join(directory, "*.log")) + glob.glob(os.path.join(directory, "*.clog")))
+
+
+def partition_path(algorithm, parameter, seed):
+    return os.path.join("algorithm=" + algorithm, "parameter=" + parameter, "seed=" + seed)
+
+
+def matches(value, condition):
+    # A condition is a value, or a (low, high) tuple for an inclusive range, either end of which may be None
+    if isinstance(condition, tuple):
+        (low, high) = condition
+        return (low is None or value >= low) and (high is None or value <= high)
+    return value == condition
+
+
+def partition_order(keys):
+    # Partitions sorted by algorithm, then numerically by parameter and seed
+    (algorithm, parameter, seed) = keys
+    return (algorithm, float(parameter), int(seed) if seed.isdigit() else seed)
+
+
+def choose_logs(paths):
+    # The log of every run, keyed by partition: advanced logs first, then the most recently written
+    runs = {}
+    ordered = sorted(paths, key=lambda path: (not os.path.basename(path).startswith("adv_"), -os.path.getmtime(path)))
+    for path in ordered:
+        match = LOG_NAME.match(os.path.basename(path))
+        if match is None:
+            raise Exception("%s is not named like a simulator log" % (path))
+        (advanced, algorithm, parameter, seed) = match.groups()
+        runs.setdefault((algorithm, parameter, seed), path)
+    return runs
+
+
+def build(paths, destination=DEFAULT_PATH):
+    """
+    Write the dataset of the logs in paths to destination, replacing any earlier dataset. The dataset is
+    written to a temporary directory and renamed into place, so readers never see a partial dataset.
+    """
+    temporary = destination.rstrip("/") + ".%d.tmp" % (os.getpid())
+    if os.path.exists(temporary):
+        shutil.rmtree(temporary)
+    os.makedirs(temporary)
+
+    columns = []
+    stats = []
+    runs = choose_logs(paths)
+    for (algorithm, parameter, seed) in sorted(runs, key=partition_order):
+        path = runs[(algorithm, parameter, seed)]
+        arrays = read_log(path)
+        names = LOG_COLUMNS.get(len(arrays), sorted(arrays))
+        formats = LOG_FORMATS.get(len(arrays), [float] * len(arrays))
+        directory = os.path.join(temporary, partition_path(algorithm, parameter, seed))
+        os.makedirs(directory)
+        for (name, convert) in zip(names, formats):
+            values = numpy.asarray(arrays[name]).astype(TYPES[convert])
+            values.tofile(os.path.join(directory, name + ".bin"))
+            if name not in [column for (column, type_name) in columns]:
+                columns.append((name, TYPE_NAMES[TYPES[convert]]))
+            if len(values):
+                summary = [repr(float(value)) for value in (values.min(), values.max(), values.mean(), values[-1])]
+            else:
+                summary = ["NaN"] * 4  # As R writes it
+            stats.append([algorithm, parameter, seed, str(len(values)), os.path.basename(path), name] + summary)
+
+    with open(os.path.join(temporary, SCHEMA), "w") as schema:
+        schema.write("name,type,description\n")
+        for (name, type_name) in [(name, PARTITION_TYPES[name]) for name in PARTITION_COLUMNS] + columns:
+            schema.write("%s,%s,%s\n" % (name, type_name, DESCRIPTIONS.get(name, "")))
+    with open(os.path.join(temporary, STATS), "w") as stats_file:
+        stats_file.write(",".join(STATS_COLUMNS) + "\n")
+        for row in stats:
+            stats_file.write(",".join(row) + "\n")
+
+    if os.path.exists(destination):
+        shutil.rmtree(destination)
+    os.rename(temporary, destination)
+    return len(runs)
+
+
+class SweepDataset(object):
+    """
+    A dataset written by build, e.g. the beacon distance of every beta=2 run:
+    SweepDataset().read(["beacon_distance"], algorithm="beta", parameter=2)
+    """
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        if not os.path.exists(os.path.join(path, STATS)):
+            raise Exception("%s is not a sweep dataset, see sweep_dataset.py build" % (path))
+
+        self.types = {}
+        self.columns = []
+        with open(os.path.join(path, SCHEMA)) as schema:
+            for line in list(schema)[1:]:
+                (name, type_name, description) = line.rstrip("\n").split(",", 2)
+                self.types[name] = type_name
+                if name not in PARTITION_COLUMNS:
+                    self.columns.append(name)
+
+        # Partition keys, rows and source log, and the statistics of each column
+        self.partitions = []
+        with open(os.path.join(path, STATS)) as stats_file:
+            for line in list(stats_file)[1:]:
+                row = dict(zip(STATS_COLUMNS, line.rstrip("\n").split(",")))
+                if not self.partitions or [self.partitions[-1][name] for name in PARTITION_COLUMNS] != \
+                        [row[name] for name in PARTITION_COLUMNS]:
+                    self.partitions.append({"algorithm": row["algorithm"], "parameter": row["parameter"],
+                                            "seed": row["seed"], "rows": int(row["rows"]), "log": row["log"],
+                                            "stats": {}})
+                self.partitions[-1]["stats"][row["column"]] = dict((name, float(row[name]))
+                                                                    for name in ("min", "max", "mean", "final"))
+
+    def select(self, columns=(), **conditions):
+        """
+        The partitions that have every column in columns and match every condition on the partition
+        columns, as for RunIndex.query, e.g. select(["lost_robots"], algorithm="omega", parameter=(25, 35)).
+        """
+        for name in conditions:
+            if name not in PARTITION_COLUMNS:
+                raise Exception("Unknown partition column: " + name)
+        selected = []
+        for partition in self.partitions:
+            if not all(column in partition["stats"] for column in columns):
+                continue
+            keys = {"algorithm": partition["algorithm"], "parameter": float(partition["parameter"]),
+                    "seed": partition["seed"]}
+            if all(matches(keys[name], condition) for (name, condition) in conditions.items()):
+                selected.append(partition)
+        return selected
+
+    def read(self, columns, **conditions):
+        """
+        Read columns of the partitions chosen by select, as a list of (partition, dict of arrays), reading
+        only the files of those columns.
+        """
+        for name in columns:
+            if name not in self.columns:
+                raise Exception("Unknown column: " + name)
+        results = []
+        for partition in self.select(columns, **conditions):
+            directory = os.path.join(self.path, partition_path(partition["algorithm"], partition["parameter"],
+                                                               partition["seed"]))
+            arrays = dict((name, numpy.fromfile(os.path.join(directory, name + ".bin"), dtype=self.types[name]))
+                          for name in columns)
+            results.append((partition, arrays))
+        return results
+
+
+def parse_condition(text):
+    # column=value or column=low:high, with parameters converted to numbers
+    (name, value) = text.split("=", 1)
+
+    def convert(part):
+        if part == "":
+            return None
+        return float(part) if name == "parameter" else part
+
+    if ":" in value:
+        (low, high) = value.split(":", 1)
+        return (name, (convert(low), convert(high)))
+    return (name, convert(value))
+
+
+if __name__ == '__main__':
+    parser = OptionParser(usage="usage: %prog [options] build [LOG...] | info [CONDITION...] | "
+                                "read COLUMN[,COLUMN...] [CONDITION...]")
+    parser.add_option('', '--dataset', dest='dataset', default=DEFAULT_PATH, help='directory of the dataset')
+    (options, args) = parser.parse_args()
+
+    if not args or args[0] not in ("build", "info", "read") or (args[0] == "read" and len(args) < 2):
+        parser.error("give build, info or read")
+
+    if args[0] == "build":
+        paths = args[1:] or sweep_logs()
+        print("%d runs merged into %s" % (build(paths, options.dataset), options.dataset))
+    elif args[0] == "info":
+        dataset = SweepDataset(options.dataset)
+        for partition in dataset.select(**dict(parse_condition(arg) for arg in args[1:])):
+            print("%s parameter=%s seed=%s: %d rows of %s from %s" % (
+                partition["algorithm"], partition["parameter"], partition["seed"], partition["rows"],
+                ", ".join(name for name in dataset.columns if name in partition["stats"]), partition["log"]))
+    else:
+        columns = args[1].split(",")
+        dataset = SweepDataset(options.dataset)
+        print(",".join(PARTITION_COLUMNS + columns))
+        for (partition, arrays) in dataset.read(columns, **dict(parse_condition(arg) for arg in args[2:])):
+            prefix = ",".join(partition[name] for name in PARTITION_COLUMNS)
+            for row in zip(*[arrays[name].tolist() for name in columns]):
+                print(prefix + "," + ",".join(str(value) for value in row))
+    sys.exit(0)
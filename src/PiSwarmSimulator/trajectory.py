@@ -0,0 +1,193 @@
+#    Pi Swarm Simulator is a simple graphical simulation environment for the Pi Swarm robots
+#    Copyright (C) 2014 Alan Millard, Becky Naylor, Jon Timmis, University of York
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Per-robot trajectory files, written and read through memory maps
+#
+# File layout:
+#   0   8 bytes   magic
+#   8   uint64    offset of the first data array (a multiple of the page size)
+#   16  uint64    number of samples written so far
+#   24  uint32    length of the JSON description that follows
+#   28  JSON      robots, capacity, sample interval, field layout and run metadata
+# followed by one contiguous array per field (struct of arrays), each of shape (capacity,) or (capacity, robots).
+import json
+import struct
+import numpy
+
+from snapshot import SwarmSnapshot
+
+MAGIC = b"PSWTRAJ1"
+PREFIX = struct.Struct("<8sQQI")
+COUNT_OFFSET = 16
+PAGE_SIZE = 4096
+ALIGNMENT = 64
+
+# Bits of the flags field
+ILLUMINATED = 1
+
+# name, dtype, one value per robot (True) or per sample (False)
+FIELDS = [
+    ("tick", "<u4", False),
+    ("x", "<f4", True),
+    ("y", "<f4", True),
+    ("angle", "<f4", True),
+    ("state", "u1", True),     # FSM state code, see STATE_CODES in swarm_state.py
+    ("flags", "u1", True),     # Bit field, see ILLUMINATED
+    ("contacts", "u1", True),  # Bit i is set when IR sensor i detects an obstacle
+]
+
+
+def align(offset, alignment):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def field_views(buffer, description):
+    # Map every field onto its region of the file
+    views = {}
+    for field in description["fields"]:
+        views[field["name"]] = numpy.ndarray(tuple(field["shape"]), dtype=numpy.dtype(field["dtype"]),
+                                             buffer=buffer, offset=field["offset"])
+    return views
+
+
+class TrajectoryRecorder(object):
+    """
+    Records the swarm state every `interval` ticks into a preallocated, memory-mapped file.
+
+    Writing a sample is a handful of array copies into the mapped file; the sample count in the header is
+    updated after every sample, so the file is readable up to the last complete sample even if the run dies.
+    """
+    def __init__(self, path, num_robots, capacity, interval=1, meta=None):
+        self.path = path
+        self.num_robots = num_robots
+        self.capacity = capacity
+        self.interval = max(1, interval)
+        self.count = 0
+        self.full = False
+
+        # Lay the fields out one after the other, after the header
+        fields = []
+        offset = 0
+        for (name, dtype, per_robot) in FIELDS:
+            shape = [capacity, num_robots] if per_robot else [capacity]
+            fields.append({"name": name, "dtype": dtype, "shape": shape, "offset": offset})
+            offset = align(offset + int(numpy.prod(shape)) * numpy.dtype(dtype).itemsize, ALIGNMENT)
+
+        description = {"version": 1, "robots": num_robots, "capacity": capacity, "interval": self.interval,
+                       "fields": fields, "meta": meta or {}}
+
+        # The offsets in the header depend on where the data starts, which depends on the length of the
+        # header, so move the data along until the header fits in front of it
+        relative = [field["offset"] for field in fields]
+        data_offset = 0
+        while True:
+            for (field, field_offset) in zip(fields, relative):
+                field["offset"] = data_offset + field_offset
+            encoded = json.dumps(description).encode("utf-8")
+            if PREFIX.size + len(encoded) <= data_offset:
+                break
+            data_offset = align(PREFIX.size + len(encoded), PAGE_SIZE)
+
+        # Preallocate the whole file, then map it
+        with open(path, "wb") as trajectory_file:
+            trajectory_file.truncate(data_offset + offset)
+
+        self.buffer = numpy.memmap(path, dtype=numpy.uint8, mode="r+")
+        self.buffer[:PREFIX.size] = numpy.frombuffer(PREFIX.pack(MAGIC, data_offset, 0, len(encoded)), dtype=numpy.uint8)
+        self.buffer[PREFIX.size:PREFIX.size + len(encoded)] = numpy.frombuffer(encoded, dtype=numpy.uint8)
+        self.count_field = numpy.ndarray((1,), dtype="<u8", buffer=self.buffer, offset=COUNT_OFFSET)
+
+        views = field_views(self.buffer, description)
+        self.tick = views["tick"]
+        self.x = views["x"]
+        self.y = views["y"]
+        self.angle = views["angle"]
+        self.state = views["state"]
+        self.flags = views["flags"]
+        self.contacts = views["contacts"]
+
+    def due(self, clock):
+        return not self.full and clock % self.interval == 0
+
+    def record(self, snapshot):
+        if self.count >= self.capacity:
+            if not self.full:
+                print("Trajectory file %s is full, recording stopped" % (self.path))
+                self.full = True
+            return
+
+        row = self.count
+        self.tick[row] = snapshot.clock
+        self.x[row] = snapshot.positions[:, 0]
+        self.y[row] = snapshot.positions[:, 1]
+        self.angle[row] = snapshot.angles
+        self.state[row] = snapshot.states
+        self.flags[row] = snapshot.illuminated  # ILLUMINATED is bit 0
+        self.contacts[row] = snapshot.sensors
+
+        self.count += 1
+        self.count_field[0] = self.count
+
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.flush()
+            self.buffer = None
+
+
+class TrajectoryReader(object):
+    # Read-only, memory-mapped view of a trajectory file; only the samples that were written are exposed
+    def __init__(self, path):
+        self.path = path
+        self.buffer = numpy.memmap(path, dtype=numpy.uint8, mode="r")
+
+        (magic, data_offset, count, length) = PREFIX.unpack(self.buffer[:PREFIX.size].tobytes())
+        if magic != MAGIC:
+            raise Exception("%s is not a trajectory file" % (path))
+
+        description = json.loads(self.buffer[PREFIX.size:PREFIX.size + length].tobytes().decode("utf-8"))
+        self.num_robots = description["robots"]
+        self.capacity = description["capacity"]
+        self.interval = description["interval"]
+        self.meta = description["meta"]
+        self.count = int(count)
+
+        views = field_views(self.buffer, description)
+        self.tick = views["tick"][:self.count]
+        self.x = views["x"][:self.count]
+        self.y = views["y"][:self.count]
+        self.angle = views["angle"][:self.count]
+        self.state = views["state"][:self.count]
+        self.flags = views["flags"][:self.count]
+        self.contacts = views["contacts"][:self.count]
+
+    def __len__(self):
+        return self.count
+
+    def illuminated(self):
+        return (self.flags & ILLUMINATED) != 0
+
+    def frame(self, index, snapshot=None):
+        # Copy sample `index` into a SwarmSnapshot (reusing `snapshot` if given), e.g. for drawing
+        if snapshot is None:
+            snapshot = SwarmSnapshot(self.num_robots)
+        snapshot.clock = int(self.tick[index])
+        snapshot.positions[:, 0] = self.x[index]
+        snapshot.positions[:, 1] = self.y[index]
+        snapshot.angles[:] = self.angle[index]
+        snapshot.states[:] = self.state[index]
+        snapshot.illuminated[:] = (self.flags[index] & ILLUMINATED) != 0
+        snapshot.sensors[:] = self.contacts[index]
+        return snapshot